@@ -3,14 +3,19 @@ import json
 from decimal import Decimal
 from google.cloud import bigquery
 from google.oauth2 import service_account
-import tempfile
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
+from writers import WRITERS
 
 # Configure logging for Lambda
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# File format of the load job: JSON for the table's JSON items column, or
+# AVRO / PARQUET once the table has been migrated to REPEATED RECORD items
+# (see terraform/bigquery/migrate_items_to_record.sql)
+LOAD_FORMAT = os.environ.get('BIGQUERY_LOAD_FORMAT', 'JSON').upper()
+
 def handler(event, context):
     """Handle DynamoDB Stream events and sync to BigQuery"""
     try:
@@ -51,9 +56,10 @@ def handler(event, context):
                         logger.error(f"Missing createdAt timestamp in record: {json.dumps(new_order)}")
                         continue
                         
-                    # Ensure the timestamp is in the correct format for BigQuery
+                    # Stored without an offset, in UTC
                     timestamp = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    formatted_timestamp = timestamp.strftime('%Y-%m-%d %H:%M:%S.%f UTC')
+                    if timestamp.tzinfo is None:
+                        timestamp = timestamp.replace(tzinfo=timezone.utc)
                     
                     # Handle items - parse DynamoDB List type
                     items_data = new_order.get('items', {}).get('L', [])
@@ -73,13 +79,13 @@ def handler(event, context):
                         'userEmail': new_order.get('userEmail', {}).get('S'),
                         'total': float(new_order.get('total', {}).get('N', '0')),
                         'status': new_order.get('status', {}).get('S', 'unknown'),
-                        'createdAt': formatted_timestamp,
-                        'items': json.dumps(items)  # Convert items list to JSON string
+                        'createdAt': timestamp,
+                        'items': items  # The JSON writer encodes these as a string
                     }
                     
                     # Validate required fields
                     if not all([order_data['id'], order_data['userEmail'], order_data['createdAt']]):
-                        logger.error(f"Missing required fields in order data: {json.dumps(order_data)}")
+                        logger.error(f"Missing required fields in order data: {json.dumps(order_data, default=str)}")
                         continue
                     
                     orders_to_load.append(order_data)
@@ -89,39 +95,32 @@ def handler(event, context):
                     continue
         
         if orders_to_load:
-            # Create a temporary file for the batch load and process it
-            with tempfile.NamedTemporaryFile(mode='w+', suffix='.json') as temp_file:
-                # Write the data
-                for order in orders_to_load:
-                    temp_file.write(json.dumps(order) + '\n')
-                temp_file.flush()
-                
-                # Configure the load job
-                job_config = bigquery.LoadJobConfig(
-                    source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+            # Serialize the batch into memory in the configured format
+            source_file, job_config = WRITERS[LOAD_FORMAT](orders_to_load)
+            
+            try:
+                # Load the data
+                job = client.load_table_from_file(
+                    source_file,
+                    table_ref,
+                    rewind=True,
+                    job_config=job_config
                 )
                 
-                try:
-                    # Load the data
-                    with open(temp_file.name, 'rb') as source_file:
-                        job = client.load_table_from_file(
-                            source_file,
-                            table_ref,
-                            job_config=job_config
-                        )
-                    
-                    # Wait for the job to complete
-                    job.result()
-                    
-                    if job.errors:
-                        logger.error(f"Job errors: {json.dumps(job.errors)}")
-                    else:
-                        table = client.get_table(table_ref)
-                        logger.info(f"Successfully loaded {len(orders_to_load)} orders. Total rows in table: {table.num_rows}")
-                    
-                except Exception as e:
-                    logger.error(f"Error during BigQuery load: {str(e)}")
-                    raise
+                # Wait for the job to complete
+                job.result()
+                
+                if job.errors:
+                    logger.error(f"Job errors: {json.dumps(job.errors)}")
+                else:
+                    logger.info(
+                        f"Successfully loaded {len(orders_to_load)} orders as {LOAD_FORMAT} "
+                        f"({source_file.getbuffer().nbytes} bytes)"
+                    )
+                
+            except Exception as e:
+                logger.error(f"Error during BigQuery load: {str(e)}")
+                raise
         
         return {
             'statusCode': 200,
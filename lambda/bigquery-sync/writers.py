@@ -0,0 +1,102 @@
+"""Serialize order rows into an in-memory file for a BigQuery load job.
+
+Rows are plain dicts: ``createdAt`` is a timezone-aware datetime and
+``items`` a list of ``{'productId', 'quantity', 'price'}`` dicts.
+
+- JSON (default): newline-delimited JSON with ``items`` as a JSON string,
+  matching the table's JSON items column.
+- AVRO: deflate-compressed, needs fastavro. Loads ``items`` as a REPEATED
+  RECORD, so only for a table migrated with migrate_items_to_record.sql.
+- PARQUET: zstd-compressed, needs pyarrow; same table requirement as AVRO.
+"""
+import io
+import json
+from typing import Callable, Dict, List, Tuple
+
+from google.cloud import bigquery
+
+AVRO_SCHEMA = {
+    "type": "record",
+    "name": "Order",
+    "fields": [
+        {"name": "id", "type": "string"},
+        {
+            "name": "items",
+            "type": {
+                "type": "array",
+                "items": {
+                    "type": "record",
+                    "name": "OrderItem",
+                    "fields": [
+                        {"name": "productId", "type": "string"},
+                        {"name": "quantity", "type": "long"},
+                        {"name": "price", "type": "double"},
+                    ],
+                },
+            },
+        },
+        {"name": "userEmail", "type": "string"},
+        {"name": "total", "type": "double"},
+        {"name": "status", "type": "string"},
+        {"name": "createdAt", "type": {"type": "long", "logicalType": "timestamp-micros"}},
+    ],
+}
+
+
+def write_avro(rows: List[dict]) -> Tuple[io.BytesIO, bigquery.LoadJobConfig]:
+    import fastavro
+
+    buffer = io.BytesIO()
+    fastavro.writer(buffer, fastavro.parse_schema(AVRO_SCHEMA), rows, codec="deflate")
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.AVRO,
+        # Read createdAt as a TIMESTAMP rather than an INTEGER of microseconds
+        use_avro_logical_types=True,
+    )
+    return buffer, job_config
+
+
+def write_parquet(rows: List[dict]) -> Tuple[io.BytesIO, bigquery.LoadJobConfig]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        pa.field("id", pa.string(), nullable=False),
+        pa.field("items", pa.list_(pa.struct([
+            pa.field("productId", pa.string(), nullable=False),
+            pa.field("quantity", pa.int64(), nullable=False),
+            pa.field("price", pa.float64(), nullable=False),
+        ]))),
+        pa.field("userEmail", pa.string(), nullable=False),
+        pa.field("total", pa.float64(), nullable=False),
+        pa.field("status", pa.string(), nullable=False),
+        pa.field("createdAt", pa.timestamp("us", tz="UTC"), nullable=False),
+    ])
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist(rows, schema=schema), buffer, compression="zstd")
+    parquet_options = bigquery.ParquetOptions()
+    # Load items as REPEATED RECORD instead of a wrapper record around the Parquet list
+    parquet_options.enable_list_inference = True
+    job_config = bigquery.LoadJobConfig(source_format=bigquery.SourceFormat.PARQUET)
+    job_config.parquet_options = parquet_options
+    return buffer, job_config
+
+
+def write_json(rows: List[dict]) -> Tuple[io.BytesIO, bigquery.LoadJobConfig]:
+    buffer = io.BytesIO()
+    for row in rows:
+        line = {
+            **row,
+            "createdAt": row["createdAt"].strftime("%Y-%m-%d %H:%M:%S.%f UTC"),
+            "items": json.dumps(row["items"]),
+        }
+        buffer.write((json.dumps(line) + "\n").encode())
+    job_config = bigquery.LoadJobConfig(source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON)
+    return buffer, job_config
+
+
+WRITERS: Dict[str, Callable[[List[dict]], Tuple[io.BytesIO, bigquery.LoadJobConfig]]] = {
+    "JSON": write_json,
+    "AVRO": write_avro,
+    "PARQUET": write_parquet,
+}
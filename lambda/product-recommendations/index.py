@@ -1,26 +1,103 @@
 import os
 import json
-import boto3
+import time
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
+from recommender import Recommender, load_bestsellers, load_model, dynamodb, scan_all
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+# DynamoDB resource is shared with the recommender and reused across warm invocations
 table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
 
+MAX_RESULTS = int(os.environ.get('MAX_RESULTS', '5'))
+CATALOG_TTL = float(os.environ.get('CATALOG_TTL', '300'))
+# Seconds between reads of the bestsellers item
+BESTSELLERS_TTL = float(os.environ.get('BESTSELLERS_TTL', '60'))
+
+# Payload shaping for the agent prompt. Bedrock rejects action group
+# responses over 25 KB, so the default budget leaves room for the envelope.
+RESPONSE_FIELDS = [f.strip() for f in os.environ.get('RESPONSE_FIELDS', 'name,description,price,frequentlyBoughtWith').split(',') if f.strip()]
+MAX_DESCRIPTION_LENGTH = int(os.environ.get('MAX_DESCRIPTION_LENGTH', '160'))
+MAX_RESPONSE_BYTES = int(os.environ.get('MAX_RESPONSE_BYTES', '20000'))
+LOG_EVENTS = os.environ.get('LOG_EVENTS', 'false').lower() == 'true'
+
+# Per-container state: the recommendation model is loaded once, the catalog and
+# the bestsellers ranking refreshed on a TTL
+_model = None
+_recommender = None
+_recommender_built_at = 0.0
+_catalog: List[Dict[str, Any]] = []
+_catalog_loaded_at = 0.0
+
+
+def get_recommender() -> Recommender:
+    global _model, _recommender, _recommender_built_at
+    if _recommender is not None and time.monotonic() - _recommender_built_at <= BESTSELLERS_TTL:
+        return _recommender
+    aggregates_table = os.environ.get('AGGREGATES_TABLE')
+    bestsellers = None
+    if aggregates_table:
+        table = dynamodb.Table(aggregates_table)
+        if _model is None:
+            try:
+                _model = load_model(table) or {}
+            except Exception as e:
+                logger.error(f"Could not load recommendation model, co-purchases disabled: {str(e)}")
+        try:
+            bestsellers = load_bestsellers(table)
+        except Exception as e:
+            logger.error(f"Could not load bestsellers, ranking by the model only: {str(e)}")
+    _recommender = Recommender(_model, bestsellers)
+    _recommender_built_at = time.monotonic()
+    return _recommender
+
+
+def get_catalog() -> List[Dict[str, Any]]:
+    global _catalog, _catalog_loaded_at
+    if not _catalog or time.monotonic() - _catalog_loaded_at > CATALOG_TTL:
+        _catalog = scan_all(table)
+        _catalog_loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(_catalog)} products into the container cache")
+    return _catalog
+
+
+def shorten(text: str, limit: int = MAX_DESCRIPTION_LENGTH) -> str:
+    """Cut text at a word boundary so it fits within limit characters"""
+    if limit <= 0 or len(text) <= limit:
+        return text
+    cut = text[:limit - 1].rsplit(' ', 1)[0].rstrip(' ,.;:')
+    return cut + '…'
+
+
+def project(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the configured fields of a formatted product"""
+    return {field: product[field] for field in RESPONSE_FIELDS if field in product}
+
+
+def fit_budget(products: List[Dict[str, Any]], budget: int = MAX_RESPONSE_BYTES) -> str:
+    """Serialize products, dropping the lowest ranked ones until the body fits the budget"""
+    products = list(products)
+    while True:
+        body = json.dumps(products, ensure_ascii=False, separators=(',', ':'))
+        if len(body.encode('utf-8')) <= budget or not products:
+            return body
+        products.pop()
+        logger.info(f"Response over {budget} bytes, trimmed to {len(products)} products")
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
-    Lambda handler to list products from DynamoDB for Bedrock agent integration.
-    Can filter by name if provided in the parameters.
+    Lambda handler to recommend products for Bedrock agent integration.
+    Can filter by name if provided in the parameters. Results are ranked by
+    popularity, capped at MAX_RESULTS and include frequently co-purchased items.
     Returns response in format expected by Bedrock agent.
     """
     try:
-        # Log the incoming event
-        logger.info(f"Received event from Bedrock: {json.dumps(event)}")
+        # Full events include the whole conversation, so only log them when debugging
+        if LOG_EVENTS:
+            logger.info(f"Received event from Bedrock: {json.dumps(event)}")
         
         # Get name parameter from Bedrock event
         name_filter = None
@@ -31,30 +108,31 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     break
         logger.info(f"Name filter: {name_filter}")
 
-        # Prepare scan parameters
-        scan_params = {}
+        # Match against the cached catalog and rank best sellers first
+        catalog = get_catalog()
         if name_filter:
-            scan_params['FilterExpression'] = 'contains(#name, :name)'
-            scan_params['ExpressionAttributeNames'] = {'#name': 'name'}
-            scan_params['ExpressionAttributeValues'] = {':name': name_filter}
-        logger.info(f"DynamoDB scan parameters: {scan_params}")
-
-        # Scan DynamoDB table
-        response = table.scan(**scan_params)
-        products = response.get('Items', [])
+            needle = name_filter.lower()
+            products = [product for product in catalog if needle in product['name'].lower()]
+        else:
+            products = catalog
         logger.info(f"Found {len(products)} products")
 
-        # Format products according to Bedrock agent schema
-        formatted_products = [
-            {
+        recommender = get_recommender()
+        names_by_id = {product['id']: product['name'] for product in catalog}
+        formatted_products = []
+        for product in recommender.rank(products)[:MAX_RESULTS]:
+            formatted = {
                 'name': product['name'],
-                'description': product['description'],
+                'description': shorten(product['description']),
                 'price': float(product['price'])  # Convert Decimal to float for JSON serialization
             }
-            for product in products
-        ]
+            bought_with = [names_by_id[pid] for pid in recommender.bought_with(product['id']) if pid in names_by_id]
+            if bought_with:
+                formatted['frequentlyBoughtWith'] = bought_with
+            formatted_products.append(project(formatted))
+        body = fit_budget(formatted_products)
         
-        logger.info(f"Returning {len(formatted_products)} formatted products")
+        logger.info(f"Returning {len(formatted_products)} formatted products ({len(body)} chars)")
         # Return in format expected by Bedrock
         return {
             'messageVersion': event.get('messageVersion', '1.0'),
@@ -65,7 +143,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'httpStatusCode': 200,
                 'responseBody': {
                     'application/json': {
-                        'body': json.dumps(formatted_products)
+                        'body': body
                     }
                 },
                 'sessionAttributes': {},
@@ -0,0 +1,157 @@
+import os
+import json
+import gzip
+import time
+import heapq
+import boto3
+import logging
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import Dict, Any, Iterable, List, Optional
+from botocore.config import Config
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+MODEL_KEY = 'recommendation-model'
+# Top-N item kept current by the sales-aggregates stream consumer
+BESTSELLERS_KEY = 'bestsellers'
+BESTSELLERS_SIZE = int(os.environ.get('BESTSELLERS_SIZE', '20'))
+NEIGHBORS_PER_PRODUCT = int(os.environ.get('NEIGHBORS_PER_PRODUCT', '10'))
+
+dynamodb = boto3.resource('dynamodb', config=Config(
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    connect_timeout=2,
+    read_timeout=5,
+    tcp_keepalive=True
+))
+
+
+def build_model(orders: Iterable[Dict[str, Any]], neighbors: int = NEIGHBORS_PER_PRODUCT) -> Dict[str, Any]:
+    """Compute popularity and a top-K co-purchase neighbor table from raw orders.
+
+    Popularity is units sold per product. Two products co-occur once per order
+    that contains both, and only the ``neighbors`` strongest partners of each
+    product are kept, so the model stays small regardless of catalog size.
+    Canceled orders are ignored.
+    """
+    popularity = Counter()
+    co_purchases = defaultdict(Counter)
+    order_count = 0
+    for order in orders:
+        if order.get('status') == 'Canceled':
+            continue
+        order_count += 1
+        basket = set()
+        for item in order.get('items', []):
+            product_id = item.get('productId')
+            if not product_id:
+                continue
+            popularity[product_id] += int(item.get('quantity', 1))
+            basket.add(product_id)
+        for first, second in combinations(sorted(basket), 2):
+            co_purchases[first][second] += 1
+            co_purchases[second][first] += 1
+
+    return {
+        'builtAt': int(time.time()),
+        'orders': order_count,
+        'popularity': dict(popularity),
+        'neighbors': {
+            product_id: heapq.nlargest(neighbors, partners.items(), key=lambda entry: entry[1])
+            for product_id, partners in co_purchases.items()
+        }
+    }
+
+
+def save_model(table, model: Dict[str, Any]) -> None:
+    """Store the model as one gzip-compressed item (DynamoDB items cap at 400 KB)"""
+    payload = gzip.compress(json.dumps(model, separators=(',', ':')).encode('utf-8'))
+    table.put_item(Item={'id': MODEL_KEY, 'model': payload, 'builtAt': model['builtAt']})
+    logger.info(f"Saved recommendation model: {len(model['popularity'])} products, {len(payload)} bytes")
+
+
+def load_model(table) -> Optional[Dict[str, Any]]:
+    item = table.get_item(Key={'id': MODEL_KEY}).get('Item')
+    if not item:
+        return None
+    return json.loads(gzip.decompress(item['model'].value))
+
+
+def load_bestsellers(table) -> Dict[str, int]:
+    """Units sold of the current best sellers, read with a single GetItem"""
+    item = table.get_item(Key={'id': BESTSELLERS_KEY}).get('Item') or {}
+    return {entry['productId']: int(entry['units']) for entry in item.get('products', [])}
+
+
+def save_bestsellers(table, popularity: Dict[str, int]) -> None:
+    """Replace the bestsellers item with the exact top-N of a full rebuild.
+
+    The stream consumer only re-ranks products that sold, so a product
+    overtaking one whose orders were canceled is corrected here. Bumping
+    the version makes a concurrent stream update re-read the new list.
+    """
+    top = heapq.nlargest(BESTSELLERS_SIZE, popularity.items(), key=lambda entry: entry[1])
+    table.update_item(
+        Key={'id': BESTSELLERS_KEY},
+        UpdateExpression='SET products = :products, updatedAt = :now ADD version :one',
+        ExpressionAttributeValues={
+            ':products': [{'productId': product_id, 'units': units} for product_id, units in top if units > 0],
+            ':now': int(time.time()),
+            ':one': 1
+        }
+    )
+
+
+class Recommender:
+    """Ranks products by popularity and suggests frequently co-purchased items.
+
+    Popularity comes from the model, with the units of the current best
+    sellers taken from the bestsellers item when it is given, as that is
+    updated with every order rather than on the model's rebuild schedule.
+    """
+
+    def __init__(self, model: Optional[Dict[str, Any]], bestsellers: Optional[Dict[str, int]] = None):
+        model = model or {}
+        self.popularity: Dict[str, int] = {**model.get('popularity', {}), **(bestsellers or {})}
+        self.neighbors: Dict[str, List[List[Any]]] = model.get('neighbors', {})
+
+    def rank(self, products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Sort products by units sold, best sellers first"""
+        return sorted(products, key=lambda product: self.popularity.get(product['id'], 0), reverse=True)
+
+    def bought_with(self, product_id: str, limit: int = 3) -> List[str]:
+        """Ids of the products most often bought together with this one"""
+        return [partner for partner, _ in self.neighbors.get(product_id, [])[:limit]]
+
+
+def scan_all(table) -> List[Dict[str, Any]]:
+    """Scan every page of a table"""
+    items = []
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def build_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Scheduled batch job: rebuild the recommendation model from the orders table"""
+    orders = scan_all(dynamodb.Table(os.environ['ORDERS_TABLE']))
+    model = build_model(orders)
+    aggregates = dynamodb.Table(os.environ['AGGREGATES_TABLE'])
+    save_model(aggregates, model)
+    save_bestsellers(aggregates, model['popularity'])
+    return {
+        'statusCode': 200,
+        'body': json.dumps(f"Built model from {model['orders']} orders")
+    }
+
+
+if __name__ == '__main__':
+    # Offline rebuild: ORDERS_TABLE=... AGGREGATES_TABLE=... python recommender.py
+    logging.basicConfig(level=logging.INFO)
+    print(build_handler({}, None))
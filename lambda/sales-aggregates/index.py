@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import boto3
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Any, Optional
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Configure logging for Lambda
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+AGGREGATES_TABLE = os.environ.get('AGGREGATES_TABLE', 'cloudmart-sales-aggregates')
+# Processed-record markers outlive the stream's 24 hour retention, then expire
+MARKER_TTL = int(os.environ.get('PROCESSED_MARKER_TTL', str(2 * 24 * 3600)))
+# DynamoDB's limit on items per TransactWriteItems call
+MAX_TRANSACT_ITEMS = 100
+# DynamoDB's limit on keys per BatchGetItem call
+MAX_BATCH_GET_KEYS = 100
+
+# Single item holding the top-N products by units, read with one GetItem
+BESTSELLERS_KEY = 'bestsellers'
+BESTSELLERS_SIZE = int(os.environ.get('BESTSELLERS_SIZE', '20'))
+
+deserializer = TypeDeserializer()
+
+# Counter deltas keyed by aggregate item id, e.g. 'product#p1' -> {'units': 2, 'revenue': 19.98}
+Deltas = Dict[str, Dict[str, Decimal]]
+
+
+_aggregates_table = None
+
+
+def _table():
+    """Aggregates table, created on first use and reused across warm invocations"""
+    global _aggregates_table
+    if _aggregates_table is None:
+        # DYNAMODB_ENDPOINT_URL points local replays at DynamoDB Local
+        dynamodb = boto3.resource('dynamodb', endpoint_url=os.environ.get('DYNAMODB_ENDPOINT_URL'), config=Config(
+            retries={'mode': 'adaptive', 'max_attempts': 5},
+            connect_timeout=2,
+            read_timeout=5,
+            tcp_keepalive=True
+        ))
+        _aggregates_table = dynamodb.Table(AGGREGATES_TABLE)
+    return _aggregates_table
+
+
+def _deserialize(image: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not image:
+        return None
+    return {key: deserializer.deserialize(value) for key, value in image.items()}
+
+
+def _contribution(order: Optional[Dict[str, Any]], sign: int, deltas: Deltas) -> None:
+    """Add (sign=1) or subtract (sign=-1) one order's share of every aggregate"""
+    if not order:
+        return
+    status = order.get('status', 'unknown')
+    deltas[f'status#{status}']['orders'] += sign
+
+    # Canceled orders only show up in the per-status counts
+    if status == 'Canceled':
+        return
+
+    day = str(order.get('createdAt', ''))[:10]
+    if day:
+        deltas[f'day#{day}']['revenue'] += sign * Decimal(str(order.get('total', 0)))
+        deltas[f'day#{day}']['orders'] += sign
+
+    for item in order.get('items', []):
+        quantity = Decimal(str(item.get('quantity', 0)))
+        price = Decimal(str(item.get('price', 0)))
+        key = f"product#{item.get('productId', '')}"
+        deltas[key]['units'] += sign * quantity
+        deltas[key]['revenue'] += sign * quantity * price
+
+
+def compute_deltas(records) -> Deltas:
+    """Fold a batch of stream records into net counter changes.
+
+    INSERT adds the new image, REMOVE subtracts the old one and MODIFY does
+    both, so a status change (e.g. Pending -> Canceled) moves the order
+    between buckets and reverses its revenue.
+    """
+    deltas: Deltas = defaultdict(lambda: defaultdict(Decimal))
+    for record in records:
+        data = record.get('dynamodb', {})
+        event = record.get('eventName')
+        if event in ('MODIFY', 'REMOVE'):
+            _contribution(_deserialize(data.get('OldImage')), -1, deltas)
+        if event in ('INSERT', 'MODIFY'):
+            _contribution(_deserialize(data.get('NewImage')), 1, deltas)
+
+    # Drop counters that cancelled out within the batch
+    return {
+        key: {name: value for name, value in counters.items() if value}
+        for key, counters in deltas.items()
+        if any(counters.values())
+    }
+
+
+def _add_update(key: str, counters: Dict[str, Decimal]) -> Dict[str, Any]:
+    names = {f'#c{i}': name for i, name in enumerate(counters)}
+    values = {f':c{i}': value for i, value in enumerate(counters.values())}
+    return {
+        'Key': {'id': key},
+        'UpdateExpression': 'ADD ' + ', '.join(f'{name} {value}' for name, value in zip(names, values)),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values
+    }
+
+
+def apply_record(table, record) -> bool:
+    """Apply one stream record's counter deltas exactly once.
+
+    Stream batches are retried as a whole after a failure, so every record's
+    ADD updates are written in a transaction together with a marker item for
+    its eventID; the marker's condition makes a replayed record a no-op.
+    Returns False if the record had already been applied.
+    """
+    deltas = compute_deltas([record])
+    if not deltas:
+        return True
+    event_id = record['eventID']
+    expires_at = int(time.time()) + MARKER_TTL
+    updates = [_add_update(key, counters) for key, counters in sorted(deltas.items())]
+    applied = True
+    # Orders with very many products span several transactions, each with its own marker
+    per_transaction = MAX_TRANSACT_ITEMS - 1
+    for part, start in enumerate(range(0, len(updates), per_transaction)):
+        marker = f'event#{event_id}' + (f'#{part}' if part else '')
+        try:
+            table.meta.client.transact_write_items(TransactItems=[
+                {'Put': {
+                    'TableName': table.name,
+                    'Item': {'id': marker, 'expires_at': expires_at},
+                    'ConditionExpression': 'attribute_not_exists(id)'
+                }},
+                *({'Update': {'TableName': table.name, **update}} for update in updates[start:start + per_transaction])
+            ])
+        except ClientError as e:
+            reasons = e.response.get('CancellationReasons') or [{}]
+            if e.response['Error']['Code'] != 'TransactionCanceledException' \
+                    or reasons[0].get('Code') != 'ConditionalCheckFailed':
+                raise
+            applied = False
+    return applied
+
+
+def product_totals(table, product_ids) -> Dict[str, Decimal]:
+    """Current unit totals of the given products, read from their aggregate items"""
+    keys = [{'id': f'product#{product_id}'} for product_id in sorted(product_ids)]
+    totals = {}
+    for start in range(0, len(keys), MAX_BATCH_GET_KEYS):
+        request = {table.name: {'Keys': keys[start:start + MAX_BATCH_GET_KEYS], 'ConsistentRead': True}}
+        while request:
+            response = table.meta.client.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(table.name, []):
+                totals[item['id'][len('product#'):]] = item.get('units', Decimal(0))
+            request = response.get('UnprocessedKeys')
+    return totals
+
+
+def update_bestsellers(table, product_units: Dict[str, Decimal], attempts: int = 5) -> None:
+    """Merge fresh product totals into the single top-N item readers fetch in O(1).
+
+    The item holds absolute totals read back from the product aggregates,
+    not increments, so refreshing it again after a replayed batch is
+    harmless. Concurrent shards may update it at the same time, so writes
+    use an optimistic version check and retry on conflict.
+    """
+    if not product_units:
+        return
+    for _ in range(attempts):
+        current = table.get_item(Key={'id': BESTSELLERS_KEY}, ConsistentRead=True).get('Item', {})
+        version = current.get('version', 0)
+        ranking = {entry['productId']: entry['units'] for entry in current.get('products', [])}
+        ranking.update(product_units)
+        top = sorted(
+            ((product_id, units) for product_id, units in ranking.items() if units > 0),
+            key=lambda entry: entry[1],
+            reverse=True
+        )[:BESTSELLERS_SIZE]
+        try:
+            table.put_item(
+                Item={
+                    'id': BESTSELLERS_KEY,
+                    'products': [{'productId': product_id, 'units': units} for product_id, units in top],
+                    'version': version + 1,
+                    'updatedAt': int(time.time())
+                },
+                ConditionExpression='attribute_not_exists(version) OR version = :version',
+                ExpressionAttributeValues={':version': version}
+            )
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            logger.info("Bestsellers item changed concurrently, retrying")
+    raise RuntimeError("Could not update bestsellers after repeated conflicts")
+
+
+def handler(event, context):
+    """Handle DynamoDB Stream events from cloudmart-orders and maintain sales aggregates.
+
+    Records are applied in stream order. On a failure the remaining records
+    are reported back as batch item failures, so Lambda retries from that
+    record instead of replaying the records already applied. The
+    bestsellers item is then refreshed from the totals of every product the
+    applied records touched.
+    """
+    records = event.get('Records', [])
+    table = _table()
+    applied = skipped = 0
+    touched = set()
+    failures = []
+    for record in records:
+        try:
+            if apply_record(table, record):
+                applied += 1
+            else:
+                skipped += 1
+            touched.update(key[len('product#'):] for key in compute_deltas([record]) if key.startswith('product#'))
+        except Exception as e:
+            logger.error(f"Error applying record {record.get('eventID')}: {str(e)}")
+            failures = [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]
+            break
+
+    if touched:
+        try:
+            update_bestsellers(table, product_totals(table, touched))
+        except Exception as e:
+            # The records are applied; the next batch touching these products refreshes the ranking
+            logger.error(f"Error updating bestsellers: {str(e)}")
+
+    logger.info(f"Applied {applied} of {len(records)} records, {skipped} already applied")
+    return {'batchItemFailures': failures}
+
+
+if __name__ == '__main__':
+    # Replay recorded stream events locally:
+    #   python index.py events.json            # apply to AGGREGATES_TABLE
+    #   python index.py events.json --dry-run  # print the deltas only
+    logging.basicConfig(level=logging.INFO)
+    with open(sys.argv[1]) as source:
+        recorded = json.load(source)
+    if '--dry-run' in sys.argv:
+        print(json.dumps(compute_deltas(recorded.get('Records', [])), indent=2, default=str))
+    else:
+        print(handler(recorded, None))
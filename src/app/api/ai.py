@@ -1,15 +1,30 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Dict, Any
+from contextlib import aclosing
 from services.ai_service import AIService
+from core.limits import ProviderBusy, limiter_stats
+from services.answer_cache import answer_cache
+from services.conversation_cache import conversation_cache
+from services.fragment_cache import fragment_cache
+from services.context_policy import turn_metrics
+from services.registry import get_ai_service
+from core.security import verify_admin
+import asyncio
 import logging
+import os
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-ai_service = AIService()
+
+# Open chat sockets per instance; more are turned away with 1013 (try again later)
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+# Seconds a chat socket may sit idle, with no answer streaming, before it is closed
+CHAT_IDLE_TIMEOUT = float(os.getenv("CHAT_IDLE_TIMEOUT", "300"))
+_chat_sessions = 0
 
 class MessageRequest(BaseModel):
     threadId: Optional[str] = None
@@ -17,17 +32,19 @@ class MessageRequest(BaseModel):
     message: str
 
 @router.post("/openai/start")
-async def start_conversation():
+async def start_conversation(ai_service: AIService = Depends(get_ai_service)):
     """Start a new OpenAI conversation"""
     try:
         thread_id = await ai_service.create_conversation()
         return {"threadId": thread_id}
+    except ProviderBusy:
+        raise
     except Exception as e:
         logger.error(f"Error starting OpenAI conversation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/openai/message")
-async def send_message(request: MessageRequest):
+async def send_message(request: MessageRequest, ai_service: AIService = Depends(get_ai_service)):
     """Send a message to OpenAI assistant"""
     if not request.threadId or not request.message:
         raise HTTPException(status_code=400, detail="threadId and message are required")
@@ -35,12 +52,14 @@ async def send_message(request: MessageRequest):
     try:
         response = await ai_service.send_message(request.threadId, request.message)
         return {"response": response}
+    except ProviderBusy:
+        raise
     except Exception as e:
         logger.error(f"Error sending message to OpenAI: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/bedrock/start")
-async def start_bedrock_conversation():
+async def start_bedrock_conversation(ai_service: AIService = Depends(get_ai_service)):
     """Start a new Bedrock conversation"""
     try:
         session_id = await ai_service.create_bedrock_conversation()
@@ -50,7 +69,7 @@ async def start_bedrock_conversation():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/bedrock/message")
-async def send_bedrock_message(request: MessageRequest):
+async def send_bedrock_message(request: MessageRequest, ai_service: AIService = Depends(get_ai_service)):
     """Send a message to Bedrock agent"""
     if not request.sessionId or not request.message:
         raise HTTPException(status_code=400, detail="sessionId and message are required")
@@ -58,6 +77,123 @@ async def send_bedrock_message(request: MessageRequest):
     try:
         response = await ai_service.send_bedrock_message(request.sessionId, request.message)
         return {"response": response}
+    except ProviderBusy:
+        raise
     except Exception as e:
         logger.error(f"Error sending message to Bedrock: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.get("/cache/stats")
+async def get_cache_stats(_: str = Depends(verify_admin)) -> Dict[str, Any]:
+    """Hit rates of the answer, conversation and page fragment caches on this instance, and assistant turn metrics (admin only)"""
+    return {
+        "answers": answer_cache.stats(),
+        "conversations": conversation_cache.stats(),
+        "fragments": fragment_cache.stats(),
+        "providers": limiter_stats(),
+        "turns": turn_metrics.stats()
+    }
+
+@router.websocket("/bedrock/ws")
+async def bedrock_chat(
+    websocket: WebSocket,
+    sessionId: Optional[str] = None,
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """Chat with the Bedrock agent over one connection, streaming each answer.
+
+    Client frames are {"type": "message", "message": ...} and
+    {"type": "cancel"}; the server sends session, chunk, done, cancelled
+    and error frames. One answer streams at a time per connection.
+    """
+    global _chat_sessions
+    if _chat_sessions >= CHAT_MAX_SESSIONS:
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    _chat_sessions += 1
+    sender = _ChatSender(websocket)
+    answer: Optional[asyncio.Task] = None
+    try:
+        session_id = sessionId or await ai_service.create_bedrock_conversation()
+        await sender.send({"type": "session", "sessionId": session_id})
+        while True:
+            try:
+                frame = await asyncio.wait_for(websocket.receive_json(), CHAT_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                if answer and not answer.done():
+                    continue
+                await sender.close(1000)
+                return
+            except KeyError:
+                # Binary frames carry no text to decode
+                await sender.close(1003)
+                return
+            except ValueError:
+                await sender.send({"type": "error", "detail": "Frames must be JSON"})
+                continue
+            if not isinstance(frame, dict):
+                await sender.send({"type": "error", "detail": "Frames must be JSON objects"})
+                continue
+
+            if frame.get("type") == "cancel":
+                if answer and not answer.done():
+                    answer.cancel()
+                continue
+            message = str(frame.get("message") or "").strip()
+            if not message:
+                await sender.send({"type": "error", "detail": "message is required"})
+            elif answer and not answer.done():
+                await sender.send({"type": "error", "detail": "Still answering the previous message"})
+            else:
+                answer = asyncio.create_task(_stream_answer(sender, ai_service, session_id, message))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _chat_sessions -= 1
+        if answer and not answer.done():
+            answer.cancel()
+
+
+class _ChatSender:
+    """Sends the frames of one chat socket, one at a time.
+
+    The receive loop and the task streaming an answer both write to the
+    socket, and concurrent sends on one WebSocket may interleave.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self._lock = asyncio.Lock()
+
+    async def send(self, frame: Dict[str, Any]) -> None:
+        async with self._lock:
+            await self.websocket.send_json(frame)
+
+    async def send_quietly(self, frame: Dict[str, Any]) -> None:
+        """Send a frame if the client is still there"""
+        try:
+            await self.send(frame)
+        except Exception:
+            pass
+
+    async def close(self, code: int) -> None:
+        async with self._lock:
+            await self.websocket.close(code=code)
+
+
+async def _stream_answer(sender: _ChatSender, ai_service: AIService, session_id: str, message: str) -> None:
+    """Relay one streamed answer to the socket"""
+    try:
+        async with aclosing(ai_service.stream_bedrock_message(session_id, message)) as chunks:
+            async for chunk in chunks:
+                # Waits while the client's socket is backed up, which in turn pauses the read from Bedrock
+                await sender.send({"type": "chunk", "text": chunk})
+        await sender.send({"type": "done"})
+    except asyncio.CancelledError:
+        await sender.send_quietly({"type": "cancelled"})
+    except ProviderBusy as e:
+        await sender.send_quietly({"type": "error", "detail": str(e), "retryAfter": e.retry_after})
+    except Exception as e:
+        logger.error(f"Error streaming Bedrock answer: {str(e)}")
+        await sender.send_quietly({"type": "error", "detail": "Sorry, I couldn't process your message. Please try again."})
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, HTTPException, Depends
+from models.cart import CartQuote, CartQuoteRequest
+from services.product_service import ProductService
+from services.registry import get_product_service
+
+router = APIRouter()
+
+@router.post("/quote", response_model=CartQuote)
+async def quote_cart(request: CartQuoteRequest, product_service: ProductService = Depends(get_product_service)):
+    """Price a cart from the catalog: current unit prices, stock availability and totals"""
+    try:
+        return await product_service.quote_cart(request.items)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=str(e))
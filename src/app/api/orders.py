@@ -1,36 +1,87 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict, Any
-from models.order import Order
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from typing import List, Dict, Any, Optional
+from models.cart import CartItem
+from models.order import Order, OrderItem, OrderSummary
 from services.order_service import OrderService
+from services.product_service import ProductService
+from services.stock_service import StockService
+from services.registry import get_order_service, get_product_service, get_stock_service
 from core.security import verify_admin
+from core.http_cache import cached_json_response
 from fastapi.responses import RedirectResponse
+import os
 
 router = APIRouter()
-order_service = OrderService()
+
+# Order status can change at any time, so clients always revalidate via ETag
+ORDER_CACHE_CONTROL = os.getenv("ORDER_CACHE_CONTROL", "private, no-cache")
 
 @router.post("/", response_model=Order)
-async def create_order(order: Order):
-    """Create a new order"""
+async def create_order(
+    order: Order,
+    order_service: OrderService = Depends(get_order_service),
+    product_service: ProductService = Depends(get_product_service),
+    stock_service: StockService = Depends(get_stock_service)
+):
+    """Create a new order, priced from the catalog rather than from the client"""
+    try:
+        quote = await product_service.quote_cart(
+            [CartItem(productId=item.productId, quantity=item.quantity) for item in order.items]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    if quote.missing:
+        raise HTTPException(status_code=400, detail=f"Unknown products: {', '.join(quote.missing)}")
+    short = [line.productId for line in quote.lines if not line.available]
+    if short:
+        raise HTTPException(status_code=409, detail=f"Not enough stock for: {', '.join(short)}")
+    order.items = [
+        OrderItem(productId=line.productId, quantity=line.quantity, price=line.unitPrice)
+        for line in quote.lines
+    ]
+    order.total = quote.subtotal
+
+    reserved = [(item.productId, item.quantity) for item in order.items]
+    short = await stock_service.reserve(reserved)
+    if short:
+        raise HTTPException(status_code=409, detail=f"Not enough stock for: {', '.join(short)}")
+    order.stockReserved = True
     try:
         return await order_service.create_order(order)
     except Exception as e:
+        await stock_service.release(reserved)
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/", response_model=List[Order])
-async def get_user_orders(user_email: str):
+@router.get("/", response_model=List[OrderSummary])
+async def get_user_orders(user_email: str, order_service: OrderService = Depends(get_order_service)):
     """Get all orders for a user"""
-    return await order_service.get_user_orders(user_email)
+    return await order_service.get_user_order_summaries(user_email)
+
+@router.get("/stats")
+async def get_order_stats(
+    days: Optional[int] = Query(None, ge=1),
+    top: int = Query(10, ge=1, le=100),
+    _: str = Depends(verify_admin),
+    order_service: OrderService = Depends(get_order_service)
+) -> Dict[str, Any]:
+    """Sales aggregates: revenue by day and status, top products, basket sizes (admin only)"""
+    return await order_service.get_order_stats(days, top)
 
 @router.get("/{order_id}", response_model=Order)
-async def get_order(order_id: str):
+async def get_order(order_id: str, request: Request, order_service: OrderService = Depends(get_order_service)):
     """Get an order by ID"""
     order = await order_service.get_order(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    return cached_json_response(request, order, ORDER_CACHE_CONTROL)
 
 @router.put("/{order_id}/status", response_model=Order)
-async def update_order_status(order_id: str, status: str, _: str = Depends(verify_admin)):
+async def update_order_status(
+    order_id: str,
+    status: str,
+    _: str = Depends(verify_admin),
+    order_service: OrderService = Depends(get_order_service)
+):
     """Update order status (admin only)"""
     order = await order_service.update_order_status(order_id, status)
     if not order:
@@ -38,7 +89,11 @@ async def update_order_status(order_id: str, status: str, _: str = Depends(verif
     return order
 
 @router.delete("/{order_id}")
-async def delete_order(order_id: str, _: str = Depends(verify_admin)):
+async def delete_order(
+    order_id: str,
+    _: str = Depends(verify_admin),
+    order_service: OrderService = Depends(get_order_service)
+):
     """Delete an order (admin only)"""
     success = await order_service.delete_order(order_id)
     if not success:
@@ -46,8 +101,8 @@ async def delete_order(order_id: str, _: str = Depends(verify_admin)):
     return {"message": "Order deleted successfully"}
 
 @router.post("/{order_id}/cancel", response_model=Order)
-async def cancel_order(order_id: str):
-    """Cancel an order"""
+async def cancel_order(order_id: str, order_service: OrderService = Depends(get_order_service)):
+    """Cancel an order, returning its items to stock"""
     order = await order_service.cancel_order(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -1,24 +1,101 @@
-from fastapi import APIRouter, HTTPException, Form
-from typing import List
-from models.product import Product, ProductCreate
+from fastapi import APIRouter, HTTPException, Form, Request, Query, Depends
+from decimal import Decimal
+from typing import List, Optional, Union
+from models.product import Product, ProductCreate, ProductSummary
 from services.product_service import ProductService
+from services.catalog_index import SORT_FIELDS
+from services.stock_service import StockService
+from services.registry import get_product_service, get_stock_service
+from core.http_cache import (
+    TTLCache,
+    compute_etag,
+    conditional_response,
+    cached_json_response,
+    serialize_json,
+)
 from fastapi.responses import RedirectResponse
+import os
 
 router = APIRouter()
-product_service = ProductService()
 
-@router.get("/", response_model=List[Product])
-async def list_products():
-    """List all products"""
-    return await product_service.list_products()
+# Product endpoints sit behind basic auth, so responses must stay private
+PRODUCTS_CACHE_CONTROL = os.getenv("PRODUCTS_CACHE_CONTROL", "private, max-age=30")
+# Serialized catalog listing, shared by all requests until it expires or a write lands
+listing_cache = TTLCache(ttl=float(os.getenv("PRODUCTS_LISTING_CACHE_TTL", "10")), maxsize=2)
+
+@router.get("/", response_model=Union[List[Product], List[ProductSummary]])
+async def list_products(
+    request: Request,
+    summary: bool = False,
+    category: Optional[str] = None,
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    q: Optional[str] = Query(None, max_length=100),
+    sort: Optional[str] = Query(None, pattern=f"^-?({'|'.join(SORT_FIELDS)})$"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    product_service: ProductService = Depends(get_product_service)
+):
+    """List all products, or only their summaries (no descriptions) with ?summary=true.
+
+    Any filter, sort or paging parameter is answered from the in-memory catalog index.
+    """
+    if any(param is not None for param in (category, min_price, max_price, in_stock, q, sort, limit)) or offset:
+        products = await product_service.search_products(
+            category, min_price, max_price, in_stock, q, sort, offset, limit
+        )
+        if summary:
+            products = [ProductSummary(**product.model_dump(exclude={"description"})) for product in products]
+        return cached_json_response(request, products, PRODUCTS_CACHE_CONTROL)
+
+    cached = listing_cache.get(summary)
+    if cached is None:
+        if summary:
+            products = await product_service.list_product_summaries()
+        else:
+            products = await product_service.list_products()
+        body = serialize_json(products)
+        cached = (body, compute_etag(body))
+        listing_cache.set(summary, cached)
+    body, etag = cached
+    return conditional_response(request, body, etag, PRODUCTS_CACHE_CONTROL)
 
 @router.get("/{product_id}", response_model=Product)
-async def get_product(product_id: str):
+async def get_product(
+    product_id: str,
+    request: Request,
+    product_service: ProductService = Depends(get_product_service)
+):
     """Get a specific product by ID"""
     product = await product_service.get_product(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return cached_json_response(request, product, PRODUCTS_CACHE_CONTROL)
+
+@router.get("/{product_id}/stock")
+async def get_product_stock(product_id: str, stock_service: StockService = Depends(get_stock_service)):
+    """Current stock of a product, summed over its shards if it has any"""
+    stock = await stock_service.get_stock(product_id)
+    if stock is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return {"productId": product_id, "stock": stock}
+
+@router.put("/{product_id}/stock-shards")
+async def set_stock_shards(
+    product_id: str,
+    shards: int = Query(..., ge=0),
+    stock_service: StockService = Depends(get_stock_service)
+):
+    """Spread a hot product's stock over ``shards`` counters, or 0 to keep it on the product item"""
+    try:
+        stock = await stock_service.set_shards(product_id, shards)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if stock is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    listing_cache.invalidate()
+    return {"productId": product_id, "stockShards": shards, "stock": stock}
 
 @router.post("/")
 async def create_product(
@@ -26,7 +103,8 @@ async def create_product(
     description: str = Form(...),
     price: float = Form(...),
     stock: int = Form(...),
-    category: str = Form(...)
+    category: str = Form(...),
+    product_service: ProductService = Depends(get_product_service)
 ):
     """Create a new product"""
     try:
@@ -38,22 +116,29 @@ async def create_product(
             category=category
         )
         await product_service.create_product(product_data)
+        listing_cache.invalidate()
         return RedirectResponse(url="/products", status_code=303)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{product_id}", response_model=Product)
-async def update_product(product_id: str, product: ProductCreate):
+async def update_product(
+    product_id: str,
+    product: ProductCreate,
+    product_service: ProductService = Depends(get_product_service)
+):
     """Update an existing product"""
     updated_product = await product_service.update_product(product_id, product)
+    listing_cache.invalidate()
     if not updated_product:
         raise HTTPException(status_code=404, detail="Product not found")
     return updated_product
 
 @router.delete("/{product_id}")
-async def delete_product(product_id: str):
+async def delete_product(product_id: str, product_service: ProductService = Depends(get_product_service)):
     """Delete a product"""
     success = await product_service.delete_product(product_id)
+    listing_cache.invalidate()
     if not success:
         raise HTTPException(status_code=404, detail="Product not found")
     return {"message": "Product deleted successfully"} 
\ No newline at end of file
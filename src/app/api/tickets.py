@@ -1,23 +1,43 @@
-from fastapi import APIRouter, HTTPException, Form
-from typing import List
-from models.ticket import Ticket
-from services.ticket_service import TicketService
+from fastapi import APIRouter, HTTPException, Form, Query, Depends
+from typing import List, Optional
+from models.ticket import Ticket, TicketPage
+from services.ticket_service import TicketService, ARCHIVE_JOB
 from services.ai_service import AIService
+from services.registry import get_ticket_service, get_ai_service
+from core.limits import ProviderBusy
+from core.jobs import job_queue
+from core.security import verify_admin
 from fastapi.responses import RedirectResponse
 import logging
 
 router = APIRouter()
-ticket_service = TicketService()
-ai_service = AIService()
 logger = logging.getLogger(__name__)
 
-@router.get("/", response_model=List[Ticket])
-async def list_tickets():
-    """List all tickets"""
-    return await ticket_service.list_tickets()
+@router.get("/", response_model=TicketPage)
+async def list_tickets(
+    status: str = Query("open", pattern="^(open|closed)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    ticket_service: TicketService = Depends(get_ticket_service)
+):
+    """List tickets by status, most recently updated first (summaries only)"""
+    try:
+        return await ticket_service.query_tickets(status, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/archive", status_code=202)
+async def archive_tickets(
+    after_days: Optional[float] = Query(None, ge=0),
+    _: str = Depends(verify_admin),
+    ticket_service: TicketService = Depends(get_ticket_service)
+):
+    """Start archiving tickets closed longer than after_days (default TICKET_ARCHIVE_AFTER_DAYS)"""
+    payload = {} if after_days is None else {'after_days': after_days}
+    return {"jobId": await job_queue.submit(ARCHIVE_JOB, payload)}
 
 @router.get("/{ticket_id}", response_model=Ticket)
-async def get_ticket(ticket_id: str):
+async def get_ticket(ticket_id: str, ticket_service: TicketService = Depends(get_ticket_service)):
     """Get a specific ticket"""
     ticket = await ticket_service.get_ticket(ticket_id)
     if not ticket:
@@ -25,27 +45,39 @@ async def get_ticket(ticket_id: str):
     return ticket
 
 @router.post("/")
-async def create_ticket(message: str = Form(...)):
+async def create_ticket(message: str = Form(...), ticket_service: TicketService = Depends(get_ticket_service)):
     """Create a new ticket with initial message"""
     try:
         ticket = await ticket_service.create_ticket(message)
         return RedirectResponse(url=f"/tickets?ticket_id={ticket.id}", status_code=303)
+    except ProviderBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{ticket_id}/message")
-async def send_message(ticket_id: str, message: str = Form(...)):
+async def send_message(
+    ticket_id: str,
+    message: str = Form(...),
+    ticket_service: TicketService = Depends(get_ticket_service)
+):
     """Send a message to an existing ticket"""
     try:
         ticket = await ticket_service.send_message(ticket_id, message)
         if not ticket:
-            raise HTTPException(status_code=404, detail="Ticket not found or closed")
+            raise HTTPException(status_code=404, detail="Ticket not found, closed or awaiting a reply")
         return RedirectResponse(url=f"/tickets/{ticket_id}", status_code=303)
+    except ProviderBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{ticket_id}/close")
-async def close_ticket(ticket_id: str):
+async def close_ticket(
+    ticket_id: str,
+    ticket_service: TicketService = Depends(get_ticket_service),
+    ai_service: AIService = Depends(get_ai_service)
+):
     """Close a ticket and analyze sentiment"""
     try:
         # First, get the ticket to analyze
@@ -77,11 +109,13 @@ async def close_ticket(ticket_id: str):
 
         # Redirect back to the ticket page
         return RedirectResponse(url=f"/tickets/{ticket_id}", status_code=303)
+    except ProviderBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{ticket_id}")
-async def delete_ticket(ticket_id: str):
+async def delete_ticket(ticket_id: str, ticket_service: TicketService = Depends(get_ticket_service)):
     """Delete a ticket"""
     try:
         # First check if ticket exists
@@ -0,0 +1,83 @@
+"""Build the static asset bundle served from /static/dist.
+
+Compiles the Tailwind stylesheet ahead of time (purged to the classes the
+templates and scripts use, and minified), copies the page scripts, names
+every file after a hash of its content and writes ``.gz``/``.br`` siblings
+next to it. ``manifest.json`` maps logical names such as ``css/app.css`` to
+the fingerprinted files for ``core.assets.asset_url``. Run from src/app:
+
+    python -m assets.build
+
+The Tailwind standalone CLI is used so no Node toolchain is needed; point
+TAILWIND_BIN at it if it is not on PATH. Brotli variants are written when
+the ``brotli`` package is installed.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # gzip alone is still a large win
+    brotli = None
+
+APP_DIR = Path(__file__).resolve().parent.parent
+STATIC_DIR = APP_DIR / "static"
+DIST_DIR = STATIC_DIR / "dist"
+SCRIPTS = ("js/cart.js", "js/chat.js")
+
+
+def compile_css(output: Path) -> None:
+    tailwind = os.getenv("TAILWIND_BIN", "tailwindcss")
+    subprocess.run(
+        [
+            tailwind,
+            "--config", "assets/tailwind.config.js",
+            "--input", "assets/tailwind.css",
+            "--output", str(output),
+            "--minify"
+        ],
+        cwd=APP_DIR,
+        check=True
+    )
+
+
+def fingerprint(name: str, content: bytes) -> str:
+    """Write content under a hashed file name, with compressed variants, and return that name"""
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, suffix = os.path.splitext(name)
+    hashed = f"{stem}.{digest}{suffix}"
+    target = DIST_DIR / hashed
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(content)
+    # mtime=0 keeps the .gz bytes identical between builds of the same content
+    target.with_name(target.name + ".gz").write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        target.with_name(target.name + ".br").write_bytes(brotli.compress(content, quality=11))
+    return hashed
+
+
+def build() -> dict:
+    if DIST_DIR.exists():
+        shutil.rmtree(DIST_DIR)
+    manifest = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        css = Path(workdir) / "app.css"
+        compile_css(css)
+        manifest["css/app.css"] = fingerprint("css/app.css", css.read_bytes())
+    for script in SCRIPTS:
+        manifest[script] = fingerprint(script, (STATIC_DIR / script).read_bytes())
+    (DIST_DIR / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+if __name__ == "__main__":
+    for logical, hashed in build().items():
+        size = (DIST_DIR / hashed).stat().st_size
+        gz = (DIST_DIR / (hashed + ".gz")).stat().st_size
+        print(f"{logical:<14} -> dist/{hashed:<28} {size:>8} B  gzip {gz:>7} B")
@@ -0,0 +1,10 @@
+/** @type {import('tailwindcss').Config} */
+module.exports = {
+  // Paths are relative to src/app, where assets/build.py runs the CLI.
+  // Scripts are scanned too because they build markup with class names.
+  content: ["./templates/**/*.html", "./static/js/**/*.js"],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};
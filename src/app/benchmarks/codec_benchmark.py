@@ -0,0 +1,73 @@
+"""Per-item encode/decode cost of the DynamoDB item codec.
+
+Compares the old ``json.loads(model.model_dump_json())`` / ``Model(**item)``
+path against ``core.codec``, and FastAPI's default jsonable_encoder + json
+response rendering against the orjson/pydantic-core output path. Run from
+src/app:
+
+    python -m benchmarks.codec_benchmark
+"""
+import json
+import timeit
+from decimal import Decimal
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from core.codec import from_item, to_item
+from core.http_cache import serialize_json
+from models.order import Order, OrderItem
+from models.product import Product
+from models.ticket import Message, Ticket
+
+ROUNDS = 20000
+
+
+def sample_models():
+    product = Product(
+        name="Wireless Headphones",
+        description="Noise cancelling over-ear headphones with 30h battery life",
+        price=Decimal("149.99"),
+        stock=42,
+        category="Electronics"
+    )
+    order = Order(
+        userEmail="demo@example.com",
+        items=[OrderItem(productId=f"p-{i}", quantity=i + 1, price=Decimal("9.99")) for i in range(5)],
+        total=Decimal("149.85")
+    )
+    ticket = Ticket(
+        thread_id="thread_abc",
+        messages=[
+            Message(role="user" if i % 2 == 0 else "assistant", content="Where is my order? " * 5)
+            for i in range(10)
+        ],
+        sentimentScores={"positive": Decimal("0.5"), "neutral": Decimal("0.3"), "negative": Decimal("0.2")}
+    )
+    return [product, order, ticket]
+
+
+def _per_item_us(fn) -> float:
+    return min(timeit.repeat(fn, number=ROUNDS, repeat=3)) / ROUNDS * 1e6
+
+
+def run():
+    print(f"{'model':<10}{'op':<8}{'legacy':>18}{'new':>10}{'speedup':>10}")
+    for model in sample_models():
+        cls = type(model)
+        legacy_item = json.loads(model.model_dump_json())
+        item = to_item(model)
+        rows = [
+            ("encode", lambda: json.loads(model.model_dump_json()), lambda: to_item(model)),
+            ("decode", lambda: cls(**legacy_item), lambda: from_item(cls, item)),
+            ("render", lambda: json.dumps(jsonable_encoder(model)).encode(), lambda: orjson.dumps(model.model_dump(mode="json"))),
+            ("etag", lambda: json.dumps(jsonable_encoder(model)).encode(), lambda: serialize_json(model)),
+        ]
+        for op, legacy, fast in rows:
+            legacy_us = _per_item_us(legacy)
+            fast_us = _per_item_us(fast)
+            print(f"{cls.__name__:<10}{op:<8}{legacy_us:>15.2f} us{fast_us:>7.2f} us{legacy_us / fast_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,63 @@
+"""Import-time profile of the application entry point.
+
+Imports ``main`` in a fresh interpreter with ``-X importtime`` and reports
+the total plus the top-level packages that take the most time (summed self
+time of all their modules), so SDKs that creep back onto the import path
+show up. Run from src/app:
+
+    python -m benchmarks.startup_benchmark [module] [--top N]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+RUNS = 5
+
+
+def profile(module: str):
+    """Return (total microseconds, {top-level package: microseconds}) for one cold import"""
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.getenv("AWS_DEFAULT_REGION", "us-east-1"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    packages = defaultdict(int)
+    total = 0
+    for match in LINE.finditer(result.stderr):
+        self_time, cumulative, _, name = match.groups()
+        # Self time adds up without double counting nested imports
+        packages[name.split(".")[0]] += int(self_time)
+        if name == module:
+            total = int(cumulative)
+    return total, packages
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [profile(args.module) for _ in range(RUNS)]
+    totals = [total for total, _ in runs]
+    print(f"import {args.module}: median {statistics.median(totals) / 1000:.1f} ms over {RUNS} runs "
+          f"(min {min(totals) / 1000:.1f} ms)")
+
+    packages = runs[totals.index(min(totals))][1]
+    print(f"\n{'package':<28}{'self time':>12}")
+    for name, micros in sorted(packages.items(), key=lambda entry: entry[1], reverse=True)[:args.top]:
+        print(f"{name:<28}{micros / 1000:>9.1f} ms")
+
+    heavy = [name for name in ("openai", "azure", "boto3", "botocore") if name in packages]
+    print(f"\nprovider SDKs imported eagerly: {', '.join(heavy) if heavy else 'none'}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,135 @@
+"""Checkout throughput on one hot product, with and without sharded stock.
+
+Runs ``StockService``'s reservation logic against a local stand-in for
+DynamoDB that, like a real partition, serializes writes to the same key
+and caps each key at ``--key-writes`` writes per second. Concurrent buyers
+take one unit at a time until the product sells out; the benchmark
+reports sales per second and checks that exactly the initial stock was
+sold and no counter went negative. Run from src/app:
+
+    python -m benchmarks.stock_benchmark [--stock 3000] [--buyers 64] [--shards 0 4 16]
+"""
+import argparse
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from core.storage import StockStore
+from services.stock_service import StockService
+
+PRODUCT = "hot-product"
+
+
+class LocalStore:
+    """Counters with a per-key write rate limit and a fixed round-trip latency"""
+
+    def __init__(self, key_writes: float, latency: float):
+        self.write_time = 1 / key_writes
+        self.latency = latency
+        self.shards = 0
+        self.counters: Dict[Optional[int], int] = {}
+        self.lowest = 0
+        self.writes = 0
+        self._locks = defaultdict(threading.Lock)
+        self._layout = threading.Lock()
+
+    def write(self, key: Optional[int], apply) -> bool:
+        time.sleep(self.latency)
+        with self._locks[key]:
+            time.sleep(self.write_time)
+            with self._layout:
+                self.writes += 1
+                ok = apply()
+                self.lowest = min(self.lowest, *self.counters.values())
+                return ok
+
+
+class LocalStockStore(StockStore):
+    """StockStore backed by a LocalStore"""
+
+    def __init__(self, store: LocalStore):
+        self.store = store
+
+    def read_config(self, product_id: str) -> Optional[Tuple[int, int]]:
+        time.sleep(self.store.latency)
+        with self.store._layout:
+            return self.store.shards, self.store.counters.get(None, 0)
+
+    def read_shards(self, product_id: str) -> Dict[int, int]:
+        time.sleep(self.store.latency)
+        with self.store._layout:
+            return {key: value for key, value in self.store.counters.items() if key is not None}
+
+    def adjust(self, product_id: str, shard: Optional[int], delta: int) -> bool:
+        counters = self.store.counters
+
+        def apply():
+            if (shard is None) != (self.store.shards == 0) or counters.get(shard) is None:
+                return False
+            if counters[shard] + delta < 0:
+                return False
+            counters[shard] += delta
+            return True
+
+        return self.store.write(shard, apply)
+
+    def write_layout(self, product_id: str, config: Tuple[int, int], current: Dict[int, int], counts: List[int], total: int) -> bool:
+        with self.store._layout:
+            if self.store.shards != config[0]:
+                return False
+            self.store.counters = {shard: units for shard, units in enumerate(counts)}
+            self.store.counters[None] = total
+            self.store.shards = len(counts)
+            return True
+
+    def write_snapshot(self, product_id: str, shards: int, total: int) -> None:
+        self.store.write(None, lambda: self.store.counters.__setitem__(None, total) or True)
+
+
+def run_case(shards: int, stock: int, buyers: int, key_writes: float, latency: float) -> None:
+    store = LocalStore(key_writes, latency)
+    store.counters = {None: stock}
+    service = StockService(store=LocalStockStore(store))
+    if shards:
+        service._reshard(PRODUCT, shards, None)
+
+    sold = 0
+    sold_lock = threading.Lock()
+
+    def buyer():
+        nonlocal sold
+        while service._take(PRODUCT, 1):
+            with sold_lock:
+                sold += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=buyers) as pool:
+        for _ in range(buyers):
+            pool.submit(buyer)
+    elapsed = time.perf_counter() - started
+
+    remaining = sum(units for key, units in store.counters.items() if key is not None) if shards else store.counters[None]
+    correct = sold == stock and remaining == 0 and store.lowest >= 0
+    print(f"{shards or 'off':>6}{sold:>8}{sold / elapsed:>12.0f}/s{elapsed:>9.2f}s{store.writes:>9}"
+          f"{service.contended:>11}{service.gathered:>10}   {'ok' if correct else 'OVERSOLD/LOST'}")
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stock", type=int, default=3000)
+    parser.add_argument("--buyers", type=int, default=64)
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 4, 16])
+    parser.add_argument("--key-writes", type=float, default=1000, help="writes per second one key accepts")
+    parser.add_argument("--latency", type=float, default=0.002, help="round-trip seconds per request")
+    args = parser.parse_args()
+
+    print(f"{args.stock} units, {args.buyers} concurrent buyers, {args.key_writes:.0f} writes/s per key\n")
+    print(f"{'shards':>6}{'sold':>8}{'throughput':>14}{'time':>10}{'writes':>9}{'contended':>11}{'gathered':>10}   check")
+    for shards in args.shards:
+        run_case(shards, args.stock, args.buyers, args.key_writes, args.latency)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,123 @@
+"""Latency of the app's data access patterns on each storage backend.
+
+With ``--backend sql`` (the default) a fresh SQLite database is seeded with
+generated products, orders and tickets; pass ``--url`` for another
+database. ``--backend dynamodb`` reads the existing cloudmart tables and
+writes nothing. Every pattern is timed on the store methods the services
+call, e.g. the catalog listing scan, cart BatchGetItem, order history by
+email and the ticket sidebar page. Run from src/app:
+
+    python -m benchmarks.storage_benchmark [--backend sql|dynamodb] [--products 500]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+
+from core.codec import to_item
+from core.storage import BACKENDS
+from models.order import Order, OrderItem, OrderSummary
+from models.product import Product, ProductSummary
+from models.ticket import Message, Ticket
+
+CATEGORIES = ("Electronics", "Books", "Home", "Garden", "Toys")
+REPEAT = 50
+
+
+def seed(storage, products: int, orders: int, tickets: int, users: int) -> None:
+    catalog = [
+        Product(
+            name=f"Product {i}",
+            description="A product used to benchmark storage backends. " * 4,
+            price=Decimal(random.randint(100, 20000)) / 100,
+            stock=random.randint(0, 500),
+            category=random.choice(CATEGORIES)
+        )
+        for i in range(products)
+    ]
+    for product in catalog:
+        storage.products.put(to_item(product))
+    for _ in range(orders):
+        items = [
+            OrderItem(productId=product.id, quantity=random.randint(1, 3), price=product.price)
+            for product in random.sample(catalog, random.randint(1, 5))
+        ]
+        order = Order(
+            userEmail=f"user{random.randrange(users)}@example.com",
+            items=items,
+            total=sum(item.price * item.quantity for item in items)
+        )
+        storage.orders.put(to_item(order))
+    for i in range(tickets):
+        ticket = Ticket(
+            thread_id=f"thread_{i}",
+            status=random.choice(("open", "closed")),
+            messages=[Message(role="user" if j % 2 == 0 else "assistant", content="Where is my order? " * 5) for j in range(6)]
+        )
+        item = to_item(ticket)
+        item['last_message'] = ticket.messages[-1].content
+        storage.tickets.put(item)
+
+
+def timed(fn) -> float:
+    """Median milliseconds over REPEAT calls"""
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="sql")
+    parser.add_argument("--url", help="SQLAlchemy URL (default: a temporary SQLite file)")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.backend == "sql":
+        from core.sql_storage import create_sql_storage
+        url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+        storage = create_sql_storage(url)
+        started = time.perf_counter()
+        seed(storage, args.products, args.orders, args.tickets, args.users)
+        print(f"Seeded {url} in {time.perf_counter() - started:.1f}s")
+    else:
+        storage = BACKENDS[args.backend]()
+
+    product_ids = [item['id'] for item in storage.products.scan(['id'])]
+    order_items = storage.orders.scan()
+    ticket_items = storage.tickets.scan()
+    if not product_ids or not order_items or not ticket_items:
+        raise SystemExit("Need at least one product, order and ticket to benchmark")
+    email = order_items[0]['userEmail']
+    ticket_ids = [item['id'] for item in ticket_items if item.get('status')]
+    summary_fields = list(ProductSummary.model_fields)
+
+    patterns = [
+        ("catalog listing (scan)", lambda: storage.products.scan()),
+        ("catalog summaries (projected scan)", lambda: storage.products.scan(summary_fields)),
+        ("product by id", lambda: storage.products.get(random.choice(product_ids))),
+        ("cart quote (batch get 20)", lambda: storage.products.batch_get(random.sample(product_ids, min(20, len(product_ids))), summary_fields)),
+        ("stock config read", lambda: storage.stock.read_config(random.choice(product_ids))),
+        ("order history by email", lambda: storage.orders.by_user(email, list(OrderSummary.model_fields))),
+        ("order by id", lambda: storage.orders.get(random.choice(order_items)['id'])),
+        ("ticket sidebar page (50 open)", lambda: storage.tickets.by_status("open", 50)),
+        ("ticket by id", lambda: storage.tickets.get(random.choice(ticket_ids))),
+        ("ticket version check", lambda: storage.tickets.get_version(random.choice(ticket_ids))),
+    ]
+    print(f"\n{args.backend}: {len(product_ids)} products, {len(order_items)} orders, {len(ticket_items)} tickets\n")
+    print(f"{'access pattern':<38}{'median':>10}")
+    for name, fn in patterns:
+        print(f"{name:<38}{timed(fn):>7.2f} ms")
+
+
+if __name__ == "__main__":
+    run()
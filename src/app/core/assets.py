@@ -0,0 +1,125 @@
+import json
+import mimetypes
+import os
+import stat
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+# Fingerprinted files never change under the same name
+IMMUTABLE = "public, max-age=31536000, immutable"
+STATIC_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "public, max-age=300")
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> Dict[str, str]:
+    """Logical asset name -> fingerprinted file, as written by assets/build.py"""
+    try:
+        with open(os.path.join(STATIC_DIR, "dist", "manifest.json")) as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        return {}
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Codings of an Accept-Encoding header with their q-values, e.g. {'gzip': 1.0, 'br': 0.0}"""
+    codings = {}
+    for part in header.split(","):
+        coding, *params = [piece.strip() for piece in part.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding.lower()] = quality
+    return codings
+
+
+def quality(encoding: str, codings: Dict[str, float]) -> float:
+    """q-value the client gives an encoding; unlisted ones take the value of '*', if any"""
+    return codings.get(encoding, codings.get("*", 0.0))
+
+
+def ranked_encodings(header: str) -> List[Tuple[str, str]]:
+    """(encoding, suffix) of every precompressed variant the client accepts, best first.
+
+    Ordered by the client's q-values, ties in ENCODINGS order; q=0 rules an
+    encoding out, and encodings not listed take the q-value of '*'.
+    """
+    codings = accepted_encodings(header)
+    accepted = [entry for entry in ENCODINGS if quality(entry[0], codings) > 0]
+    return sorted(accepted, key=lambda entry: quality(entry[0], codings), reverse=True)
+
+
+def asset_built(name: str) -> bool:
+    return name in load_manifest()
+
+
+def asset_url(name: str) -> str:
+    """URL of a built asset, falling back to the unbundled file before a build"""
+    hashed = load_manifest().get(name)
+    return f"/static/dist/{hashed}" if hashed else f"/static/{name}"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves .br/.gz siblings built ahead of time.
+
+    Clients that accept brotli or gzip get the precompressed file, so nothing
+    is compressed per request. Fingerprinted files under dist/ are cached
+    for a year; everything else revalidates after STATIC_CACHE_CONTROL.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        request_headers = Headers(scope=scope)
+        response = None
+        # A missing precompressed file falls back to the next accepted encoding
+        for encoding, suffix in ranked_encodings(request_headers.get("accept-encoding", "")):
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                response = FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                    headers={"Content-Encoding": encoding}
+                )
+                if self.is_not_modified(response.headers, request_headers):
+                    response = Response(status_code=304, headers={"etag": response.headers["etag"]})
+                break
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = IMMUTABLE if path.startswith("dist/") else STATIC_CACHE_CONTROL
+        return response
+
+
+class DynamicGZipMiddleware:
+    """GZip for HTML and JSON responses; static files bring their own compressed variants"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, static_prefix: str = "/static"):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+        self.static_prefix = static_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.static_prefix):
+            await self.app(scope, receive, send)
+        elif scope["type"] == "http" and not quality(
+            "gzip", accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        ):
+            # GZipMiddleware only looks for "gzip" in the header, which also matches gzip;q=0
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
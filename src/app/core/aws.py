@@ -0,0 +1,97 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+# boto3 takes a noticeable share of startup, so it is imported on first use
+if TYPE_CHECKING:
+    from boto3.session import Session
+    from botocore.config import Config
+
+
+def get_executor_workers() -> int:
+    """Size of the thread pool that runs blocking SDK calls.
+
+    Defaults to the same value ThreadPoolExecutor picks on its own so the
+    connection pool always has a socket for every worker thread.
+    """
+    default = min(32, (os.cpu_count() or 1) + 4)
+    return int(os.getenv("EXECUTOR_MAX_WORKERS", default))
+
+
+def build_executor() -> ThreadPoolExecutor:
+    """Create the executor used as the event loop's default executor"""
+    return ThreadPoolExecutor(
+        max_workers=get_executor_workers(),
+        thread_name_prefix="cloudmart-io"
+    )
+
+
+@lru_cache(maxsize=1)
+def get_botocore_config() -> "Config":
+    """Shared botocore configuration for every AWS client in the app"""
+    from botocore.config import Config
+    return Config(
+        max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", get_executor_workers())),
+        retries={
+            "mode": os.getenv("AWS_RETRY_MODE", "adaptive"),
+            "max_attempts": int(os.getenv("AWS_MAX_ATTEMPTS", "5"))
+        },
+        connect_timeout=float(os.getenv("AWS_CONNECT_TIMEOUT", "2")),
+        read_timeout=float(os.getenv("AWS_READ_TIMEOUT", "10")),
+        tcp_keepalive=os.getenv("AWS_TCP_KEEPALIVE", "true").lower() == "true"
+    )
+
+
+@lru_cache(maxsize=1)
+def get_session() -> "Session":
+    """Single boto3 session shared by all services"""
+    from boto3.session import Session
+    return Session()
+
+
+_lock = threading.Lock()
+_clients = {}
+# Resources are not thread safe, so each thread builds its own
+_local = threading.local()
+
+
+def get_client(service_name: str, **overrides):
+    """Get a shared low-level client, optionally with config overrides.
+
+    Clients are thread safe and keep their own connection pool, so one
+    instance per (service, overrides) is reused across the whole process.
+    """
+    key = (service_name, tuple(sorted(overrides.items())))
+    with _lock:
+        if key not in _clients:
+            config = get_botocore_config()
+            if overrides:
+                from botocore.config import Config
+                config = config.merge(Config(**overrides))
+            _clients[key] = get_session().client(service_name, config=config)
+        return _clients[key]
+
+
+def get_resource(service_name: str):
+    """Get the calling thread's boto3 resource built on the tuned config.
+
+    Unlike clients, resources must not be shared between threads, so every
+    thread that calls this (the event loop's and each executor worker) gets
+    its own instance, created once and reused.
+    """
+    resources = _local.__dict__
+    if service_name not in resources:
+        # The shared session is not thread safe either
+        with _lock:
+            resources[service_name] = get_session().resource(
+                service_name,
+                config=get_botocore_config()
+            )
+    return resources[service_name]
+
+
+def get_dynamodb():
+    """DynamoDB service resource of the calling thread"""
+    return get_resource("dynamodb")
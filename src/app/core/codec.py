@@ -0,0 +1,113 @@
+import types
+from decimal import Decimal
+from typing import Any, Callable, Dict, Generic, Iterable, Optional, Type, TypeVar, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+Restorer = Optional[Callable[[Any], Any]]
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _decimal_restorer(annotation: Any) -> Restorer:
+    """Build a function that turns JSON-mode strings back into Decimals.
+
+    Returns None when the annotated type holds no Decimal, so those fields
+    are copied through untouched.
+    """
+    annotation = _unwrap_optional(annotation)
+    origin = get_origin(annotation)
+
+    if annotation is Decimal:
+        return Decimal
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return ItemCodec.for_model(annotation).restore
+    if origin in (list, tuple):
+        args = get_args(annotation)
+        inner = _decimal_restorer(args[0]) if args else None
+        if inner is None:
+            return None
+        return lambda values: [inner(v) for v in values]
+    if origin is dict:
+        args = get_args(annotation)
+        inner = _decimal_restorer(args[1]) if len(args) == 2 else None
+        if inner is None:
+            return None
+        return lambda values: {k: inner(v) for k, v in values.items()}
+    return None
+
+
+class ItemCodec(Generic[M]):
+    """Maps pydantic models to and from DynamoDB items without a JSON round trip.
+
+    Encoding lets pydantic-core dump the model in JSON mode (datetimes become
+    ISO-8601 strings natively) and then restores only the fields known to hold
+    Decimals, so prices and totals are stored as DynamoDB numbers with their
+    exact precision. Decoding is plain ``model_validate`` on the item, which
+    accepts both Decimal attributes and the strings written by older code.
+    """
+
+    _registry: Dict[type, "ItemCodec"] = {}
+
+    def __init__(self, model: Type[M]):
+        self.model = model
+        self.restorers = {}
+        for name, field in model.model_fields.items():
+            restorer = _decimal_restorer(field.annotation)
+            if restorer is not None:
+                self.restorers[name] = restorer
+
+    @classmethod
+    def for_model(cls, model: Type[M]) -> "ItemCodec[M]":
+        """Get the cached codec for a model class"""
+        codec = cls._registry.get(model)
+        if codec is None:
+            codec = cls._registry[model] = cls(model)
+        return codec
+
+    def restore(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert the Decimal fields of a JSON-mode dump back to Decimal in place"""
+        for name, restorer in self.restorers.items():
+            value = data.get(name)
+            if value is not None:
+                data[name] = restorer(value)
+        return data
+
+    def encode(self, instance: M) -> Dict[str, Any]:
+        """Convert a model into a DynamoDB item"""
+        return self.restore(instance.model_dump(mode="json"))
+
+    def decode(self, item: Dict[str, Any]) -> M:
+        """Convert a DynamoDB item into a model"""
+        return self.model.model_validate(item)
+
+
+def to_item(instance: BaseModel) -> Dict[str, Any]:
+    """Encode any model into a DynamoDB item"""
+    return ItemCodec.for_model(type(instance)).encode(instance)
+
+
+def from_item(model: Type[M], item: Dict[str, Any]) -> M:
+    """Decode a DynamoDB item into the given model"""
+    return ItemCodec.for_model(model).decode(item)
+
+
+def projection(fields: Iterable[str]) -> Dict[str, Any]:
+    """Scan/query kwargs that fetch only the given attributes.
+
+    Every name goes through ExpressionAttributeNames because several of our
+    attributes (name, status, items) are DynamoDB reserved words.
+    """
+    names = {f"#p{i}": field for i, field in enumerate(fields)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names
+    }
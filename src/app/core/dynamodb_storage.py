@@ -0,0 +1,399 @@
+import base64
+import functools
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from botocore.exceptions import ClientError
+
+from core.aws import get_dynamodb
+from core.codec import projection
+from core.storage import (
+    ConditionFailed,
+    Item,
+    OrderStore,
+    ProductStore,
+    StockStore,
+    Storage,
+    StorageError,
+    TicketStore,
+)
+
+PRODUCTS_TABLE = 'cloudmart-products'
+ORDERS_TABLE = 'cloudmart-orders'
+TICKETS_TABLE = 'cloudmart-tickets'
+SHARD_TABLE = os.getenv("STOCK_SHARD_TABLE", "cloudmart-stock-shards")
+# GSI keyed by status with updated_at as sort key (see terraform/aws/main.tf)
+STATUS_INDEX = os.getenv('TICKETS_STATUS_INDEX', 'status-updated_at-index')
+# Keys per BatchGetItem request, the DynamoDB maximum
+BATCH_SIZE = 100
+# Attribute the tickets table's TTL is enabled on (see terraform/aws/main.tf)
+TTL_ATTRIBUTE = 'expires_at'
+
+
+def _translate(method):
+    """Surface ClientErrors as storage errors, keeping DynamoDB's message"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except ClientError as e:
+            error = ConditionFailed if e.response['Error']['Code'] == 'ConditionalCheckFailedException' else StorageError
+            raise error(e.response['Error']['Message']) from e
+    return wrapper
+
+
+def _is_condition_failure(e: ClientError) -> bool:
+    return e.response['Error']['Code'] in ('ConditionalCheckFailedException', 'TransactionCanceledException')
+
+
+def _encode_cursor(last_key: Optional[dict]) -> Optional[str]:
+    if not last_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_key).encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def _scan_all(table, **kwargs) -> List[Item]:
+    """Scan every page of a table"""
+    items = []
+    while True:
+        response = table.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+class _DynamoDBStore:
+    """Base of the DynamoDB stores.
+
+    boto3 resources are not thread safe, and the stores are called from
+    every executor thread, so ``dynamodb`` returns the calling thread's
+    resource and Table objects are kept per thread too.
+    """
+
+    def __init__(self, dynamodb: Callable[[], Any] = get_dynamodb):
+        self._dynamodb = dynamodb
+        self._local = threading.local()
+
+    @property
+    def dynamodb(self):
+        return self._dynamodb()
+
+    def _table(self, name: str):
+        tables = self._local.__dict__
+        if name not in tables:
+            tables[name] = self._dynamodb().Table(name)
+        return tables[name]
+
+
+class DynamoDBProductStore(_DynamoDBStore, ProductStore):
+    @property
+    def table(self):
+        return self._table(PRODUCTS_TABLE)
+
+    @_translate
+    def scan(self, fields: Optional[Sequence[str]] = None) -> List[Item]:
+        return _scan_all(self.table, **(projection(fields) if fields else {}))
+
+    @_translate
+    def get(self, product_id: str) -> Optional[Item]:
+        return self.table.get_item(Key={'id': product_id}).get('Item')
+
+    @_translate
+    def batch_get(self, product_ids: Sequence[str], fields: Optional[Sequence[str]] = None) -> List[Item]:
+        """BatchGetItem in chunks of 100 keys, retrying keys DynamoDB leaves unprocessed"""
+        items = []
+        extra = projection(fields) if fields else {}
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            keys = [{'id': product_id} for product_id in product_ids[start:start + BATCH_SIZE]]
+            request = {PRODUCTS_TABLE: {'Keys': keys, **extra}}
+            while request:
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+                items.extend(response.get('Responses', {}).get(PRODUCTS_TABLE, []))
+                request = response.get('UnprocessedKeys')
+        return items
+
+    @_translate
+    def put(self, item: Item) -> None:
+        self.table.put_item(Item=item)
+
+    @_translate
+    def delete(self, product_id: str) -> None:
+        self.table.delete_item(Key={'id': product_id})
+
+
+class DynamoDBOrderStore(_DynamoDBStore, OrderStore):
+    @property
+    def table(self):
+        return self._table(ORDERS_TABLE)
+
+    @_translate
+    def scan(self) -> List[Item]:
+        return _scan_all(self.table)
+
+    @_translate
+    def get(self, order_id: str) -> Optional[Item]:
+        return self.table.get_item(Key={'id': order_id}).get('Item')
+
+    @_translate
+    def by_user(self, user_email: str, fields: Optional[Sequence[str]] = None) -> List[Item]:
+        extra = projection(fields) if fields else {'ExpressionAttributeNames': {}}
+        extra['ExpressionAttributeNames']['#email'] = 'userEmail'
+        return _scan_all(
+            self.table,
+            FilterExpression='#email = :email',
+            ExpressionAttributeValues={':email': user_email},
+            **extra
+        )
+
+    @_translate
+    def put(self, item: Item) -> None:
+        self.table.put_item(Item=item)
+
+    @_translate
+    def update_status(self, order_id: str, status: str, unless: Optional[str] = None) -> Optional[Item]:
+        condition = 'attribute_exists(id)'
+        values = {':status': status}
+        if unless is not None:
+            condition += ' AND #status <> :unless'
+            values[':unless'] = unless
+        try:
+            response = self.table.update_item(
+                Key={'id': order_id},
+                UpdateExpression='set #status = :status',
+                ConditionExpression=condition,
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues=values,
+                ReturnValues='ALL_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+        except ClientError as e:
+            if not _is_condition_failure(e):
+                raise
+            if 'Item' in e.response:
+                # The order exists, so it was the status condition that failed
+                raise ConditionFailed(f"Order {order_id} is already {unless}")
+            return None
+        return response.get('Attributes')
+
+    @_translate
+    def delete(self, order_id: str) -> None:
+        self.table.delete_item(Key={'id': order_id})
+
+
+class DynamoDBTicketStore(_DynamoDBStore, TicketStore):
+    @property
+    def table(self):
+        return self._table(TICKETS_TABLE)
+
+    @_translate
+    def scan(self) -> List[Item]:
+        return _scan_all(self.table)
+
+    @_translate
+    def get(self, ticket_id: str) -> Optional[Item]:
+        return self.table.get_item(Key={'id': ticket_id}).get('Item')
+
+    @_translate
+    def get_version(self, ticket_id: str) -> Optional[str]:
+        item = self.table.get_item(Key={'id': ticket_id}, ProjectionExpression='updated_at').get('Item')
+        return item.get('updated_at') if item else None
+
+    @_translate
+    def by_status(self, status: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[Item], Optional[str]]:
+        params = {
+            'IndexName': STATUS_INDEX,
+            'KeyConditionExpression': '#status = :status',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {':status': status},
+            'ScanIndexForward': False,
+            'Limit': limit
+        }
+        start_key = _decode_cursor(cursor)
+        if start_key:
+            params['ExclusiveStartKey'] = start_key
+        response = self.table.query(**params)
+        return response.get('Items', []), _encode_cursor(response.get('LastEvaluatedKey'))
+
+    @_translate
+    def put(self, item: Item, expected_version: Optional[str] = None) -> None:
+        if expected_version is None:
+            self.table.put_item(Item=item)
+        else:
+            self.table.put_item(
+                Item=item,
+                ConditionExpression='updated_at = :previous',
+                ExpressionAttributeValues={':previous': expected_version}
+            )
+
+    @_translate
+    def closed_before(self, cutoff: str, limit: int) -> List[Item]:
+        """Ids from the status index, then the full items, which the index does not project"""
+        response = self.table.query(
+            IndexName=STATUS_INDEX,
+            KeyConditionExpression='#status = :status AND updated_at < :cutoff',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':status': 'closed', ':cutoff': cutoff},
+            ProjectionExpression='id',
+            Limit=limit
+        )
+        items = []
+        keys = [{'id': item['id']} for item in response.get('Items', [])]
+        for start in range(0, len(keys), BATCH_SIZE):
+            request = {TICKETS_TABLE: {'Keys': keys[start:start + BATCH_SIZE]}}
+            while request:
+                batch = self.dynamodb.batch_get_item(RequestItems=request)
+                items.extend(batch.get('Responses', {}).get(TICKETS_TABLE, []))
+                request = batch.get('UnprocessedKeys')
+        # The index is eventually consistent and can still list tickets that were just stubbed
+        items = [item for item in items if item.get('status') == 'closed' and 'updated_at' in item]
+        items.sort(key=lambda item: item['updated_at'])
+        return items
+
+    @_translate
+    def expire(self, ticket_id: str, expected_version: str, expires_at: int) -> bool:
+        try:
+            self.table.put_item(
+                Item={'id': ticket_id, 'archived': True, TTL_ATTRIBUTE: expires_at},
+                ConditionExpression='updated_at = :previous',
+                ExpressionAttributeValues={':previous': expected_version}
+            )
+            return True
+        except ClientError as e:
+            if _is_condition_failure(e):
+                return False
+            raise
+
+    @_translate
+    def delete(self, ticket_id: str) -> None:
+        self.table.delete_item(Key={'id': ticket_id})
+
+
+class DynamoDBStockStore(_DynamoDBStore, StockStore):
+    """Stock on the product item, or on items of the shard table keyed by (productId, shard)"""
+
+    @property
+    def products(self):
+        return self._table(PRODUCTS_TABLE)
+
+    @property
+    def shards(self):
+        return self._table(SHARD_TABLE)
+
+    @_translate
+    def read_config(self, product_id: str) -> Optional[Tuple[int, int]]:
+        response = self.products.get_item(
+            Key={'id': product_id},
+            ProjectionExpression='stock, stockShards',
+            ConsistentRead=True
+        )
+        item = response.get('Item')
+        if item is None:
+            return None
+        return int(item.get('stockShards', 0)), int(item.get('stock', 0))
+
+    @_translate
+    def read_shards(self, product_id: str) -> Dict[int, int]:
+        response = self.shards.query(
+            KeyConditionExpression='productId = :id',
+            ExpressionAttributeValues={':id': product_id},
+            ConsistentRead=True
+        )
+        return {int(item['shard']): int(item['stock']) for item in response.get('Items', [])}
+
+    @_translate
+    def adjust(self, product_id: str, shard: Optional[int], delta: int) -> bool:
+        if shard is None:
+            table, key = self.products, {'id': product_id}
+            condition = 'attribute_not_exists(stockShards) OR stockShards = :zero'
+            values = {':delta': delta, ':zero': 0}
+        else:
+            table, key = self.shards, {'productId': product_id, 'shard': shard}
+            condition = 'attribute_exists(stock)'
+            values = {':delta': delta}
+        if delta < 0:
+            condition = f"stock >= :needed AND ({condition})"
+            values[':needed'] = -delta
+        try:
+            table.update_item(
+                Key=key,
+                UpdateExpression='SET stock = stock + :delta',
+                ConditionExpression=condition,
+                ExpressionAttributeValues=values
+            )
+            return True
+        except ClientError as e:
+            if _is_condition_failure(e):
+                return False
+            raise
+
+    @_translate
+    def write_layout(self, product_id: str, config: Tuple[int, int], current: Dict[int, int], counts: List[int], total: int) -> bool:
+        shards, product_stock = config
+        if shards:
+            product_condition = 'stockShards = :shards'
+            product_values = {':shards': shards}
+        else:
+            product_condition = 'stock = :stock AND (attribute_not_exists(stockShards) OR stockShards = :zero)'
+            product_values = {':stock': product_stock, ':zero': 0}
+        actions = [{
+            'Update': {
+                'TableName': PRODUCTS_TABLE,
+                'Key': {'id': product_id},
+                'UpdateExpression': 'SET stock = :total, stockShards = :count',
+                'ConditionExpression': product_condition,
+                'ExpressionAttributeValues': {':total': total, ':count': len(counts), **product_values}
+            }
+        }]
+        for shard in sorted(set(range(len(counts))) | set(current)):
+            key = {'productId': product_id, 'shard': shard}
+            if shard in current:
+                condition = {'ConditionExpression': 'stock = :previous', 'ExpressionAttributeValues': {':previous': current[shard]}}
+            else:
+                condition = {'ConditionExpression': 'attribute_not_exists(stock)'}
+            if shard < len(counts):
+                item = {**key, 'stock': counts[shard]}
+                actions.append({'Put': {'TableName': SHARD_TABLE, 'Item': item, **condition}})
+            else:
+                actions.append({'Delete': {'TableName': SHARD_TABLE, 'Key': key, **condition}})
+        try:
+            # The resource's client serializes plain Python values itself
+            self.dynamodb.meta.client.transact_write_items(TransactItems=actions)
+            return True
+        except ClientError as e:
+            if _is_condition_failure(e):
+                return False
+            raise
+
+    @_translate
+    def write_snapshot(self, product_id: str, shards: int, total: int) -> None:
+        try:
+            self.products.update_item(
+                Key={'id': product_id},
+                UpdateExpression='SET stock = :total',
+                ConditionExpression='stockShards = :shards',
+                ExpressionAttributeValues={':total': total, ':shards': shards}
+            )
+        except ClientError as e:
+            if not _is_condition_failure(e):
+                raise
+
+
+def create_dynamodb_storage() -> Storage:
+    return Storage(
+        products=DynamoDBProductStore(),
+        orders=DynamoDBOrderStore(),
+        tickets=DynamoDBTicketStore(),
+        stock=DynamoDBStockStore()
+    )
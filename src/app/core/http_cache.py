@@ -0,0 +1,91 @@
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic_core import to_json
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag derived from the serialized response body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag (weak comparison)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+def serialize_json(content: Any) -> bytes:
+    """Serialize models (or lists of them) straight to compact JSON bytes.
+
+    Produces the same output as FastAPI's response_model encoding, without
+    building the intermediate jsonable dicts.
+    """
+    return to_json(content)
+
+
+def conditional_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    cache_control: str,
+    media_type: str = "application/json"
+) -> Response:
+    """Return 304 if the client already has this representation, else the full body"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def cached_json_response(request: Request, content: Any, cache_control: str) -> Response:
+    """Serialize content, tag it with a content-hash ETag and honour If-None-Match"""
+    body = serialize_json(content)
+    return conditional_response(request, body, compute_etag(body), cache_control)
+
+
+class TTLCache:
+    """Small thread-safe key/value cache whose entries expire after a fixed TTL"""
+
+    def __init__(self, ttl: float, maxsize: int = 128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.maxsize:
+                # Drop the entry closest to expiry to make room
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key: Any = None) -> None:
+        """Drop one key, or every entry when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class Job:
+    name: str
+    payload: Dict[str, Any]
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    attempts: int = 0
+
+
+class JobBackend(ABC):
+    """Where queued jobs live until a worker takes them.
+
+    A durable backend (e.g. SQS) keeps jobs across restarts and shares them
+    between pods: ``get`` hands out a job without deleting it and ``ack``
+    removes it once handled, while ``retry`` makes it visible again later.
+    """
+
+    @abstractmethod
+    async def put(self, job: Job) -> None: ...
+
+    @abstractmethod
+    async def get(self) -> Job: ...
+
+    @abstractmethod
+    async def ack(self, job: Job) -> None: ...
+
+    @abstractmethod
+    async def retry(self, job: Job, delay: float) -> None: ...
+
+    async def drain(self, timeout: float) -> None:
+        """Wait until jobs handed out by this process are finished"""
+
+    def pending(self) -> Optional[int]:
+        return None
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(JobBackend):
+    """Local stand-in for a durable backend; jobs are lost if the process dies"""
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue()
+        # Jobs waiting out their retry delay
+        self._delayed = 0
+
+    async def put(self, job: Job) -> None:
+        self._queue.put_nowait(job)
+
+    async def get(self) -> Job:
+        return await self._queue.get()
+
+    async def ack(self, job: Job) -> None:
+        self._queue.task_done()
+
+    async def retry(self, job: Job, delay: float) -> None:
+        # The job stays unfinished until it is back in the queue, so drain() waits for it
+        self._delayed += 1
+        asyncio.get_running_loop().call_later(delay, self._requeue, job)
+
+    def _requeue(self, job: Job) -> None:
+        self._delayed -= 1
+        self._queue.put_nowait(job)
+        self._queue.task_done()
+
+    async def drain(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping job queue with {self.pending()} jobs left")
+
+    def pending(self) -> int:
+        return self._queue.qsize() + self._delayed
+
+
+BACKENDS: Dict[str, Callable[[], JobBackend]] = {
+    "memory": MemoryBackend
+}
+
+
+class JobQueue:
+    """Runs slow side effects (AI replies and the like) outside the request.
+
+    Handlers are registered by name and receive the job payload. A handler
+    that raises is retried with exponential backoff up to ``max_attempts``
+    times; after that the optional failure callback registered with it gets
+    the payload so it can record the outcome.
+    """
+
+    def __init__(self, backend: Optional[JobBackend] = None, workers: int = 4, max_attempts: int = 3, backoff: float = 2):
+        self.backend = backend
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.completed = 0
+        self.failed = 0
+        self._handlers: Dict[str, Handler] = {}
+        self._on_failure: Dict[str, Handler] = {}
+        self._tasks = []
+        self._schedules = []
+
+    def register(self, name: str, handler: Handler, on_failure: Optional[Handler] = None) -> None:
+        self._handlers[name] = handler
+        if on_failure is not None:
+            self._on_failure[name] = on_failure
+
+    async def submit(self, name: str, payload: Dict[str, Any]) -> str:
+        if name not in self._handlers:
+            raise ValueError(f"No handler registered for job {name}")
+        if self.backend is None:
+            raise RuntimeError("Job queue is not running")
+        job = Job(name=name, payload=payload)
+        await self.backend.put(job)
+        return job.id
+
+    def schedule(self, name: str, interval: float, payload: Optional[Dict[str, Any]] = None) -> None:
+        """Submit a job every ``interval`` seconds while the queue is running"""
+        self._schedules.append(asyncio.create_task(self._every(name, interval, payload or {})))
+
+    async def _every(self, name: str, interval: float, payload: Dict[str, Any]) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.submit(name, payload)
+            except Exception as e:
+                logger.warning(f"Could not submit scheduled job {name}: {str(e)}")
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        if self.backend is None:
+            self.backend = BACKENDS[os.getenv("JOB_BACKEND", "memory")]()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} workers")
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Give in-flight and queued jobs up to ``timeout`` seconds, then stop the workers"""
+        for task in self._schedules:
+            task.cancel()
+        self._schedules = []
+        if self.backend is not None and self._tasks:
+            await self.backend.drain(timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.backend is not None:
+            await self.backend.close()
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.backend.get()
+            job.attempts += 1
+            try:
+                await self._handlers[job.name](job.payload)
+                self.completed += 1
+                await self.backend.ack(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if job.attempts < self.max_attempts:
+                    delay = self.backoff ** job.attempts
+                    logger.warning(f"Job {job.name} {job.id} failed (attempt {job.attempts}), retrying in {delay}s: {str(e)}")
+                    await self.backend.retry(job, delay)
+                    continue
+                self.failed += 1
+                logger.error(f"Job {job.name} {job.id} failed after {job.attempts} attempts: {str(e)}")
+                await self.backend.ack(job)
+                on_failure = self._on_failure.get(job.name)
+                if on_failure is not None:
+                    try:
+                        await on_failure(job.payload)
+                    except Exception as e:
+                        logger.error(f"Failure callback for job {job.name} {job.id} raised: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "pending": self.backend.pending() if self.backend is not None else 0,
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+
+job_queue = JobQueue(
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+)
@@ -0,0 +1,354 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Defaults per provider: (concurrent calls, callers allowed to queue)
+DEFAULT_LIMITS = {
+    "openai": (8, 32),
+    "bedrock": (8, 32),
+    "azure": (4, 16)
+}
+
+
+class ProviderBusy(Exception):
+    """Raised instead of queueing when a provider is already saturated"""
+
+    status_code = 429
+
+    def __init__(self, provider: str, retry_after: int):
+        super().__init__(f"{provider} is busy, retry in {retry_after}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class ProviderLimiter:
+    """Caps concurrent calls to one external provider, with an optional rate limit.
+
+    Callers beyond ``concurrency`` wait on a semaphore, but only up to
+    ``max_queue`` of them; the next one is rejected with ProviderBusy so the
+    API can answer 429 immediately instead of piling requests onto a
+    provider that is already rate limiting us. ``rate`` (calls per second)
+    enables a token bucket holding at most ``burst`` tokens.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        max_queue: int,
+        rate: float = 0.0,
+        burst: Optional[int] = None,
+        retry_after: int = 5
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.rate = rate
+        self.burst = burst or concurrency
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _take_token(self) -> float:
+        """Take a token from the bucket and return how long to wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def _reject(self, retry_after: int) -> ProviderBusy:
+        self.rejected += 1
+        return ProviderBusy(self.name, retry_after)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            raise self._reject(self.retry_after)
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            delay = self._take_token()
+            if delay > self.retry_after:
+                self._tokens += 1  # Give back the token we are not going to use
+                raise self._reject(math.ceil(delay))
+            if delay:
+                await asyncio.sleep(delay)
+            self.active += 1
+            try:
+                yield
+            finally:
+                self.active -= 1
+        finally:
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "concurrency": self.concurrency,
+            "maxQueue": self.max_queue
+        }
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(ProviderBusy):
+    """Raised without calling a provider whose circuit is open"""
+
+    status_code = 503
+
+
+class CircuitBreaker:
+    """Stops calling a provider that keeps failing or answering too slowly.
+
+    Every call is recorded in a rolling ``window`` of seconds; a call counts
+    as failed if it raised or took longer than ``slow_call`` seconds. Once at
+    least ``min_calls`` are in the window and the failed share reaches
+    ``failure_rate`` the circuit opens and calls fail fast for ``open_for``
+    seconds. After that up to ``probes`` trial calls are let through
+    (half-open): a success closes the circuit, a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call: float = 20,
+        min_calls: int = 10,
+        window: float = 60,
+        open_for: float = 30,
+        probes: int = 1
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.min_calls = min_calls
+        self.window = window
+        self.open_for = open_for
+        self.probes = probes
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._probing = 0
+
+    def _retry_after(self, now: float) -> int:
+        return max(1, math.ceil(self.opened_at + self.open_for - now))
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen unless a call may go ahead now"""
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.open_for:
+                raise CircuitOpen(self.name, self._retry_after(now))
+            self.state = HALF_OPEN
+            self._probing = 0
+        if self.state == HALF_OPEN:
+            if self._probing >= self.probes:
+                raise CircuitOpen(self.name, 1)
+            self._probing += 1
+
+    def record(self, succeeded: Optional[bool], duration: float = 0.0) -> None:
+        """Record the outcome of a call let through by before_call.
+
+        ``None`` means the call was abandoned (e.g. the client went away) and
+        says nothing about the provider.
+        """
+        now = time.monotonic()
+        failed = succeeded is False or (succeeded and duration > self.slow_call)
+        if self.state == HALF_OPEN:
+            self._probing = max(0, self._probing - 1)
+            if succeeded is None:
+                return
+            if failed:
+                self._open(now)
+            else:
+                self.state = CLOSED
+                self._calls.clear()
+            return
+        if succeeded is None:
+            return
+
+        self._calls.append((now, failed))
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+        if self.state == CLOSED and len(self._calls) >= self.min_calls:
+            failures = sum(1 for _, call_failed in self._calls if call_failed)
+            if failures / len(self._calls) >= self.failure_rate:
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.trips += 1
+        self._calls.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        failures = sum(1 for _, failed in self._calls if failed)
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "recentCalls": len(self._calls),
+            "recentFailures": failures
+        }
+
+
+class Coalescer:
+    """Shares one in-flight call between callers that ask for the same key"""
+
+    def __init__(self):
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A caller that disconnects must not cancel the call for the others
+        return await asyncio.shield(task)
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_coalescer = Coalescer()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Limiter for a provider, configured from <PROVIDER>_CONCURRENCY, _MAX_QUEUE and _RATE_LIMIT"""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        prefix = provider.upper()
+        concurrency, max_queue = DEFAULT_LIMITS.get(provider, (8, 32))
+        limiter = _limiters[provider] = ProviderLimiter(
+            provider,
+            concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+            max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", max_queue)),
+            rate=float(os.getenv(f"{prefix}_RATE_LIMIT", "0")),
+            retry_after=int(os.getenv(f"{prefix}_RETRY_AFTER", "5"))
+        )
+    return limiter
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Breaker for a provider, configured from <PROVIDER>_BREAKER_* variables"""
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        prefix = f"{provider.upper()}_BREAKER"
+        breaker = _breakers[provider] = CircuitBreaker(
+            provider,
+            failure_rate=float(os.getenv(f"{prefix}_FAILURE_RATE", "0.5")),
+            slow_call=float(os.getenv(f"{prefix}_SLOW_CALL", "20")),
+            min_calls=int(os.getenv(f"{prefix}_MIN_CALLS", "10")),
+            window=float(os.getenv(f"{prefix}_WINDOW", "60")),
+            open_for=float(os.getenv(f"{prefix}_OPEN_FOR", "30"))
+        )
+    return breaker
+
+
+def get_timeout(provider: str) -> float:
+    """Upper bound on one provider call, from <PROVIDER>_TIMEOUT"""
+    return float(os.getenv(f"{provider.upper()}_TIMEOUT", "60"))
+
+
+async def guarded(provider: str, factory: Callable[[], Awaitable[T]], key: Optional[Hashable] = None) -> T:
+    """Run a provider call under its circuit breaker, limiter and timeout.
+
+    Raises CircuitOpen while the provider's circuit is open, before taking
+    a limiter slot, so callers fail fast instead of queueing. When ``key``
+    is given, callers making the identical call while it is in flight (e.g.
+    a double-submitted form) wait for and share its result.
+    """
+    async def call() -> T:
+        breaker = get_breaker(provider)
+        breaker.before_call()
+        started = None
+        outcome = None
+        try:
+            async with get_limiter(provider).slot():
+                started = time.monotonic()
+                try:
+                    result = await asyncio.wait_for(factory(), get_timeout(provider))
+                    outcome = True
+                    return result
+                except Exception:
+                    outcome = False
+                    raise
+        finally:
+            # A call rejected by the limiter never reached the provider (outcome None)
+            breaker.record(outcome, time.monotonic() - started if started is not None else 0.0)
+
+    if key is None:
+        return await call()
+    return await _coalescer.run((provider, key), call)
+
+
+class StreamTimer:
+    """Marks when the first chunk of a streamed call arrived"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_chunk_after: Optional[float] = None
+
+    def first_chunk(self) -> None:
+        if self.first_chunk_after is None:
+            self.first_chunk_after = time.monotonic() - self.started
+
+
+@asynccontextmanager
+async def guarded_stream(provider: str):
+    """Hold a provider slot while a streamed response is consumed inside the block.
+
+    Unlike ``guarded`` there is no overall timeout, since a long answer is
+    expected to stream for a while; the SDK's read timeout bounds each wait.
+    The breaker judges the call by its time to first chunk, and a stream
+    abandoned by the client (cancellation) is not held against the provider.
+    """
+    breaker = get_breaker(provider)
+    breaker.before_call()
+    timer = None
+    outcome = None
+    try:
+        async with get_limiter(provider).slot():
+            timer = StreamTimer()
+            try:
+                yield timer
+                outcome = True
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                outcome = False
+                raise
+    finally:
+        breaker.record(outcome, (timer.first_chunk_after or 0.0) if timer is not None else 0.0)
+
+
+def limiter_stats() -> Dict[str, Any]:
+    stats = {name: limiter.stats() for name, limiter in _limiters.items()}
+    for name, breaker in _breakers.items():
+        stats.setdefault(name, {})["circuit"] = breaker.stats()
+    stats["coalesced"] = _coalescer.coalesced
+    return stats
@@ -0,0 +1,403 @@
+"""SQLAlchemy implementation of the storage interface.
+
+Each entity is stored as its full item in a JSON ``data`` column, with the
+attributes the app filters or sorts on copied into indexed columns. Stock
+lives only in columns because it is changed in place by conditional
+updates. With SQLite (the default ``DATABASE_URL``) the whole app runs on
+one machine without AWS; any SQLAlchemy URL works for a shared database.
+"""
+import base64
+import functools
+import json
+import logging
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    JSON,
+    Column,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    create_engine,
+    delete,
+    event,
+    insert,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from core.storage import (
+    ConditionFailed,
+    Item,
+    OrderStore,
+    ProductStore,
+    StockStore,
+    Storage,
+    StorageError,
+    TicketStore,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+products = Table(
+    "products", metadata,
+    Column("id", String, primary_key=True),
+    Column("category", String, index=True),
+    Column("stock", Integer, nullable=False, default=0),
+    Column("stockShards", Integer, nullable=False, default=0),
+    Column("data", JSON, nullable=False)
+)
+
+stock_shards = Table(
+    "stock_shards", metadata,
+    Column("productId", String, primary_key=True),
+    Column("shard", Integer, primary_key=True),
+    Column("stock", Integer, nullable=False)
+)
+
+orders = Table(
+    "orders", metadata,
+    Column("id", String, primary_key=True),
+    Column("userEmail", String),
+    Column("status", String, index=True),
+    Column("createdAt", String, index=True),
+    Column("data", JSON, nullable=False),
+    # Order history: one user's orders, newest first
+    Index("ix_orders_user_created", "userEmail", "createdAt")
+)
+
+tickets = Table(
+    "tickets", metadata,
+    Column("id", String, primary_key=True),
+    Column("status", String),
+    Column("updated_at", String),
+    Column("data", JSON, nullable=False),
+    # Sidebar: tickets by status, most recently updated first (the DynamoDB GSI)
+    Index("ix_tickets_status_updated", "status", "updated_at", "id")
+)
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        # Kept exact; the models parse numeric strings back into Decimals
+        return str(value)
+    raise TypeError(f"Cannot store {type(value).__name__} as JSON")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=_json_default)
+
+
+def _translate(method):
+    """Surface SQLAlchemy errors as storage errors"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except SQLAlchemyError as e:
+            raise StorageError(str(e.orig if getattr(e, "orig", None) is not None else e)) from e
+    return wrapper
+
+
+def _pick(item: Item, fields: Optional[Sequence[str]]) -> Item:
+    return {field: item[field] for field in fields if field in item} if fields else item
+
+
+def _upsert(connection, table: Table, key: dict, values: dict) -> None:
+    """Insert or replace a row, portably across SQL dialects"""
+    condition = and_(*(table.c[name] == value for name, value in key.items()))
+    if connection.execute(update(table).where(condition).values(**values)).rowcount:
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(table).values(**key, **values))
+    except IntegrityError:
+        # Inserted concurrently; ours is the later write
+        connection.execute(update(table).where(condition).values(**values))
+
+
+class SqlProductStore(ProductStore):
+    def __init__(self, engine):
+        self.engine = engine
+
+    @staticmethod
+    def _item(row) -> Item:
+        # Stock is changed in place on its column, so the column wins over the copy in data
+        return {**row.data, "stock": row.stock, "stockShards": row.stockShards}
+
+    @_translate
+    def scan(self, fields: Optional[Sequence[str]] = None) -> List[Item]:
+        with self.engine.connect() as connection:
+            rows = connection.execute(select(products)).all()
+        return [_pick(self._item(row), fields) for row in rows]
+
+    @_translate
+    def get(self, product_id: str) -> Optional[Item]:
+        with self.engine.connect() as connection:
+            row = connection.execute(select(products).where(products.c.id == product_id)).first()
+        return self._item(row) if row else None
+
+    @_translate
+    def batch_get(self, product_ids: Sequence[str], fields: Optional[Sequence[str]] = None) -> List[Item]:
+        with self.engine.connect() as connection:
+            rows = connection.execute(select(products).where(products.c.id.in_(list(product_ids)))).all()
+        return [_pick(self._item(row), fields) for row in rows]
+
+    @_translate
+    def put(self, item: Item) -> None:
+        with self.engine.begin() as connection:
+            _upsert(connection, products, {"id": item["id"]}, {
+                "category": item.get("category"),
+                "stock": int(item.get("stock", 0)),
+                "stockShards": int(item.get("stockShards", 0)),
+                "data": item
+            })
+
+    @_translate
+    def delete(self, product_id: str) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(delete(products).where(products.c.id == product_id))
+            connection.execute(delete(stock_shards).where(stock_shards.c.productId == product_id))
+
+
+class SqlOrderStore(OrderStore):
+    def __init__(self, engine):
+        self.engine = engine
+
+    @_translate
+    def scan(self) -> List[Item]:
+        with self.engine.connect() as connection:
+            return [row.data for row in connection.execute(select(orders.c.data))]
+
+    @_translate
+    def get(self, order_id: str) -> Optional[Item]:
+        with self.engine.connect() as connection:
+            return connection.execute(select(orders.c.data).where(orders.c.id == order_id)).scalar()
+
+    @_translate
+    def by_user(self, user_email: str, fields: Optional[Sequence[str]] = None) -> List[Item]:
+        query = select(orders.c.data).where(orders.c.userEmail == user_email).order_by(orders.c.createdAt.desc())
+        with self.engine.connect() as connection:
+            return [_pick(data, fields) for data in connection.execute(query).scalars()]
+
+    @_translate
+    def put(self, item: Item) -> None:
+        with self.engine.begin() as connection:
+            _upsert(connection, orders, {"id": item["id"]}, {
+                "userEmail": item.get("userEmail"),
+                "status": item.get("status"),
+                "createdAt": item.get("createdAt"),
+                "data": item
+            })
+
+    @_translate
+    def update_status(self, order_id: str, status: str, unless: Optional[str] = None) -> Optional[Item]:
+        condition = orders.c.id == order_id
+        if unless is not None:
+            condition = and_(condition, or_(orders.c.status.is_(None), orders.c.status != unless))
+        with self.engine.begin() as connection:
+            # Updating the status column first takes the row lock, so concurrent transitions serialize here
+            if not connection.execute(update(orders).where(condition).values(status=status)).rowcount:
+                if connection.execute(select(orders.c.id).where(orders.c.id == order_id)).first():
+                    raise ConditionFailed(f"Order {order_id} is already {unless}")
+                return None
+            data = connection.execute(select(orders.c.data).where(orders.c.id == order_id)).scalar()
+            data = {**data, "status": status}
+            connection.execute(update(orders).where(orders.c.id == order_id).values(data=data))
+            return data
+
+    @_translate
+    def delete(self, order_id: str) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(delete(orders).where(orders.c.id == order_id))
+
+
+class SqlTicketStore(TicketStore):
+    def __init__(self, engine):
+        self.engine = engine
+
+    @_translate
+    def scan(self) -> List[Item]:
+        with self.engine.connect() as connection:
+            return [row.data for row in connection.execute(select(tickets.c.data))]
+
+    @_translate
+    def get(self, ticket_id: str) -> Optional[Item]:
+        with self.engine.connect() as connection:
+            return connection.execute(select(tickets.c.data).where(tickets.c.id == ticket_id)).scalar()
+
+    @_translate
+    def get_version(self, ticket_id: str) -> Optional[str]:
+        with self.engine.connect() as connection:
+            return connection.execute(select(tickets.c.updated_at).where(tickets.c.id == ticket_id)).scalar()
+
+    @_translate
+    def by_status(self, status: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[Item], Optional[str]]:
+        query = select(tickets.c.id, tickets.c.updated_at, tickets.c.data).where(tickets.c.status == status)
+        if cursor:
+            try:
+                after_updated, after_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            except Exception:
+                raise ValueError("Invalid pagination cursor")
+            query = query.where(or_(
+                tickets.c.updated_at < after_updated,
+                and_(tickets.c.updated_at == after_updated, tickets.c.id < after_id)
+            ))
+        query = query.order_by(tickets.c.updated_at.desc(), tickets.c.id.desc()).limit(limit + 1)
+        with self.engine.connect() as connection:
+            rows = connection.execute(query).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = base64.urlsafe_b64encode(json.dumps([last.updated_at, last.id]).encode()).decode()
+        return [row.data for row in rows], next_cursor
+
+    @_translate
+    def put(self, item: Item, expected_version: Optional[str] = None) -> None:
+        values = {"status": item.get("status"), "updated_at": item.get("updated_at"), "data": item}
+        with self.engine.begin() as connection:
+            if expected_version is None:
+                _upsert(connection, tickets, {"id": item["id"]}, values)
+                return
+            result = connection.execute(
+                update(tickets)
+                .where(tickets.c.id == item["id"], tickets.c.updated_at == expected_version)
+                .values(**values)
+            )
+            if not result.rowcount:
+                raise ConditionFailed(f"Ticket {item['id']} is not at version {expected_version}")
+
+    @_translate
+    def closed_before(self, cutoff: str, limit: int) -> List[Item]:
+        query = (
+            select(tickets.c.data)
+            .where(tickets.c.status == "closed", tickets.c.updated_at < cutoff)
+            .order_by(tickets.c.updated_at, tickets.c.id)
+            .limit(limit)
+        )
+        with self.engine.connect() as connection:
+            return list(connection.execute(query).scalars())
+
+    @_translate
+    def expire(self, ticket_id: str, expected_version: str, expires_at: int) -> bool:
+        # No TTL to wait for, so the archived ticket goes right away
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                delete(tickets).where(tickets.c.id == ticket_id, tickets.c.updated_at == expected_version)
+            )
+        return bool(result.rowcount)
+
+    @_translate
+    def delete(self, ticket_id: str) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(delete(tickets).where(tickets.c.id == ticket_id))
+
+
+class SqlStockStore(StockStore):
+    def __init__(self, engine):
+        self.engine = engine
+
+    @_translate
+    def read_config(self, product_id: str) -> Optional[Tuple[int, int]]:
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                select(products.c.stockShards, products.c.stock).where(products.c.id == product_id)
+            ).first()
+        return (row.stockShards, row.stock) if row else None
+
+    @_translate
+    def read_shards(self, product_id: str) -> Dict[int, int]:
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                select(stock_shards.c.shard, stock_shards.c.stock).where(stock_shards.c.productId == product_id)
+            ).all()
+        return {row.shard: row.stock for row in rows}
+
+    @_translate
+    def adjust(self, product_id: str, shard: Optional[int], delta: int) -> bool:
+        if shard is None:
+            table = products
+            condition = and_(products.c.id == product_id, products.c.stockShards == 0)
+        else:
+            table = stock_shards
+            condition = and_(stock_shards.c.productId == product_id, stock_shards.c.shard == shard)
+        if delta < 0:
+            condition = and_(condition, table.c.stock >= -delta)
+        with self.engine.begin() as connection:
+            return bool(connection.execute(update(table).where(condition).values(stock=table.c.stock + delta)).rowcount)
+
+    @_translate
+    def write_layout(self, product_id: str, config: Tuple[int, int], current: Dict[int, int], counts: List[int], total: int) -> bool:
+        shards, product_stock = config
+        condition = products.c.stockShards == shards
+        if not shards:
+            condition = and_(condition, products.c.stock == product_stock)
+        with self.engine.connect() as connection:
+            transaction = connection.begin()
+            try:
+                changed = connection.execute(
+                    update(products)
+                    .where(products.c.id == product_id, condition)
+                    .values(stock=total, stockShards=len(counts))
+                ).rowcount
+                for shard in sorted(set(range(len(counts))) | set(current)):
+                    if not changed:
+                        break
+                    key = and_(stock_shards.c.productId == product_id, stock_shards.c.shard == shard)
+                    if shard not in current:
+                        connection.execute(insert(stock_shards).values(productId=product_id, shard=shard, stock=counts[shard]))
+                    elif shard < len(counts):
+                        changed = connection.execute(
+                            update(stock_shards).where(key, stock_shards.c.stock == current[shard]).values(stock=counts[shard])
+                        ).rowcount
+                    else:
+                        changed = connection.execute(
+                            delete(stock_shards).where(key, stock_shards.c.stock == current[shard])
+                        ).rowcount
+                if not changed:
+                    transaction.rollback()
+                    return False
+                transaction.commit()
+                return True
+            except IntegrityError:
+                # A shard we expected to create already exists
+                transaction.rollback()
+                return False
+
+    @_translate
+    def write_snapshot(self, product_id: str, shards: int, total: int) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(
+                update(products)
+                .where(products.c.id == product_id, products.c.stockShards == shards)
+                .values(stock=total)
+            )
+
+
+def create_sql_storage(url: str) -> Storage:
+    engine = create_engine(url, json_serializer=_dumps, pool_pre_ping=True)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def configure_sqlite(connection, _):
+            # WAL lets reads proceed during a write; writers wait instead of failing at once
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+    metadata.create_all(engine, checkfirst=True)
+    logger.info(f"Using SQL storage at {engine.url.render_as_string(hide_password=True)}")
+    return Storage(
+        products=SqlProductStore(engine),
+        orders=SqlOrderStore(engine),
+        tickets=SqlTicketStore(engine),
+        stock=SqlStockStore(engine)
+    )
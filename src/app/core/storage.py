@@ -0,0 +1,172 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Items are plain dicts in the shape core.codec produces: Decimals for
+# numbers, ISO-8601 strings for datetimes.
+Item = dict
+
+
+class StorageError(Exception):
+    """A backend could not complete a read or write"""
+
+
+class ConditionFailed(StorageError):
+    """A conditional write found the item in a different state than expected"""
+
+
+class ProductStore(ABC):
+    @abstractmethod
+    def scan(self, fields: Optional[Sequence[str]] = None) -> List[Item]:
+        """Every product, optionally with only the given attributes"""
+
+    @abstractmethod
+    def get(self, product_id: str) -> Optional[Item]: ...
+
+    @abstractmethod
+    def batch_get(self, product_ids: Sequence[str], fields: Optional[Sequence[str]] = None) -> List[Item]:
+        """The products that exist among the ids, in one round trip where the backend allows"""
+
+    @abstractmethod
+    def put(self, item: Item) -> None: ...
+
+    @abstractmethod
+    def delete(self, product_id: str) -> None: ...
+
+
+class OrderStore(ABC):
+    @abstractmethod
+    def scan(self) -> List[Item]: ...
+
+    @abstractmethod
+    def get(self, order_id: str) -> Optional[Item]: ...
+
+    @abstractmethod
+    def by_user(self, user_email: str, fields: Optional[Sequence[str]] = None) -> List[Item]: ...
+
+    @abstractmethod
+    def put(self, item: Item) -> None: ...
+
+    @abstractmethod
+    def update_status(self, order_id: str, status: str, unless: Optional[str] = None) -> Optional[Item]:
+        """Set the status of an existing order and return the updated item.
+
+        With ``unless``, raise ConditionFailed instead of writing when the
+        order's current status is that value, atomically with the update.
+        """
+
+    @abstractmethod
+    def delete(self, order_id: str) -> None: ...
+
+
+class TicketStore(ABC):
+    @abstractmethod
+    def scan(self) -> List[Item]: ...
+
+    @abstractmethod
+    def get(self, ticket_id: str) -> Optional[Item]: ...
+
+    @abstractmethod
+    def get_version(self, ticket_id: str) -> Optional[str]:
+        """Only the ``updated_at`` of a ticket, or None if it does not exist"""
+
+    @abstractmethod
+    def by_status(self, status: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[Item], Optional[str]]:
+        """One page of tickets with a status, most recently updated first, and the cursor of the next page"""
+
+    @abstractmethod
+    def put(self, item: Item, expected_version: Optional[str] = None) -> None:
+        """Write a ticket; with ``expected_version``, raise ConditionFailed unless its stored updated_at matches"""
+
+    @abstractmethod
+    def closed_before(self, cutoff: str, limit: int) -> List[Item]:
+        """Up to ``limit`` full closed tickets last updated before cutoff, oldest first"""
+
+    @abstractmethod
+    def expire(self, ticket_id: str, expected_version: str, expires_at: int) -> bool:
+        """Replace an archived ticket with a stub that the table's TTL removes at ``expires_at`` (epoch seconds).
+
+        The stub has no status, so it leaves the status index at once.
+        Backends without TTL delete the ticket instead. Returns False if the
+        ticket was updated after ``expected_version``.
+        """
+
+    @abstractmethod
+    def delete(self, ticket_id: str) -> None: ...
+
+
+class StockStore(ABC):
+    """Counters behind services.stock_service.StockService"""
+
+    @abstractmethod
+    def read_config(self, product_id: str) -> Optional[Tuple[int, int]]:
+        """(shard count, stock on the product), or None if there is no such product"""
+
+    @abstractmethod
+    def read_shards(self, product_id: str) -> Dict[int, int]: ...
+
+    @abstractmethod
+    def adjust(self, product_id: str, shard: Optional[int], delta: int) -> bool:
+        """Add delta units to one counter (the product itself when shard is None).
+
+        Returns False without writing when a decrement would go below zero,
+        or when the counter is not the current home of the product's stock.
+        """
+
+    @abstractmethod
+    def write_layout(self, product_id: str, config: Tuple[int, int], current: Dict[int, int], counts: List[int], total: int) -> bool:
+        """Atomically replace the layout read as (config, current) with the given shard counts.
+
+        An empty ``counts`` keeps all ``total`` units on the product. Returns
+        False if a sale or another reshard got in first.
+        """
+
+    @abstractmethod
+    def write_snapshot(self, product_id: str, shards: int, total: int) -> None:
+        """Copy a sharded total onto the product, unless it has been resharded since"""
+
+
+@dataclass
+class Storage:
+    products: ProductStore
+    orders: OrderStore
+    tickets: TicketStore
+    stock: StockStore
+
+
+def _dynamodb() -> Storage:
+    from core.dynamodb_storage import create_dynamodb_storage
+    return create_dynamodb_storage()
+
+
+def _sql() -> Storage:
+    from core.sql_storage import create_sql_storage
+    return create_sql_storage(os.getenv("DATABASE_URL", "sqlite:///cloudmart.db"))
+
+
+# Backends are imported on first use so only the selected SDK is loaded
+BACKENDS: Dict[str, Callable[[], Storage]] = {
+    "dynamodb": _dynamodb,
+    "sql": _sql
+}
+
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    """The storage backend picked by STORAGE_BACKEND, shared by all services.
+
+    Services are built on several threads at once during warm-up, so the
+    backend is created under a lock; creating it twice would, for one,
+    race two schema creations on a fresh database.
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = BACKENDS[os.getenv("STORAGE_BACKEND", "dynamodb")]()
+    return _storage
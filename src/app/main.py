@@ -1,22 +1,82 @@
-from fastapi import FastAPI, Depends
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.templating import Jinja2Templates
 from core.security import verify_admin
+from core.aws import build_executor
+from core.limits import ProviderBusy
+from core.jobs import job_queue
+from core.assets import DynamicGZipMiddleware, PrecompressedStaticFiles
+from services.registry import registry
+from services.ticket_service import ARCHIVE_JOB
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Configure the runtime, then build services in the background.
+
+    The server accepts traffic right away; /health/ready reports when the
+    services are up so Kubernetes only routes requests once they are.
+    """
+    # Size the default executor to match the AWS connection pool
+    asyncio.get_running_loop().set_default_executor(build_executor())
+    # Start the workers that produce AI replies in the background
+    job_queue.start()
+    # Archive long-closed tickets periodically; enable on a single deployment only
+    archive_interval = float(os.getenv("TICKET_ARCHIVE_INTERVAL", "0"))
+    if archive_interval > 0:
+        job_queue.schedule(ARCHIVE_JOB, archive_interval)
+    warm_up = asyncio.create_task(registry.warm_up())
+    yield
+    warm_up.cancel()
+    # Let queued AI replies finish before the pod goes away
+    await job_queue.stop(timeout=float(os.getenv("JOB_DRAIN_TIMEOUT", "20")))
 
 app = FastAPI(
     title="CloudMart",
     description="MultiCloud E-commerce Platform",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+@app.get("/health/live", include_in_schema=False)
+async def liveness():
+    return {"status": "ok"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def readiness():
+    """503 until warm-up has finished and the required services are up"""
+    return ORJSONResponse(
+        status_code=200 if registry.ready else 503,
+        content={
+            "status": "ready" if registry.ready else "starting",
+            "warmUpSeconds": registry.warm_up_seconds,
+            "services": registry.status()
+        }
+    )
+
+@app.exception_handler(ProviderBusy)
+async def provider_busy(request: Request, exc: ProviderBusy):
+    """Shed load with 429 when an AI provider's queue is full, 503 when its circuit is open"""
+    return ORJSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# Compress HTML and JSON responses; static files are precompressed at build time
+app.add_middleware(DynamicGZipMiddleware, minimum_size=int(os.getenv("GZIP_MINIMUM_SIZE", "1000")))
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 
 # Templates
 templates = Jinja2Templates(directory="src/app/templates")
 
 # Import routers
-from api import products, orders, tickets, ai
+from api import products, orders, tickets, ai, cart
 from routes import web
 
 # Include web routes
@@ -30,6 +90,7 @@ app.include_router(
     dependencies=[Depends(verify_admin)]  # Protect all product endpoints
 )
 app.include_router(orders.router, prefix="/api/orders", tags=["orders"])
+app.include_router(cart.router, prefix="/api/cart", tags=["cart"])
 app.include_router(tickets.router, prefix="/api/tickets", tags=["tickets"])
 app.include_router(ai.router, prefix="/api/ai", tags=["ai"])
 
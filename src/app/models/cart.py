@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field, computed_field
+from typing import List
+from decimal import Decimal
+
+class CartItem(BaseModel):
+    productId: str
+    quantity: int = Field(..., ge=1)
+
+class CartQuoteRequest(BaseModel):
+    items: List[CartItem] = Field(..., min_length=1, max_length=100)
+
+class QuoteLine(BaseModel):
+    """A cart line priced from the catalog"""
+    productId: str
+    name: str
+    unitPrice: Decimal
+    quantity: int
+    lineTotal: Decimal
+    stock: int
+    available: bool
+
+class CartQuote(BaseModel):
+    lines: List[QuoteLine]
+    missing: List[str] = []
+    subtotal: Decimal
+    tax: Decimal
+    total: Decimal
+
+    @computed_field
+    @property
+    def valid(self) -> bool:
+        """Every product exists and has enough stock"""
+        return not self.missing and all(line.available for line in self.lines)
@@ -16,6 +16,16 @@ class Order(BaseModel):
     total: Decimal
     status: str = Field(default="Pending", pattern="^(Pending|Completed|Canceled)$")
     createdAt: datetime = Field(default_factory=datetime.utcnow)
+    # Set once the items' stock has been taken, so canceling returns it
+    stockReserved: bool = False
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class OrderSummary(BaseModel):
+    """Order history view of an order, without the owner's email"""
+    id: str
+    items: List[OrderItem]
+    total: Decimal
+    status: str
+    createdAt: datetime
\ No newline at end of file
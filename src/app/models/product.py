@@ -15,6 +15,16 @@ class ProductCreate(ProductBase):
 
 class Product(ProductBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    # Number of sharded stock counters; 0 keeps stock on the product item
+    stockShards: int = Field(default=0, ge=0)
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class ProductSummary(BaseModel):
+    """Catalog listing view of a product without its description"""
+    id: str
+    name: str
+    price: Decimal
+    stock: int
+    category: str
\ No newline at end of file
@@ -11,13 +11,34 @@ class Message(BaseModel):
 
 class Ticket(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    thread_id: str
+    # Created together with the first reply, in the background
+    thread_id: Optional[str] = None
     messages: List[Message] = Field(default_factory=list)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     status: str = Field(default="open", pattern="^(open|closed)$")
     sentimentScores: Optional[Dict[str, Decimal]] = None
     overallSentiment: Optional[str] = None
+    # True while the assistant's reply is still being generated
+    pending: bool = False
+    # Rolling summary of the oldest summarizedMessages messages, which runs no longer read
+    contextSummary: Optional[str] = None
+    summarizedMessages: int = 0
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class TicketSummary(BaseModel):
+    """Sidebar view of a ticket, read with a projection instead of the full conversation"""
+    id: str
+    thread_id: Optional[str] = None
+    status: str = "open"
+    updated_at: datetime
+    overallSentiment: Optional[str] = None
+    last_message: Optional[str] = None
+
+
+class TicketPage(BaseModel):
+    """One page of ticket summaries; pass next_cursor back to fetch the next page"""
+    tickets: List[TicketSummary]
+    next_cursor: Optional[str] = None
\ No newline at end of file
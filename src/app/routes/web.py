@@ -1,13 +1,30 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
 from services.order_service import OrderService
 from services.ticket_service import TicketService
 from services.product_service import ProductService
+from services.registry import get_order_service, get_product_service, get_ticket_service
 from core.security import verify_admin
+from core.assets import asset_built, asset_url
+from services.fragment_cache import fragment_cache, CATALOG, TICKETS
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+templates.env.globals.update(asset_url=asset_url, asset_built=asset_built)
+
+async def render_fragment(namespace: str, key, template: str, load) -> Markup:
+    """Render a partial template, reusing the HTML until the namespace version changes.
+
+    ``load`` is only awaited on a miss, so a hit also skips the data read.
+    """
+    html = fragment_cache.get(namespace, key)
+    if html is None:
+        version = fragment_cache.version(namespace)
+        html = templates.get_template(template).render(**await load())
+        fragment_cache.put(namespace, key, html, version)
+    return Markup(html)
 
 @router.get("/", response_class=HTMLResponse)
 async def home_page(request: Request):
@@ -18,10 +35,20 @@ async def home_page(request: Request):
     )
 
 @router.get("/tickets", response_class=HTMLResponse)
-async def tickets_page(request: Request, ticket_id: str = None):
-    """Serve the tickets list page with optional active ticket"""
-    ticket_service = TicketService()
-    tickets = await ticket_service.list_tickets()
+async def tickets_page(
+    request: Request,
+    ticket_id: str = None,
+    ticket_service: TicketService = Depends(get_ticket_service)
+):
+    """Serve the tickets list page with optional active ticket.
+
+    The list fragment is cached once for every visitor; the active ticket's
+    highlight is rendered by the page, so ticket_id is not part of the key.
+    """
+    async def load():
+        return {"tickets": await ticket_service.list_ticket_summaries()}
+
+    ticket_list = await render_fragment(TICKETS, None, "_ticket_list.html", load)
     active_ticket = None
     if ticket_id:
         active_ticket = await ticket_service.get_ticket(ticket_id)
@@ -29,7 +56,7 @@ async def tickets_page(request: Request, ticket_id: str = None):
         "tickets.html",
         {
             "request": request, 
-            "tickets": tickets,
+            "ticket_list": ticket_list,
             "active_ticket": active_ticket,
             "active_ticket_id": ticket_id
         }
@@ -49,13 +76,19 @@ async def ticket_conversation_page(request: Request, ticket_id: str):
     return RedirectResponse(url=f"/tickets?ticket_id={ticket_id}")
 
 @router.get("/products", response_class=HTMLResponse)
-async def products_page(request: Request, username: str = Depends(verify_admin)):
+async def products_page(
+    request: Request,
+    username: str = Depends(verify_admin),
+    product_service: ProductService = Depends(get_product_service)
+):
     """Serve the products management page (protected)"""
-    product_service = ProductService()
-    products = await product_service.list_products()
+    async def load():
+        return {"products": await product_service.list_products()}
+
+    product_grid = await render_fragment(CATALOG, None, "_product_grid.html", load)
     return templates.TemplateResponse(
         "products.html",
-        {"request": request, "products": products, "username": username}
+        {"request": request, "product_grid": product_grid, "username": username}
     )
 
 @router.get("/cart", response_class=HTMLResponse)
@@ -69,12 +102,12 @@ async def cart_page(request: Request):
 @router.get("/orders", response_class=HTMLResponse)
 async def orders_page(
     request: Request,
-    order_service: OrderService = Depends()
+    order_service: OrderService = Depends(get_order_service)
 ):
     """Serve the orders page"""
     # For demonstration purposes, use a mock user email
     mock_user_email = "demo@example.com"
-    user_orders = await order_service.get_user_orders(mock_user_email)
+    user_orders = await order_service.get_user_order_summaries(mock_user_email)
     
     return templates.TemplateResponse(
         "orders.html",
@@ -1,26 +1,62 @@
 import os
 import json
-import boto3
+from core.aws import get_client
+from core.storage import get_storage
 import base64
 import asyncio
+import concurrent.futures
+import threading
+import time
 import uuid
-from openai import OpenAI
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, List, Optional
 from datetime import datetime, timedelta
 from services.order_service import OrderService
+from services.answer_cache import answer_cache
+from services.context_policy import SUMMARY_INSTRUCTIONS, context_policy, turn_metrics
+from core.limits import CircuitOpen, ProviderBusy, guarded, guarded_stream
+from collections import OrderedDict
 import logging
-from boto3.session import Session
 from botocore.exceptions import ClientError
-from azure.ai.textanalytics import TextAnalyticsClient
-from azure.core.credentials import AzureKeyCredential
 from decimal import Decimal
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Answer with the other provider while one provider's circuit is open
+FAILOVER = os.getenv('AI_FAILOVER', 'false').lower() == 'true'
+FAILOVER_THREADS = 1000
+
+# Run states in which the thread accepts new messages again
+FINISHED_RUN_STATUSES = ("completed", "incomplete", "failed", "expired", "cancelled")
+
+ERROR_REPLY = "I apologize, but I encountered an error. Please try again."
+
+# Chunks of a streamed answer read ahead of a slow consumer before the read from Bedrock waits
+STREAM_BUFFER = int(os.getenv("BEDROCK_STREAM_BUFFER", "16"))
+# Ask the agent to stream its final answer instead of returning it as one chunk
+STREAM_FINAL_RESPONSE = os.getenv("BEDROCK_STREAM_FINAL_RESPONSE", "true").lower() == "true"
+_END = object()
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether an OpenAI call failed in a way that is worth retrying later"""
+    import openai
+    return isinstance(error, (
+        asyncio.TimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError
+    ))
+
+
 class AIService:
-    def __init__(self):
+    def __init__(self, order_service: Optional[OrderService] = None):
+        # Provider SDKs are slow to import, so only load them when the service is built
+        from openai import OpenAI
+        from azure.ai.textanalytics import TextAnalyticsClient
+        from azure.core.credentials import AzureKeyCredential
+
         # Initialize OpenAI
         try:
             self.openai = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
@@ -39,7 +75,11 @@ class AIService:
 
         # Initialize Bedrock
         try:
-            self.bedrock_client = boto3.client('bedrock-agent-runtime')
+            # Agent turns can take much longer than a DynamoDB call
+            self.bedrock_client = get_client(
+                'bedrock-agent-runtime',
+                read_timeout=float(os.getenv('BEDROCK_READ_TIMEOUT', '60'))
+            )
             self.agent_id = os.getenv('BEDROCK_AGENT_ID')
             self.agent_alias_id = os.getenv('BEDROCK_AGENT_ALIAS_ID')
             
@@ -70,16 +110,16 @@ class AIService:
             logger.error(f"Error initializing Azure Text Analytics client: {str(e)}")
             raise
         
-        # Initialize DynamoDB
+        # Sentiment records are kept next to the tickets
         try:
-            self.dynamodb = boto3.resource('dynamodb')
-            self.tickets_table = self.dynamodb.Table('cloudmart-tickets')
-            logger.info("DynamoDB client initialized successfully")
+            self.tickets_store = get_storage().tickets
         except Exception as e:
-            logger.error(f"Error initializing DynamoDB client: {str(e)}")
+            logger.error(f"Error initializing ticket storage: {str(e)}")
             raise
         
-        self.order_service = OrderService()
+        self.order_service = order_service or OrderService()
+        # OpenAI threads standing in for Bedrock sessions during failover
+        self._failover_threads: "OrderedDict[str, str]" = OrderedDict()
     
     def _create_assistant(self) -> str:
         """Create an OpenAI assistant for customer support"""
@@ -145,18 +185,84 @@ class AIService:
     async def create_conversation(self) -> str:
         """Create a new OpenAI conversation thread"""
         try:
-            thread = await asyncio.get_event_loop().run_in_executor(
+            thread = await guarded("openai", lambda: asyncio.get_event_loop().run_in_executor(
                 None,
                 lambda: self.openai.beta.threads.create()
-            )
+            ))
             return thread.id
+        except ProviderBusy:
+            raise
         except Exception as e:
             logger.error(f"Error creating OpenAI thread: {str(e)}")
             raise
 
-    async def send_message(self, thread_id: str, message: str) -> str:
-        """Send a message to OpenAI assistant and get response"""
+    async def send_message(
+        self,
+        thread_id: str,
+        message: str,
+        first_turn: bool = False,
+        summary: Optional[str] = None,
+        raise_transient: bool = False
+    ) -> str:
+        """Send a message to OpenAI assistant and get response.
+
+        Runs under the OpenAI limiter, and a duplicate of a message that is
+        still being answered on the same thread waits for the same run. The
+        run reads the thread as bounded by the context policy, plus the
+        ticket's summary of older turns if given. While the OpenAI circuit
+        is open the Bedrock agent answers instead, if failover is enabled.
+        Callers that retry on their own (background jobs) can ask for
+        transient OpenAI errors to be raised instead of answered with
+        ERROR_REPLY.
+        """
+        try:
+            return await guarded(
+                "openai",
+                lambda: self._send_message(thread_id, message, first_turn, summary),
+                key=(thread_id, message)
+            )
+        except CircuitOpen:
+            if not FAILOVER:
+                raise
+        except ProviderBusy:
+            raise
+        except Exception as e:
+            if raise_transient and _is_transient(e):
+                logger.warning(f"Transient error getting AI response: {str(e)}")
+                raise
+            logger.error(f"Error getting AI response: {str(e)}")
+            return ERROR_REPLY
+
+        logger.warning(f"OpenAI circuit open, answering thread {thread_id} with Bedrock")
+        try:
+            # Thread ids are valid session ids, so the thread keeps one Bedrock session
+            return await guarded(
+                "bedrock",
+                lambda: self._send_bedrock_message(thread_id, message),
+                key=(thread_id, message)
+            )
+        except ProviderBusy:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting failover response from Bedrock: {str(e)}")
+            return ERROR_REPLY
+
+    async def _send_message(self, thread_id: str, message: str, first_turn: bool, summary: Optional[str] = None) -> str:
+        """Run the assistant on a thread, handling tool calls.
+
+        The opening question of a conversation may be answered from the answer
+        cache; the exchange is still recorded on the thread so follow-ups keep
+        their context.
+        """
         try:
+            if first_turn:
+                cached = answer_cache.get(message)
+                if cached is not None:
+                    logger.info(f"Answered first turn of thread {thread_id} from cache")
+                    await self._record_exchange(thread_id, message, cached)
+                    return cached
+
+            started = time.perf_counter()
             # Create message
             await asyncio.get_event_loop().run_in_executor(
                 None,
@@ -172,81 +278,140 @@ class AIService:
                 None,
                 lambda: self.openai.beta.threads.runs.create(
                     thread_id=thread_id,
-                    assistant_id=self.assistant_id
+                    assistant_id=self.assistant_id,
+                    **context_policy.run_params(summary)
                 )
             )
 
             # Wait for completion and handle tool calls
-            while True:
-                run_status = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.openai.beta.threads.runs.retrieve(
-                        thread_id=thread_id,
-                        run_id=run.id
+            used_tools = False
+            run_status = None
+            try:
+                while True:
+                    run_status = await asyncio.get_event_loop().run_in_executor(
+                        None,
+                        lambda: self.openai.beta.threads.runs.retrieve(
+                            thread_id=thread_id,
+                            run_id=run.id
+                        )
                     )
-                )
                 
-                if run_status.status == "requires_action":
-                    tool_calls = run_status.required_action.submit_tool_outputs.tool_calls
-                    tool_outputs = []
-
-                    for tool_call in tool_calls:
-                        args = json.loads(tool_call.function.arguments)
-                        order_id = args.get("orderId")
-                        result = None
-
-                        try:
-                            # Check if order exists
-                            order = await self.order_service.get_order(order_id)
-                            if not order:
-                                result = f"Order with ID {order_id} does not exist."
-                            elif tool_call.function.name == "delete_order":
-                                success = await self.order_service.delete_order(order_id)
-                                result = f"Order {order_id} has been successfully deleted." if success else f"Failed to delete order {order_id}."
-                            elif tool_call.function.name == "cancel_order":
-                                updated_order = await self.order_service.cancel_order(order_id)
-                                result = f"Order {order_id} has been successfully canceled. New status: {updated_order.status}" if updated_order else f"Failed to cancel order {order_id}."
-                        except Exception as e:
-                            logger.error(f"Error processing order {order_id}: {str(e)}")
-                            result = f"An error occurred while processing the order: {str(e)}"
-
-                        tool_outputs.append({
-                            "tool_call_id": tool_call.id,
-                            "output": result
-                        })
-
-                    # Submit tool outputs back to the assistant
-                    if tool_outputs:
-                        await asyncio.get_event_loop().run_in_executor(
-                            None,
-                            lambda: self.openai.beta.threads.runs.submit_tool_outputs(
-                                thread_id=thread_id,
-                                run_id=run.id,
-                                tool_outputs=tool_outputs
+                    if run_status.status == "requires_action":
+                        used_tools = True
+                        tool_calls = run_status.required_action.submit_tool_outputs.tool_calls
+                        tool_outputs = []
+
+                        for tool_call in tool_calls:
+                            args = json.loads(tool_call.function.arguments)
+                            order_id = args.get("orderId")
+                            result = None
+
+                            try:
+                                # Check if order exists
+                                order = await self.order_service.get_order(order_id)
+                                if not order:
+                                    result = f"Order with ID {order_id} does not exist."
+                                elif tool_call.function.name == "delete_order":
+                                    success = await self.order_service.delete_order(order_id)
+                                    result = f"Order {order_id} has been successfully deleted." if success else f"Failed to delete order {order_id}."
+                                elif tool_call.function.name == "cancel_order":
+                                    updated_order = await self.order_service.cancel_order(order_id)
+                                    result = f"Order {order_id} has been successfully canceled. New status: {updated_order.status}" if updated_order else f"Failed to cancel order {order_id}."
+                            except Exception as e:
+                                logger.error(f"Error processing order {order_id}: {str(e)}")
+                                result = f"An error occurred while processing the order: {str(e)}"
+
+                            tool_outputs.append({
+                                "tool_call_id": tool_call.id,
+                                "output": result
+                            })
+
+                        # Submit tool outputs back to the assistant
+                        if tool_outputs:
+                            await asyncio.get_event_loop().run_in_executor(
+                                None,
+                                lambda: self.openai.beta.threads.runs.submit_tool_outputs(
+                                    thread_id=thread_id,
+                                    run_id=run.id,
+                                    tool_outputs=tool_outputs
+                                )
                             )
-                        )
-                elif run_status.status == "completed":
-                    break
-                elif run_status.status == "failed":
-                    logger.error(f"Assistant run failed: {run_status.last_error}")
-                    return "I apologize, but I encountered an error while processing your request. Please try again."
+                    elif run_status.status == "completed":
+                        break
+                    elif run_status.status == "incomplete":
+                        # Stopped at the token budget; the partial reply is still on the thread
+                        logger.warning(f"Assistant run on thread {thread_id} incomplete: {run_status.incomplete_details}")
+                        break
+                    elif run_status.status in ("failed", "expired", "cancelled"):
+                        # Raise so the failure counts against the OpenAI circuit
+                        raise RuntimeError(f"Assistant run {run_status.status}: {run_status.last_error}")
                 
-                await asyncio.sleep(1)
-            
+                    await asyncio.sleep(1)
+            except BaseException:
+                # Timed out, cancelled or failed mid-run: an active run would make the
+                # thread's next message fail with "run is active", so stop it
+                if run_status is None or run_status.status not in FINISHED_RUN_STATUSES:
+                    asyncio.get_event_loop().run_in_executor(None, self._cancel_run, thread_id, run.id)
+                raise
+
+            turn_metrics.record(thread_id, (time.perf_counter() - started) * 1000, run_status.usage, run_status.status)
+
             # Get the assistant's response
             messages = await asyncio.get_event_loop().run_in_executor(
                 None,
-                lambda: self.openai.beta.threads.messages.list(thread_id=thread_id)
+                lambda: self.openai.beta.threads.messages.list(thread_id=thread_id, limit=1)
             )
-            for message in messages.data:
-                if message.role == "assistant":
-                    return message.content[0].text.value
+            for reply in messages.data:
+                if reply.role == "assistant":
+                    answer = reply.content[0].text.value
+                    # Tool calls act on a customer's own orders, so those answers never apply to anyone else,
+                    # and an incomplete run's reply is cut off at the token budget
+                    if first_turn and not used_tools and run_status.status == "completed":
+                        answer_cache.set(message, answer)
+                    return answer
             
             return "I apologize, but I couldn't generate a response. Please try again."
             
         except Exception as e:
             logger.error(f"Error getting AI response: {str(e)}")
-            return "I apologize, but I encountered an error. Please try again."
+            raise
+
+    async def summarize(self, previous: Optional[str], messages: List[Dict[str, str]]) -> str:
+        """Fold messages into the rolling summary of a conversation"""
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        prompt = f"Summary so far: {previous}\n\nNew messages:\n{transcript}" if previous else transcript
+        completion = await guarded("openai", lambda: asyncio.get_event_loop().run_in_executor(
+            None,
+            lambda: self.openai.chat.completions.create(
+                model=context_policy.summary_model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=context_policy.summary_tokens
+            )
+        ))
+        turn_metrics.record_summary()
+        return completion.choices[0].message.content.strip()
+
+    def _cancel_run(self, thread_id: str, run_id: str) -> None:
+        try:
+            self.openai.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+            logger.info(f"Cancelled abandoned run {run_id} on thread {thread_id}")
+        except Exception as e:
+            logger.error(f"Error cancelling run {run_id} on thread {thread_id}: {str(e)}")
+
+    async def _record_exchange(self, thread_id: str, question: str, answer: str) -> None:
+        """Append a question and its cached answer to a thread without starting a run"""
+        for role, content in (("user", question), ("assistant", answer)):
+            await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.openai.beta.threads.messages.create(
+                    thread_id=thread_id,
+                    role=role,
+                    content=content
+                )
+            )
 
     # Bedrock Methods
     async def create_bedrock_conversation(self) -> str:
@@ -254,7 +419,125 @@ class AIService:
         return str(int(datetime.now().timestamp() * 1000))
 
     async def send_bedrock_message(self, session_id: str, message: str) -> str:
-        """Send a message to Bedrock agent and get response"""
+        """Send a message to Bedrock agent and get response, failing over to OpenAI while its circuit is open"""
+        try:
+            return await guarded(
+                "bedrock",
+                lambda: self._send_bedrock_message(session_id, message),
+                key=(session_id, message)
+            )
+        except CircuitOpen:
+            if not FAILOVER:
+                raise
+
+        logger.warning(f"Bedrock circuit open, answering session {session_id} with OpenAI")
+        thread_id = await self._failover_thread(session_id)
+        return await guarded(
+            "openai",
+            lambda: self._send_message(thread_id, message, False),
+            key=(thread_id, message)
+        )
+
+    async def _failover_thread(self, session_id: str) -> str:
+        """OpenAI thread that carries a Bedrock session while Bedrock is unavailable"""
+        thread_id = self._failover_threads.get(session_id)
+        if thread_id is None:
+            thread_id = await self.create_conversation()
+            self._failover_threads[session_id] = thread_id
+            if len(self._failover_threads) > FAILOVER_THREADS:
+                self._failover_threads.popitem(last=False)
+        return thread_id
+
+    async def stream_bedrock_message(self, session_id: str, message: str) -> AsyncIterator[str]:
+        """Yield the Bedrock agent's answer as it is generated.
+
+        The event stream is read on an executor thread that hands chunks
+        over a bounded queue, so a consumer that falls behind pauses the
+        read from Bedrock instead of the answer piling up in memory.
+        Closing the generator (e.g. the user cancels) stops the read and
+        frees the provider slot. While the Bedrock circuit is open and
+        failover is enabled, the failover answer is yielded in one piece.
+        """
+        try:
+            async with guarded_stream("bedrock") as timer:
+                loop = asyncio.get_running_loop()
+                params = {
+                    'agentId': self.agent_id,
+                    'agentAliasId': self.agent_alias_id,
+                    'sessionId': session_id,
+                    'inputText': message
+                }
+                if STREAM_FINAL_RESPONSE:
+                    params['streamingConfigurations'] = {'streamFinalResponse': True}
+                response = await loop.run_in_executor(None, lambda: self.bedrock_client.invoke_agent(**params))
+                chunks: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER)
+                stop = threading.Event()
+                loop.run_in_executor(None, self._pump_stream, response['completion'], chunks, loop, stop)
+                try:
+                    while True:
+                        chunk = await chunks.get()
+                        if chunk is _END:
+                            break
+                        if isinstance(chunk, Exception):
+                            raise chunk
+                        timer.first_chunk()
+                        yield chunk
+                finally:
+                    stop.set()
+                    # Unblocks a read still waiting on Bedrock
+                    response['completion'].close()
+            return
+        except CircuitOpen:
+            if not FAILOVER:
+                raise
+        yield await self.send_bedrock_message(session_id, message)
+
+    @staticmethod
+    def _pump_stream(stream, chunks: asyncio.Queue, loop: asyncio.AbstractEventLoop, stop: threading.Event) -> None:
+        """Executor side of stream_bedrock_message: read events until the end or until stopped"""
+        def hand_over(item) -> bool:
+            future = asyncio.run_coroutine_threadsafe(chunks.put(item), loop)
+            while True:
+                try:
+                    future.result(timeout=0.25)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+
+        try:
+            for event in stream:
+                if stop.is_set():
+                    break
+                text = AIService._chunk_text(event)
+                if text and not hand_over(text):
+                    break
+            else:
+                hand_over(_END)
+        except Exception as e:
+            if not stop.is_set():
+                hand_over(e)
+        finally:
+            stream.close()
+
+    @staticmethod
+    def _chunk_text(event) -> str:
+        """Text carried by one event of an agent's completion stream"""
+        # The event is already a dictionary containing the chunk
+        if isinstance(event, dict) and 'chunk' in event:
+            chunk = event['chunk']
+            if isinstance(chunk, dict) and 'bytes' in chunk:
+                # The bytes field contains the actual message as a bytes object
+                message_bytes = chunk['bytes']
+                if isinstance(message_bytes, bytes):
+                    return message_bytes.decode('utf-8')
+                return str(message_bytes)
+            elif isinstance(chunk, str):
+                return chunk
+        return ""
+
+    async def _send_bedrock_message(self, session_id: str, message: str) -> str:
         try:
             logger.info(f"Sending message to Bedrock agent: {message}")
             
@@ -281,19 +564,7 @@ class AIService:
             for event in event_stream:
                 # Log raw event for debugging
                 logger.info(f"Raw event: {event}")
-                
-                # The event is already a dictionary containing the chunk
-                if isinstance(event, dict) and 'chunk' in event:
-                    chunk = event['chunk']
-                    if isinstance(chunk, dict) and 'bytes' in chunk:
-                        # The bytes field contains the actual message as a bytes object
-                        message_bytes = chunk['bytes']
-                        if isinstance(message_bytes, bytes):
-                            full_message += message_bytes.decode('utf-8')
-                        else:
-                            full_message += str(message_bytes)
-                    elif isinstance(chunk, str):
-                        full_message += chunk
+                full_message += self._chunk_text(event)
             
             logger.info(f"Final full message: {full_message}")
             
@@ -320,13 +591,13 @@ class AIService:
                 raise ValueError("No user messages found in thread")
 
             # Analyze sentiment
-            results = await asyncio.get_event_loop().run_in_executor(
+            results = await guarded("azure", lambda: asyncio.get_event_loop().run_in_executor(
                 None,
                 lambda: self.text_analytics_client.analyze_sentiment(
                     documents=user_messages,
                     show_opinion_mining=True
                 )
-            )
+            ))
 
             # Calculate average sentiment
             sentiment_scores = []
@@ -363,7 +634,7 @@ class AIService:
             else:
                 overall_sentiment = 'neutral'
 
-            # Prepare item for DynamoDB
+            # Prepare the sentiment record
             item = {
                 'id': str(uuid.uuid4())[:8],
                 'threadId': thread['id'],
@@ -373,10 +644,10 @@ class AIService:
                 'createdAt': datetime.now().isoformat()
             }
 
-            # Save to DynamoDB
+            # Save the record
             await asyncio.get_event_loop().run_in_executor(
                 None,
-                lambda: self.tickets_table.put_item(Item=item)
+                lambda: self.tickets_store.put(item)
             )
 
             return {
@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Tuple
+import logging
+import os
+import re
+import threading
+import time
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9']+")
+# Order ids (8 hex characters), ticket ids (uuid4), emails and long numbers
+# make a question about one customer's data
+_PERSONAL = re.compile(
+    r"\b[0-9a-f]{8}(?:-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})?\b|\S+@\S+|\d{4,}",
+    re.IGNORECASE
+)
+
+
+def normalize(question: str) -> Tuple[str, FrozenSet[str]]:
+    """Lowercase, drop punctuation and collapse whitespace; also return the word set"""
+    words = _WORD.findall(question.lower())
+    return " ".join(words), frozenset(words)
+
+
+def similarity(first: FrozenSet[str], second: FrozenSet[str]) -> float:
+    """Jaccard similarity of two word sets"""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class AnswerCache:
+    """Answers to common first-turn support questions, matched on normalized text.
+
+    An exact match of the normalized question is a dictionary lookup; failing
+    that, the closest cached question by word overlap is used if it reaches
+    ``threshold``. Questions that mention an order id, email or other number
+    are never cached, and callers must not store answers that involved tool
+    calls, since those depend on (and change) a customer's own data.
+    """
+
+    def __init__(self, ttl: float = 3600, maxsize: int = 500, threshold: float = 0.85):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._entries: "OrderedDict[str, Tuple[float, FrozenSet[str], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def cacheable(self, question: str) -> bool:
+        return self.enabled and not _PERSONAL.search(question)
+
+    def get(self, question: str) -> Optional[str]:
+        if not self.cacheable(question):
+            with self._lock:
+                self.bypassed += 1
+            return None
+        key, words = normalize(question)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                best_score = 0.0
+                for candidate_key, candidate in self._entries.items():
+                    score = similarity(words, candidate[1])
+                    if score > best_score:
+                        key, entry, best_score = candidate_key, candidate, score
+                if best_score < self.threshold:
+                    entry = None
+            if entry is not None and entry[0] < now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, question: str, answer: str) -> None:
+        if not self.cacheable(question):
+            return
+        key, words = normalize(question)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, words, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+
+
+answer_cache = AnswerCache(
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    maxsize=int(os.getenv("ANSWER_CACHE_SIZE", "500")),
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85"))
+)
@@ -0,0 +1,160 @@
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import os
+import time
+
+from models.product import Product
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SORT_FIELDS = ("price", "name", "stock")
+
+
+class CatalogIndex:
+    """In-memory index of the product catalog for faceted queries.
+
+    Keeps per-category buckets, an in-stock set and a price-sorted array so
+    filters resolve to candidate ids without touching DynamoDB. Product writes
+    go through upsert/remove and stock changes made by this pod through
+    adjust_stock/set_stock; a full rebuild happens only when the index is
+    empty or older than ``max_age`` seconds (to pick up writes made by other
+    pods).
+    """
+
+    def __init__(self, max_age: float = 300):
+        self.max_age = max_age
+        self.built_at: Optional[float] = None
+        self.products: Dict[str, Product] = {}
+        self.by_category: Dict[str, Set[str]] = {}
+        self.in_stock: Set[str] = set()
+        self.by_price: List[Tuple[Decimal, str]] = []
+        self.search_text: Dict[str, str] = {}
+
+    @property
+    def is_stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > self.max_age
+
+    def rebuild(self, products: Iterable[Product]) -> None:
+        """Replace the whole index with a fresh snapshot of the catalog"""
+        self.products = {}
+        self.by_category = {}
+        self.in_stock = set()
+        self.by_price = []
+        self.search_text = {}
+        for product in products:
+            self._add(product)
+        self.by_price.sort()
+        self.built_at = time.monotonic()
+        logger.info(f"Catalog index rebuilt with {len(self.products)} products")
+
+    def upsert(self, product: Product) -> None:
+        """Add a product or replace its previous version"""
+        if self.built_at is None:
+            return  # Nothing indexed yet; the first query rebuilds from the table
+        self.remove(product.id)
+        self._add(product, keep_sorted=True)
+
+    def remove(self, product_id: str) -> None:
+        product = self.products.pop(product_id, None)
+        if product is None:
+            return
+        bucket = self.by_category.get(product.category.lower())
+        if bucket is not None:
+            bucket.discard(product_id)
+            if not bucket:
+                del self.by_category[product.category.lower()]
+        self.in_stock.discard(product_id)
+        self.search_text.pop(product_id, None)
+        position = bisect_left(self.by_price, (product.price, product_id))
+        if position < len(self.by_price) and self.by_price[position] == (product.price, product_id):
+            del self.by_price[position]
+
+    def adjust_stock(self, product_id: str, delta: int) -> None:
+        """Apply a sale (negative delta) or restock to an indexed product"""
+        product = self.products.get(product_id)
+        if product is not None:
+            self.set_stock(product_id, product.stock + delta)
+
+    def set_stock(self, product_id: str, stock: int) -> None:
+        product = self.products.get(product_id)
+        if product is None:
+            return
+        self.products[product_id] = product.model_copy(update={"stock": stock})
+        if stock > 0:
+            self.in_stock.add(product_id)
+        else:
+            self.in_stock.discard(product_id)
+
+    def _add(self, product: Product, keep_sorted: bool = False) -> None:
+        self.products[product.id] = product
+        self.by_category.setdefault(product.category.lower(), set()).add(product.id)
+        if product.stock > 0:
+            self.in_stock.add(product.id)
+        self.search_text[product.id] = f"{product.name} {product.description}".lower()
+        if keep_sorted:
+            insort(self.by_price, (product.price, product.id))
+        else:
+            self.by_price.append((product.price, product.id))
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        in_stock: Optional[bool] = None,
+        text: Optional[str] = None,
+        sort: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> List[Product]:
+        """Filter and sort the catalog.
+
+        ``sort`` is one of SORT_FIELDS, optionally prefixed with ``-`` for
+        descending order. Without a sort, results come back in price order.
+        """
+        # Walk the price array between the bounds; this is also the price sort order
+        low = 0 if min_price is None else bisect_left(self.by_price, (min_price, ""))
+        high = len(self.by_price) if max_price is None else bisect_right(self.by_price, (max_price, "\uffff"))
+        price_range = self.by_price[low:high]
+
+        allowed: Optional[Set[str]] = None
+        if category is not None:
+            allowed = self.by_category.get(category.lower(), set())
+        if in_stock is not None:
+            if in_stock:
+                allowed = self.in_stock if allowed is None else allowed & self.in_stock
+            else:
+                out_of_stock = set(self.products) - self.in_stock
+                allowed = out_of_stock if allowed is None else allowed - self.in_stock
+
+        terms = text.lower().split() if text else []
+        ids = []
+        for _, product_id in price_range:
+            if allowed is not None and product_id not in allowed:
+                continue
+            if terms:
+                haystack = self.search_text[product_id]
+                if not all(term in haystack for term in terms):
+                    continue
+            ids.append(product_id)
+
+        results = [self.products[product_id] for product_id in ids]
+        if sort:
+            descending = sort.startswith("-")
+            field = sort.lstrip("-")
+            if field == "price":
+                if descending:
+                    results.reverse()
+            else:
+                key = (lambda p: p.name.lower()) if field == "name" else (lambda p: getattr(p, field))
+                results.sort(key=key, reverse=descending)
+
+        end = None if limit is None else offset + limit
+        return results[offset:end]
+
+
+catalog_index = CatalogIndex(max_age=float(os.getenv("CATALOG_INDEX_MAX_AGE", "300")))
@@ -0,0 +1,126 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import logging
+import os
+import statistics
+import threading
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize this customer support conversation for the agent who continues it. "
+    "Keep order ids, product names, what the customer asked for, what was promised "
+    "and anything still unresolved. Write at most a short paragraph."
+)
+
+
+@dataclass
+class ContextPolicy:
+    """How much of a support thread an assistant run may read.
+
+    Runs see the last ``window`` messages of the thread (``truncation`` is
+    ``last_messages``) or let OpenAI drop old messages to fit (``auto``),
+    within ``max_prompt_tokens``. Messages that fall outside the window are
+    folded into a rolling summary stored on the ticket, refreshed once
+    ``summarize_every`` more messages have left it, and given to each run
+    as additional instructions.
+    """
+    truncation: str = "last_messages"
+    window: int = 12
+    max_prompt_tokens: Optional[int] = 8000
+    max_completion_tokens: Optional[int] = 1000
+    summarize_every: int = 6
+    summary_model: str = "gpt-4o-mini"
+    summary_tokens: int = 300
+
+    @classmethod
+    def from_env(cls) -> "ContextPolicy":
+        def optional_int(name: str, default: str) -> Optional[int]:
+            value = int(os.getenv(name, default))
+            return value if value > 0 else None
+
+        return cls(
+            truncation=os.getenv("AI_TRUNCATION_STRATEGY", "last_messages"),
+            window=int(os.getenv("AI_CONTEXT_MESSAGES", "12")),
+            max_prompt_tokens=optional_int("AI_MAX_PROMPT_TOKENS", "8000"),
+            max_completion_tokens=optional_int("AI_MAX_COMPLETION_TOKENS", "1000"),
+            summarize_every=int(os.getenv("AI_SUMMARIZE_EVERY", "6")),
+            summary_model=os.getenv("AI_SUMMARY_MODEL", "gpt-4o-mini"),
+            summary_tokens=int(os.getenv("AI_SUMMARY_TOKENS", "300"))
+        )
+
+    def run_params(self, summary: Optional[str] = None) -> Dict[str, Any]:
+        """Keyword arguments for ``threads.runs.create``"""
+        params: Dict[str, Any] = {}
+        if self.truncation == "last_messages":
+            params["truncation_strategy"] = {"type": "last_messages", "last_messages": self.window}
+        elif self.truncation == "auto":
+            params["truncation_strategy"] = {"type": "auto"}
+        if self.max_prompt_tokens:
+            params["max_prompt_tokens"] = self.max_prompt_tokens
+        if self.max_completion_tokens:
+            params["max_completion_tokens"] = self.max_completion_tokens
+        if summary:
+            params["additional_instructions"] = f"Summary of the earlier part of this conversation: {summary}"
+        return params
+
+    def unsummarized(self, message_count: int, summarized: int) -> int:
+        """Messages outside the window that the ticket's summary does not cover yet"""
+        if self.truncation != "last_messages":
+            return 0
+        return max(0, message_count - self.window - summarized)
+
+    def needs_summary(self, message_count: int, summarized: int) -> bool:
+        return self.summarize_every > 0 and self.unsummarized(message_count, summarized) >= self.summarize_every
+
+
+class TurnMetrics:
+    """Token usage and latency of recent assistant turns on this instance"""
+
+    def __init__(self, size: int = 500):
+        self._turns = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.incomplete = 0
+        self.summaries = 0
+
+    def record(self, thread_id: str, latency_ms: float, usage: Any, status: str) -> None:
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        with self._lock:
+            self.turns += 1
+            if status == "incomplete":
+                self.incomplete += 1
+            self._turns.append((latency_ms, prompt_tokens, completion_tokens))
+        logger.info(
+            f"Turn on thread {thread_id}: {prompt_tokens} prompt + {completion_tokens} completion tokens "
+            f"in {latency_ms:.0f} ms ({status})"
+        )
+
+    def record_summary(self) -> None:
+        with self._lock:
+            self.summaries += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            turns: List[tuple] = list(self._turns)
+            stats = {"turns": self.turns, "incomplete": self.incomplete, "summaries": self.summaries}
+        if not turns:
+            return stats
+        latencies = sorted(turn[0] for turn in turns)
+        prompt_tokens = [turn[1] for turn in turns]
+        stats.update({
+            "latencyP50Ms": round(statistics.median(latencies)),
+            "latencyP95Ms": round(latencies[int(0.95 * (len(latencies) - 1))]),
+            "promptTokensAvg": round(statistics.mean(prompt_tokens)),
+            "promptTokensMax": max(prompt_tokens),
+            "completionTokensAvg": round(statistics.mean(turn[2] for turn in turns))
+        })
+        return stats
+
+
+context_policy = ContextPolicy.from_env()
+turn_metrics = TurnMetrics()
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from models.ticket import Ticket
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ConversationCache:
+    """Bounded LRU of full tickets for conversations that are being worked on.
+
+    TicketService writes every saved ticket through, so the pod that handles
+    a conversation always holds its latest state. Another pod may still
+    update the same ticket, so an entry is only trusted without checking for
+    ``fresh_for`` seconds; after that the caller compares ``updated_at``
+    against a projected read of that single attribute, which is far cheaper
+    than fetching the whole message history again.
+    """
+
+    def __init__(self, maxsize: int = 256, fresh_for: float = 5):
+        self.maxsize = maxsize
+        self.fresh_for = fresh_for
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Ticket]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ticket_id: str) -> Tuple[Optional[Ticket], bool]:
+        """Return (ticket, fresh); fresh tickets can be served without a version check"""
+        with self._lock:
+            entry = self._entries.get(ticket_id)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(ticket_id)
+            checked_at, ticket = entry
+            fresh = time.monotonic() - checked_at < self.fresh_for
+            if fresh:
+                self.hits += 1
+            return ticket.model_copy(deep=True), fresh
+
+    def confirm(self, ticket_id: str, updated_at: datetime) -> Optional[Ticket]:
+        """Return the cached ticket if it is still at the given version, else evict it"""
+        with self._lock:
+            entry = self._entries.get(ticket_id)
+            if entry is None or entry[1].updated_at != updated_at:
+                self._entries.pop(ticket_id, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries[ticket_id] = (time.monotonic(), entry[1])
+            return entry[1].model_copy(deep=True)
+
+    def put(self, ticket: Ticket) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[ticket.id] = (time.monotonic(), ticket.model_copy(deep=True))
+            self._entries.move_to_end(ticket.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, ticket_id: str) -> None:
+        with self._lock:
+            self._entries.pop(ticket_id, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+
+
+conversation_cache = ConversationCache(
+    maxsize=int(os.getenv("CONVERSATION_CACHE_SIZE", "256")),
+    fresh_for=float(os.getenv("CONVERSATION_CACHE_FRESH_FOR", "5"))
+)
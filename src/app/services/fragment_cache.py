@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CATALOG = "catalog"
+TICKETS = "tickets"
+
+
+class FragmentCache:
+    """Bounded cache of rendered HTML fragments, versioned per namespace.
+
+    Each namespace (the catalog, the ticket list) has a version number that
+    the owning service bumps on every write, and a fragment is only served
+    while it was rendered at the current version. Writes made by other pods
+    do not bump the local version, so entries also expire after ``ttl``
+    seconds. Size is bounded by entry count and by total bytes; the least
+    recently used fragments go first.
+    """
+
+    def __init__(self, maxsize: int = 128, max_bytes: int = 4 * 1024 * 1024, ttl: float = 30):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._versions: Dict[str, int] = {}
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[int, float, str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace: str) -> None:
+        """Mark every fragment of the namespace as out of date"""
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    def get(self, namespace: str, key: Hashable = None) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            version, rendered_at, html, _ = entry
+            if version != self._versions.get(namespace, 0) or time.monotonic() - rendered_at > self.ttl:
+                self._drop((namespace, key))
+                self.misses += 1
+                return None
+            self._entries.move_to_end((namespace, key))
+            self.hits += 1
+            return html
+
+    def put(self, namespace: str, key: Hashable, html: str, version: int) -> None:
+        """Store a fragment rendered from data read at ``version``.
+
+        Callers take the version before loading the data, so a write that
+        lands while the fragment is being rendered leaves it already stale.
+        """
+        size = len(html.encode())
+        if self.maxsize <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop((namespace, key))
+            self._entries[(namespace, key)] = (version, time.monotonic(), html, size)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, entry_key: Tuple[str, Hashable]) -> None:
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self.bytes -= entry[3]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "versions": dict(self._versions)
+            }
+
+
+fragment_cache = FragmentCache(
+    maxsize=int(os.getenv("FRAGMENT_CACHE_SIZE", "128")),
+    max_bytes=int(os.getenv("FRAGMENT_CACHE_MAX_BYTES", str(4 * 1024 * 1024))),
+    ttl=float(os.getenv("FRAGMENT_CACHE_TTL", "30"))
+)
@@ -0,0 +1,198 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import os
+import time
+
+import numpy as np
+
+from models.order import Order
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATUSES = ("Pending", "Completed", "Canceled")
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+CANCELED = STATUS_CODES["Canceled"]
+
+
+def _cents(amount: Decimal) -> int:
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+class _Columns:
+    """A set of equally long NumPy arrays that grow by doubling"""
+
+    def __init__(self, dtypes: Dict[str, Any], capacity: int = 1024):
+        self.size = 0
+        self.arrays = {name: np.zeros(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+
+    def append(self, **values) -> int:
+        capacity = len(next(iter(self.arrays.values())))
+        if self.size == capacity:
+            for name, array in self.arrays.items():
+                grown = np.zeros(capacity * 2, dtype=array.dtype)
+                grown[:capacity] = array
+                self.arrays[name] = grown
+        row = self.size
+        for name, value in values.items():
+            self.arrays[name][row] = value
+        self.size += 1
+        return row
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name][:self.size]
+
+
+class OrderAnalytics:
+    """Columnar in-memory snapshot of the orders table for admin dashboards.
+
+    Orders are stored one row per order (day, status, total, basket size) and
+    one row per line item (order row, product, quantity, line revenue), with
+    amounts in integer cents. OrderService feeds every write through
+    upsert/remove, so the snapshot only needs a full scan when it is empty or
+    older than ``max_age`` seconds.
+    """
+
+    def __init__(self, max_age: float = 900):
+        self.max_age = max_age
+        self.built_at: Optional[float] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.order_rows: Dict[str, int] = {}
+        self.product_ids: List[str] = []
+        self.product_codes: Dict[str, int] = {}
+        self.orders = _Columns({
+            "day": np.int32,
+            "status": np.int8,
+            "total_cents": np.int64,
+            "basket_size": np.int32,
+            "live": np.bool_
+        })
+        self.lines = _Columns({
+            "order_row": np.int32,
+            "product": np.int32,
+            "quantity": np.int32,
+            "revenue_cents": np.int64
+        })
+
+    @property
+    def is_stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > self.max_age
+
+    def rebuild(self, orders: Iterable[Order]) -> None:
+        """Replace the snapshot with a full copy of the orders table"""
+        self._reset()
+        for order in orders:
+            self._append(order)
+        self.built_at = time.monotonic()
+        logger.info(f"Order analytics rebuilt with {len(self.order_rows)} orders")
+
+    def upsert(self, order: Order) -> None:
+        """Record a new order or an updated one (items never change after creation)"""
+        if self.built_at is None:
+            return  # The first stats request scans the table anyway
+        row = self.order_rows.get(order.id)
+        if row is None:
+            self._append(order)
+            return
+        self.orders.arrays["status"][row] = STATUS_CODES.get(order.status, CANCELED)
+        self.orders.arrays["total_cents"][row] = _cents(order.total)
+        self.orders.arrays["live"][row] = True
+
+    def remove(self, order_id: str) -> None:
+        row = self.order_rows.get(order_id)
+        if row is not None:
+            self.orders.arrays["live"][row] = False
+
+    def _product_code(self, product_id: str) -> int:
+        code = self.product_codes.get(product_id)
+        if code is None:
+            code = self.product_codes[product_id] = len(self.product_ids)
+            self.product_ids.append(product_id)
+        return code
+
+    def _append(self, order: Order) -> None:
+        row = self.orders.append(
+            day=order.createdAt.date().toordinal(),
+            status=STATUS_CODES.get(order.status, CANCELED),
+            total_cents=_cents(order.total),
+            basket_size=sum(item.quantity for item in order.items),
+            live=True
+        )
+        self.order_rows[order.id] = row
+        for item in order.items:
+            self.lines.append(
+                order_row=row,
+                product=self._product_code(item.productId),
+                quantity=item.quantity,
+                revenue_cents=_cents(item.price) * item.quantity
+            )
+
+    def stats(self, days: Optional[int] = None, top: int = 10) -> Dict[str, Any]:
+        """Compute revenue and volume aggregates over live orders.
+
+        ``days`` limits the window to the most recent N calendar days. Canceled
+        orders count toward the per-status breakdown only.
+        """
+        day = self.orders["day"]
+        status = self.orders["status"]
+        total = self.orders["total_cents"]
+        mask = self.orders["live"].copy()
+        if days is not None:
+            mask &= day > datetime.utcnow().date().toordinal() - days
+        by_status_mask = mask.copy()
+        mask &= status != CANCELED
+
+        # Revenue per day
+        days_present, day_index = np.unique(day[mask], return_inverse=True)
+        revenue_by_day = np.bincount(day_index, weights=total[mask], minlength=len(days_present))
+
+        # Counts and revenue per status
+        status_counts = np.bincount(status[by_status_mask], minlength=len(STATUSES))
+        status_revenue = np.bincount(status[by_status_mask], weights=total[by_status_mask], minlength=len(STATUSES))
+
+        # Units and revenue per product, only for lines of counted orders
+        line_mask = mask[self.lines["order_row"]]
+        products = self.lines["product"][line_mask]
+        units = np.bincount(products, weights=self.lines["quantity"][line_mask], minlength=len(self.product_ids))
+        product_revenue = np.bincount(products, weights=self.lines["revenue_cents"][line_mask], minlength=len(self.product_ids))
+        top_codes = np.argsort(units)[::-1][:top]
+        top_codes = top_codes[units[top_codes] > 0]
+
+        # Basket size distribution
+        baskets = self.orders["basket_size"][mask]
+        basket_hist = np.bincount(baskets) if len(baskets) else np.zeros(0, dtype=np.int64)
+
+        return {
+            "orders": int(mask.sum()),
+            "revenue": float(total[mask].sum()) / 100,
+            "revenueByDay": {
+                date.fromordinal(int(d)).isoformat(): float(r) / 100
+                for d, r in zip(days_present, revenue_by_day)
+            },
+            "byStatus": {
+                name: {"orders": int(status_counts[code]), "revenue": float(status_revenue[code]) / 100}
+                for code, name in enumerate(STATUSES)
+            },
+            "topProducts": [
+                {
+                    "productId": self.product_ids[code],
+                    "units": int(units[code]),
+                    "revenue": float(product_revenue[code]) / 100
+                }
+                for code in top_codes
+            ],
+            "basketSize": {
+                "mean": float(baskets.mean()) if len(baskets) else 0.0,
+                "p50": float(np.percentile(baskets, 50)) if len(baskets) else 0.0,
+                "p90": float(np.percentile(baskets, 90)) if len(baskets) else 0.0,
+                "distribution": {str(size): int(count) for size, count in enumerate(basket_hist) if count}
+            }
+        }
+
+
+order_analytics = OrderAnalytics(max_age=float(os.getenv("ORDER_ANALYTICS_MAX_AGE", "900")))
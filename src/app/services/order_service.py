@@ -1,20 +1,24 @@
-import boto3
-from botocore.exceptions import ClientError
-from typing import List, Optional
-from models.order import Order
-import json
+from core.storage import ConditionFailed, OrderStore, StorageError, get_storage
+from typing import Any, Dict, List, Optional
+from models.order import Order, OrderSummary
+from core.codec import to_item, from_item
+from services.order_analytics import order_analytics
 import logging
 import asyncio
+from services.stock_service import StockService
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Serializes analytics rebuilds so concurrent stats requests trigger a single scan
+_analytics_lock = asyncio.Lock()
+
 class OrderService:
-    def __init__(self):
+    def __init__(self, store: Optional[OrderStore] = None, stock_service: Optional[StockService] = None):
         try:
-            self.dynamodb = boto3.resource('dynamodb')
-            self.table = self.dynamodb.Table('cloudmart-orders')
+            self.store = store or get_storage().orders
+            self.stock_service = stock_service
             logger.info("OrderService initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing OrderService: {str(e)}")
@@ -23,62 +27,67 @@ class OrderService:
     async def create_order(self, order: Order) -> Order:
         """Create a new order"""
         try:
-            order_data = json.loads(order.model_dump_json())
+            order_data = to_item(order)
             await asyncio.get_event_loop().run_in_executor(
                 None,
-                lambda: self.table.put_item(Item=order_data)
+                lambda: self.store.put(order_data)
             )
+            order_analytics.upsert(order)
             return order
-        except ClientError as e:
-            logger.error(f"Error creating order: {e.response['Error']['Message']}")
+        except StorageError as e:
+            logger.error(f"Error creating order: {str(e)}")
             raise
 
     async def get_order(self, order_id: str) -> Optional[Order]:
         """Get an order by ID"""
         try:
-            response = await asyncio.get_event_loop().run_in_executor(
+            item = await asyncio.get_event_loop().run_in_executor(
                 None,
-                lambda: self.table.get_item(Key={'id': order_id})
+                lambda: self.store.get(order_id)
             )
-            item = response.get('Item')
-            return Order(**item) if item else None
-        except ClientError as e:
-            logger.error(f"Error getting order: {e.response['Error']['Message']}")
+            return from_item(Order, item) if item else None
+        except StorageError as e:
+            logger.error(f"Error getting order: {str(e)}")
             return None
 
     async def get_user_orders(self, user_email: str) -> List[Order]:
         """Get all orders for a user"""
         try:
-            response = await asyncio.get_event_loop().run_in_executor(
+            items = await asyncio.get_event_loop().run_in_executor(
                 None,
-                lambda: self.table.scan(
-                    FilterExpression='userEmail = :email',
-                    ExpressionAttributeValues={':email': user_email}
-                )
+                lambda: self.store.by_user(user_email)
             )
-            items = response.get('Items', [])
-            return [Order(**item) for item in items]
-        except ClientError as e:
-            logger.error(f"Error getting user orders: {e.response['Error']['Message']}")
+            return [from_item(Order, item) for item in items]
+        except StorageError as e:
+            logger.error(f"Error getting user orders: {str(e)}")
+            return []
+
+    async def get_user_order_summaries(self, user_email: str) -> List[OrderSummary]:
+        """Get a user's order history, reading only the attributes the list view shows"""
+        try:
+            items = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.store.by_user(user_email, list(OrderSummary.model_fields))
+            )
+            return [from_item(OrderSummary, item) for item in items]
+        except StorageError as e:
+            logger.error(f"Error getting user order summaries: {str(e)}")
             return []
 
     async def update_order_status(self, order_id: str, status: str) -> Optional[Order]:
         """Update order status"""
         try:
-            response = await asyncio.get_event_loop().run_in_executor(
+            updated_item = await asyncio.get_event_loop().run_in_executor(
                 None,
-                lambda: self.table.update_item(
-                    Key={'id': order_id},
-                    UpdateExpression='set #status = :status',
-                    ExpressionAttributeNames={'#status': 'status'},
-                    ExpressionAttributeValues={':status': status},
-                    ReturnValues='ALL_NEW'
-                )
+                lambda: self.store.update_status(order_id, status)
             )
-            updated_item = response.get('Attributes')
-            return Order(**updated_item) if updated_item else None
-        except ClientError as e:
-            logger.error(f"Error updating order: {e.response['Error']['Message']}")
+            if not updated_item:
+                return None
+            updated_order = from_item(Order, updated_item)
+            order_analytics.upsert(updated_order)
+            return updated_order
+        except StorageError as e:
+            logger.error(f"Error updating order: {str(e)}")
             return None
 
     async def delete_order(self, order_id: str) -> bool:
@@ -86,13 +95,46 @@ class OrderService:
         try:
             await asyncio.get_event_loop().run_in_executor(
                 None,
-                lambda: self.table.delete_item(Key={'id': order_id})
+                lambda: self.store.delete(order_id)
             )
+            order_analytics.remove(order_id)
             return True
-        except ClientError as e:
-            logger.error(f"Error deleting order: {e.response['Error']['Message']}")
+        except StorageError as e:
+            logger.error(f"Error deleting order: {str(e)}")
             return False
 
     async def cancel_order(self, order_id: str) -> Optional[Order]:
-        """Cancel an order"""
-        return await self.update_order_status(order_id, 'Canceled') 
\ No newline at end of file
+        """Cancel an order, returning its reserved items to stock.
+
+        The status change is conditional, so of several concurrent cancels
+        only the one that made the transition releases the stock.
+        """
+        try:
+            updated_item = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.store.update_status(order_id, 'Canceled', unless='Canceled')
+            )
+        except ConditionFailed:
+            return await self.get_order(order_id)
+        except StorageError as e:
+            logger.error(f"Error canceling order: {str(e)}")
+            return None
+        if not updated_item:
+            return None
+        order = from_item(Order, updated_item)
+        order_analytics.upsert(order)
+        if order.stockReserved and self.stock_service is not None:
+            await self.stock_service.release([(item.productId, item.quantity) for item in order.items])
+        return order
+
+    async def get_order_stats(self, days: Optional[int] = None, top: int = 10) -> Dict[str, Any]:
+        """Sales aggregates from the in-memory columnar snapshot of all orders"""
+        if order_analytics.is_stale:
+            async with _analytics_lock:
+                if order_analytics.is_stale:
+                    orders = await asyncio.get_event_loop().run_in_executor(
+                        None,
+                        lambda: [from_item(Order, item) for item in self.store.scan()]
+                    )
+                    order_analytics.rebuild(orders)
+        return order_analytics.stats(days, top)
@@ -1,53 +1,146 @@
-import boto3
-from botocore.exceptions import ClientError
-from typing import List, Optional
-from models.product import Product, ProductCreate
+from core.storage import ProductStore, StorageError, get_storage
+from typing import Dict, Iterable, List, Optional
+from models.product import Product, ProductCreate, ProductSummary
+from models.cart import CartItem, CartQuote, QuoteLine
+from decimal import Decimal, ROUND_HALF_UP
 import os
-import json
+import asyncio
+from core.codec import to_item, from_item
+from services.catalog_index import catalog_index
+from services.fragment_cache import fragment_cache, CATALOG
+from services.stock_service import StockService
+
+# Serializes index rebuilds so concurrent queries trigger a single scan
+_rebuild_lock = asyncio.Lock()
+
+# Attributes read for listings and cart quotes
+SUMMARY_FIELDS = list(ProductSummary.model_fields)
+TAX_RATE = Decimal(os.getenv("CART_TAX_RATE", "0.1"))
+CENT = Decimal("0.01")
 
 class ProductService:
-    def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb')
-        self.table = self.dynamodb.Table('cloudmart-products')
+    def __init__(self, stock_service: Optional[StockService] = None, store: Optional[ProductStore] = None):
+        self.store = store or get_storage().products
+        self.stock_service = stock_service
 
     async def list_products(self) -> List[Product]:
         try:
-            response = self.table.scan()
-            items = response.get('Items', [])
-            return [Product(**item) for item in items]
-        except ClientError as e:
-            print(f"Error scanning products: {e.response['Error']['Message']}")
+            items = self.store.scan()
+            return [from_item(Product, item) for item in items]
+        except StorageError as e:
+            print(f"Error scanning products: {str(e)}")
+            return []
+
+    async def search_products(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        in_stock: Optional[bool] = None,
+        text: Optional[str] = None,
+        sort: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> List[Product]:
+        """Filter and sort the catalog from the in-memory index"""
+        if catalog_index.is_stale:
+            async with _rebuild_lock:
+                if catalog_index.is_stale:
+                    products = await asyncio.get_event_loop().run_in_executor(
+                        None,
+                        lambda: [from_item(Product, item) for item in self.store.scan()]
+                    )
+                    catalog_index.rebuild(products)
+        return catalog_index.query(category, min_price, max_price, in_stock, text, sort, offset, limit)
+
+    async def list_product_summaries(self) -> List[ProductSummary]:
+        """List products without descriptions, reading only the projected attributes"""
+        try:
+            items = self.store.scan(SUMMARY_FIELDS)
+            return [from_item(ProductSummary, item) for item in items]
+        except StorageError as e:
+            print(f"Error scanning product summaries: {str(e)}")
             return []
 
     async def get_product(self, product_id: str) -> Optional[Product]:
         try:
-            response = self.table.get_item(Key={'id': product_id})
-            item = response.get('Item')
-            return Product(**item) if item else None
-        except ClientError as e:
-            print(f"Error getting product: {e.response['Error']['Message']}")
+            item = self.store.get(product_id)
+            return from_item(Product, item) if item else None
+        except StorageError as e:
+            print(f"Error getting product: {str(e)}")
             return None
 
+    async def get_product_summaries(self, product_ids: Iterable[str]) -> Dict[str, ProductSummary]:
+        """Price and stock of the given products in one batched read, keyed by id"""
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            return {}
+        items = await asyncio.get_event_loop().run_in_executor(
+            None,
+            lambda: self.store.batch_get(product_ids, SUMMARY_FIELDS)
+        )
+        summaries = [from_item(ProductSummary, item) for item in items]
+        return {summary.id: summary for summary in summaries}
+
+    async def quote_cart(self, items: List[CartItem]) -> CartQuote:
+        """Price a cart from the catalog, merging repeated products into one line"""
+        quantities: Dict[str, int] = {}
+        for item in items:
+            quantities[item.productId] = quantities.get(item.productId, 0) + item.quantity
+        try:
+            products = await self.get_product_summaries(quantities)
+        except StorageError as e:
+            print(f"Error reading cart products: {str(e)}")
+            raise
+
+        lines = []
+        missing = []
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product is None:
+                missing.append(product_id)
+                continue
+            lines.append(QuoteLine(
+                productId=product_id,
+                name=product.name,
+                unitPrice=product.price,
+                quantity=quantity,
+                lineTotal=product.price * quantity,
+                stock=product.stock,
+                available=product.stock >= quantity
+            ))
+        subtotal = sum((line.lineTotal for line in lines), Decimal("0"))
+        tax = (subtotal * TAX_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+        return CartQuote(lines=lines, missing=missing, subtotal=subtotal, tax=tax, total=subtotal + tax)
+
     async def create_product(self, product: ProductCreate) -> Product:
         new_product = Product(**product.model_dump())
         try:
-            self.table.put_item(Item=json.loads(new_product.model_dump_json()))
+            self.store.put(to_item(new_product))
+            catalog_index.upsert(new_product)
+            fragment_cache.bump(CATALOG)
             return new_product
-        except ClientError as e:
-            print(f"Error creating product: {e.response['Error']['Message']}")
+        except StorageError as e:
+            print(f"Error creating product: {str(e)}")
             raise
 
     async def update_product(self, product_id: str, product: ProductCreate) -> Optional[Product]:
         try:
             # Check if product exists
-            if not await self.get_product(product_id):
+            existing = await self.get_product(product_id)
+            if not existing:
                 return None
             
-            updated_product = Product(id=product_id, **product.model_dump())
-            self.table.put_item(Item=json.loads(updated_product.model_dump_json()))
+            updated_product = Product(id=product_id, stockShards=existing.stockShards, **product.model_dump())
+            self.store.put(to_item(updated_product))
+            if existing.stockShards and self.stock_service is not None:
+                # The shards hold the real stock; spread the new level over them
+                await self.stock_service.set_stock(product_id, product.stock)
+            catalog_index.upsert(updated_product)
+            fragment_cache.bump(CATALOG)
             return updated_product
-        except ClientError as e:
-            print(f"Error updating product: {e.response['Error']['Message']}")
+        except StorageError as e:
+            print(f"Error updating product: {str(e)}")
             return None
 
     async def delete_product(self, product_id: str) -> bool:
@@ -56,8 +149,10 @@ class ProductService:
             if not await self.get_product(product_id):
                 return False
             
-            self.table.delete_item(Key={'id': product_id})
+            self.store.delete(product_id)
+            catalog_index.remove(product_id)
+            fragment_cache.bump(CATALOG)
             return True
-        except ClientError as e:
-            print(f"Error deleting product: {e.response['Error']['Message']}")
+        except StorageError as e:
+            print(f"Error deleting product: {str(e)}")
             return False 
\ No newline at end of file
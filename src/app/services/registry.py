@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException
+
+from core.jobs import job_queue
+from services.ai_service import AIService
+from services.order_service import OrderService
+from services.product_service import ProductService
+from services.stock_service import StockService
+from services.ticket_service import TicketService, REPLY_JOB, SUMMARY_JOB, ARCHIVE_JOB
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds before a service that failed to start is tried again
+RETRY_AFTER = float(os.getenv("SERVICE_RETRY_AFTER", "30"))
+# Services the pod cannot serve traffic without; AI providers are left out so
+# an outage there does not take the storefront out of rotation
+REQUIRED_SERVICES = os.getenv("REQUIRED_SERVICES", "products,orders").split(",")
+
+
+class ServiceRegistry:
+    """Builds each service once, outside module import.
+
+    Service constructors open SDK clients and some make network calls, so
+    they run in the executor: all at once during startup warm-up, or on the
+    first request that needs one if warm-up has not reached it yet. A
+    service that fails to build leaves the others usable; requests for it
+    get a 503 and it is retried after ``RETRY_AFTER`` seconds.
+    """
+
+    def __init__(self, factories: Dict[str, Callable[["ServiceRegistry"], Any]]):
+        self.factories = factories
+        self.warm_up_seconds = None
+        self._services: Dict[str, Any] = {}
+        self._errors: Dict[str, str] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._locks = {name: threading.Lock() for name in factories}
+
+    def get(self, name: str) -> Any:
+        """Return a service, building it on this thread if needed (blocking)"""
+        service = self._services.get(name)
+        if service is not None:
+            return service
+        with self._locks[name]:
+            if name in self._services:
+                return self._services[name]
+            if name in self._errors and time.monotonic() - self._failed_at[name] < RETRY_AFTER:
+                raise RuntimeError(f"{name} service unavailable: {self._errors[name]}")
+            started = time.perf_counter()
+            try:
+                service = self.factories[name](self)
+            except Exception as e:
+                self._errors[name] = str(e)
+                self._failed_at[name] = time.monotonic()
+                logger.error(f"Could not start {name} service: {str(e)}")
+                raise RuntimeError(f"{name} service unavailable: {str(e)}")
+            self._errors.pop(name, None)
+            self._services[name] = service
+            logger.info(f"Started {name} service in {time.perf_counter() - started:.2f}s")
+            return service
+
+    async def aget(self, name: str) -> Any:
+        """Return a service without blocking the event loop while it is built"""
+        service = self._services.get(name)
+        if service is not None:
+            return service
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self.get, name)
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+    async def warm_up(self) -> None:
+        """Build every service concurrently"""
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(None, self.get, name) for name in self.factories),
+            return_exceptions=True
+        )
+        self.warm_up_seconds = round(time.perf_counter() - started, 3)
+        logger.info(f"Service warm-up finished in {self.warm_up_seconds}s")
+
+    @property
+    def ready(self) -> bool:
+        """Warm-up has finished and every required service is up"""
+        return self.warm_up_seconds is not None and all(name in self._services for name in REQUIRED_SERVICES)
+
+    def status(self) -> Dict[str, str]:
+        return {
+            name: "ready" if name in self._services
+            else f"failed: {self._errors[name]}" if name in self._errors
+            else "starting"
+            for name in self.factories
+        }
+
+
+def _ai(registry: ServiceRegistry):
+    return AIService(order_service=registry.get("orders"))
+
+
+def _orders(registry: ServiceRegistry):
+    return OrderService(stock_service=registry.get("stock"))
+
+
+def _products(registry: ServiceRegistry):
+    return ProductService(stock_service=registry.get("stock"))
+
+
+def _stock(registry: ServiceRegistry):
+    return StockService()
+
+
+def _tickets(registry: ServiceRegistry):
+    service = TicketService(ai_service=registry.get("ai"))
+    job_queue.register(REPLY_JOB, service.complete_reply, on_failure=service.fail_reply)
+    job_queue.register(SUMMARY_JOB, service.update_summary)
+    job_queue.register(ARCHIVE_JOB, service.archive_closed)
+    return service
+
+
+registry = ServiceRegistry({
+    "stock": _stock,
+    "products": _products,
+    "orders": _orders,
+    "ai": _ai,
+    "tickets": _tickets
+})
+
+
+async def get_product_service() -> ProductService:
+    return await registry.aget("products")
+
+
+async def get_stock_service() -> StockService:
+    return await registry.aget("stock")
+
+
+async def get_order_service() -> OrderService:
+    return await registry.aget("orders")
+
+
+async def get_ai_service() -> AIService:
+    return await registry.aget("ai")
+
+
+async def get_ticket_service() -> TicketService:
+    return await registry.aget("tickets")
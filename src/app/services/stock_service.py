@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core.storage import StockStore, get_storage
+from services.catalog_index import catalog_index
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Resharding rewrites every shard in one transaction (at most 100 items)
+MAX_SHARDS = 48
+# Random shards tried for a sale before collecting units from several
+PROBES = int(os.getenv("STOCK_PROBES", "3"))
+# Seconds a product's shard count is trusted before it is read again
+CONFIG_TTL = float(os.getenv("STOCK_CONFIG_TTL", "30"))
+# Minimum seconds between copies of a sharded total onto the product item
+SNAPSHOT_INTERVAL = float(os.getenv("STOCK_SNAPSHOT_INTERVAL", "10"))
+
+
+def split(total: int, shards: int) -> List[int]:
+    """Spread a stock level as evenly as possible over the shards"""
+    base, extra = divmod(total, shards)
+    return [base + (1 if shard < extra else 0) for shard in range(shards)]
+
+
+class StockService:
+    """Stock levels, optionally kept in sharded counters for hot products.
+
+    By default a product's units live in ``stock`` on its item in
+    cloudmart-products and every sale is a conditional decrement of that
+    one key, which throttles once a popular product sells fast enough.
+    Setting ``stockShards`` to N moves the units onto N items of the shard
+    table; a sale decrements a random shard, so writes spread over N keys.
+    Each decrement is conditional on its shard holding enough units, so the
+    total can never be oversold. The product item's ``stock`` then becomes
+    a snapshot for listings, refreshed from the shards at most every
+    ``SNAPSHOT_INTERVAL`` seconds per pod.
+    """
+
+    def __init__(self, store: Optional[StockStore] = None):
+        self.store = store or get_storage().stock
+        self.contended = 0
+        self.gathered = 0
+        self._config: Dict[str, Tuple[float, int]] = {}
+        self._snapshot_at: Dict[str, float] = {}
+
+    def _shard_count(self, product_id: str, refresh: bool = False) -> Optional[int]:
+        cached = self._config.get(product_id)
+        if cached is not None and not refresh and time.monotonic() - cached[0] < CONFIG_TTL:
+            return cached[1]
+        config = self.store.read_config(product_id)
+        if config is None:
+            self._config.pop(product_id, None)
+            return None
+        self._config[product_id] = (time.monotonic(), config[0])
+        return config[0]
+
+    def _take(self, product_id: str, quantity: int) -> bool:
+        # A failed write may mean the layout changed under a cached shard count, so retry once after re-reading it
+        for attempt in range(2):
+            shards = self._shard_count(product_id, refresh=attempt > 0)
+            if shards is None:
+                return False
+            if not shards:
+                if self.store.adjust(product_id, None, -quantity):
+                    return True
+                continue
+            for shard in random.sample(range(shards), min(PROBES, shards)):
+                if self.store.adjust(product_id, shard, -quantity):
+                    self._maybe_snapshot(product_id, shards)
+                    return True
+                self.contended += 1
+            if self._gather(product_id, quantity):
+                self._maybe_snapshot(product_id, shards)
+                return True
+        return False
+
+    def _gather(self, product_id: str, quantity: int) -> bool:
+        """Take units from several shards when no single probed shard holds enough"""
+        counts = self.store.read_shards(product_id)
+        if sum(counts.values()) < quantity:
+            return False
+        self.gathered += 1
+        taken = []
+        remaining = quantity
+        for shard, units in sorted(counts.items(), key=lambda entry: entry[1], reverse=True):
+            amount = min(units, remaining)
+            if amount and self.store.adjust(product_id, shard, -amount):
+                taken.append((shard, amount))
+                remaining -= amount
+                if not remaining:
+                    return True
+        # Concurrent sales drained the shards first; put back what was taken
+        for shard, amount in taken:
+            self._put_back(product_id, amount, shard)
+        return False
+
+    def _put_back(self, product_id: str, quantity: int, shard: Optional[int] = None) -> None:
+        for attempt in range(3):
+            shards = self._shard_count(product_id, refresh=attempt > 0)
+            if shards is None:
+                return
+            if shard is None or shard >= shards:
+                shard = random.randrange(shards) if shards else None
+            if self.store.adjust(product_id, shard, quantity):
+                return
+            shard = None
+        logger.error(f"Could not return {quantity} units of product {product_id} to stock")
+
+    def _maybe_snapshot(self, product_id: str, shards: int, total: Optional[int] = None) -> Optional[int]:
+        now = time.monotonic()
+        if now - self._snapshot_at.get(product_id, 0) < SNAPSHOT_INTERVAL:
+            return None
+        self._snapshot_at[product_id] = now
+        if total is None:
+            total = sum(self.store.read_shards(product_id).values())
+        self.store.write_snapshot(product_id, shards, total)
+        return total
+
+    def _reshard(self, product_id: str, shards: Optional[int], total: Optional[int], attempts: int = 5) -> Optional[int]:
+        for _ in range(attempts):
+            config = self.store.read_config(product_id)
+            if config is None:
+                return None
+            current = self.store.read_shards(product_id) if config[0] else {}
+            new_total = total if total is not None else (sum(current.values()) if config[0] else config[1])
+            new_shards = config[0] if shards is None else shards
+            counts = split(new_total, new_shards) if new_shards else []
+            if self.store.write_layout(product_id, config, current, counts, new_total):
+                self._config[product_id] = (time.monotonic(), new_shards)
+                return new_total
+        raise RuntimeError(f"Stock of product {product_id} kept changing while resharding")
+
+    # Public API
+
+    async def reserve(self, items: List[Tuple[str, int]]) -> List[str]:
+        """Take stock for every (product id, quantity), all or nothing.
+
+        Returns the ids that did not have enough stock; when any are short,
+        nothing stays reserved.
+        """
+        def reserve_all():
+            taken = []
+            for product_id, quantity in items:
+                if not self._take(product_id, quantity):
+                    for reserved_id, reserved_quantity in taken:
+                        self._put_back(reserved_id, reserved_quantity)
+                    return [product_id]
+                taken.append((product_id, quantity))
+            return []
+
+        short = await asyncio.get_event_loop().run_in_executor(None, reserve_all)
+        if not short:
+            # Keep in_stock filters current without waiting for the next index rebuild
+            for product_id, quantity in items:
+                catalog_index.adjust_stock(product_id, -quantity)
+        return short
+
+    async def release(self, items: List[Tuple[str, int]]) -> None:
+        """Return previously reserved units to stock"""
+        def release_all():
+            for product_id, quantity in items:
+                self._put_back(product_id, quantity)
+
+        await asyncio.get_event_loop().run_in_executor(None, release_all)
+        for product_id, quantity in items:
+            catalog_index.adjust_stock(product_id, quantity)
+
+    async def get_stock(self, product_id: str) -> Optional[int]:
+        """Current units of a product, summing its shards if it has any"""
+        def read():
+            config = self.store.read_config(product_id)
+            if config is None:
+                return None
+            shards, stock = config
+            if not shards:
+                return stock
+            total = sum(self.store.read_shards(product_id).values())
+            self._maybe_snapshot(product_id, shards, total)
+            return total
+
+        return await asyncio.get_event_loop().run_in_executor(None, read)
+
+    async def set_shards(self, product_id: str, shards: int) -> Optional[int]:
+        """Move a product's stock onto ``shards`` counters (0 to go back to the product item).
+
+        Returns the product's stock, or None if there is no such product.
+        """
+        if not 0 <= shards <= MAX_SHARDS:
+            raise ValueError(f"Shard count must be between 0 and {MAX_SHARDS}")
+        return await asyncio.get_event_loop().run_in_executor(None, lambda: self._reshard(product_id, shards, None))
+
+    async def set_stock(self, product_id: str, stock: int) -> Optional[int]:
+        """Overwrite a product's stock level, spreading it over its current shards"""
+        total = await asyncio.get_event_loop().run_in_executor(None, lambda: self._reshard(product_id, None, stock))
+        if total is not None:
+            catalog_index.set_stock(product_id, total)
+        return total
+
+    def stats(self) -> Dict[str, int]:
+        return {"contended": self.contended, "gathered": self.gathered}
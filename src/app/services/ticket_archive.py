@@ -0,0 +1,218 @@
+"""Cold storage for tickets that have been closed for a long time.
+
+Archived tickets are written as gzipped JSON-lines batches partitioned by
+the day they were closed, e.g. ``tickets/closed=2026-10-01/<batch>.jsonl.gz``.
+Every archived ticket gets a tiny object ``tickets/ids/<ticket id>`` naming
+its batch, so a lookup is one GET by key and then a read of the one batch
+it needs. Deleting an archived ticket empties its id object.
+
+Objects go to the S3 bucket named by TICKET_ARCHIVE_BUCKET, shared by all
+pods. Without one they go to TICKET_ARCHIVE_DIR on local disk, which only
+counts as durable when that directory is set explicitly (e.g. a mounted
+volume); the archive job does not run against a non-durable store.
+"""
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from core.storage import Item
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BUCKET = os.getenv("TICKET_ARCHIVE_BUCKET")
+ARCHIVE_DIR = os.getenv("TICKET_ARCHIVE_DIR")
+# Decompressed batches kept in memory for repeated lookups
+CACHED_BATCHES = int(os.getenv("TICKET_ARCHIVE_CACHED_BATCHES", "8"))
+
+PREFIX = "tickets/"
+IDS_PREFIX = PREFIX + "ids/"
+
+
+class ArchiveStore(ABC):
+    """Write-once objects by key, the subset of an object store the archive needs"""
+
+    # Whether objects outlive this pod and are visible to the others
+    durable = True
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None: ...
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    @abstractmethod
+    def list(self, prefix: str) -> List[str]:
+        """Keys starting with prefix, in key order"""
+
+
+class LocalArchiveStore(ArchiveStore):
+    """Local filesystem stand-in for an object store bucket"""
+
+    def __init__(self, root: str, durable: bool = False):
+        self.root = root
+        self.durable = durable
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Readers never see a partly written object
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def list(self, prefix: str) -> List[str]:
+        directory = self._path(prefix.rstrip("/"))
+        if not os.path.isdir(directory):
+            return []
+        keys = []
+        for dirpath, _, filenames in os.walk(directory):
+            relative = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+            keys.extend(f"{relative}/{name}" for name in filenames if not name.startswith("tmp"))
+        return sorted(keys)
+
+
+class S3ArchiveStore(ArchiveStore):
+    def __init__(self, bucket: str):
+        from core.aws import get_client
+        self.bucket = bucket
+        self.s3 = get_client('s3')
+
+    def put(self, key: str, data: bytes) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.s3.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+        except self.s3.exceptions.NoSuchKey:
+            return None
+
+    def list(self, prefix: str) -> List[str]:
+        keys = []
+        for page in self.s3.get_paginator('list_objects_v2').paginate(Bucket=self.bucket, Prefix=prefix):
+            keys.extend(entry['Key'] for entry in page.get('Contents', []))
+        return sorted(keys)
+
+
+def default_store() -> ArchiveStore:
+    if ARCHIVE_BUCKET:
+        return S3ArchiveStore(ARCHIVE_BUCKET)
+    return LocalArchiveStore(ARCHIVE_DIR or "archive", durable=ARCHIVE_DIR is not None)
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot archive {type(value).__name__}")
+
+
+class TicketArchive:
+    def __init__(self, store: Optional[ArchiveStore] = None):
+        self.store = store or default_store()
+        self._lock = threading.Lock()
+        # Batch key of each ticket looked up or written by this instance
+        self._locations: Dict[str, str] = {}
+        self._batches: "OrderedDict[str, Dict[str, Item]]" = OrderedDict()
+        self.reads = 0
+
+    def write(self, items: List[Item]) -> List[str]:
+        """Archive ticket items, one batch per closing day; returns the batch keys"""
+        by_day = defaultdict(list)
+        for item in items:
+            by_day[item['updated_at'][:10]].append(item)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        keys = []
+        for day, day_items in sorted(by_day.items()):
+            batch = f"{stamp}-{uuid.uuid4().hex[:8]}"
+            key = f"{PREFIX}closed={day}/{batch}.jsonl.gz"
+            lines = "".join(json.dumps(item, default=_json_default) + "\n" for item in day_items)
+            data = gzip.compress(lines.encode())
+            ids = [item['id'] for item in day_items]
+            self.store.put(key, data)
+            # Callers drop the tickets from the table next, so read the batch back first
+            if self.store.get(key) != data:
+                raise RuntimeError(f"Archive batch {key} did not read back as written")
+            # A ticket archived twice resolves to its latest copy
+            for ticket_id in ids:
+                self.store.put(f"{IDS_PREFIX}{ticket_id}", key.encode())
+            with self._lock:
+                self._locations.update(dict.fromkeys(ids, key))
+            keys.append(key)
+        logger.info(f"Archived {len(items)} tickets in {len(keys)} batches")
+        return keys
+
+    def get(self, ticket_id: str) -> Optional[Item]:
+        """The archived item of a ticket, or None if it was never archived or has been deleted"""
+        key = self._locate(ticket_id)
+        if key is None:
+            return None
+        return self._read_batch(key).get(ticket_id)
+
+    def contains(self, ticket_id: str) -> bool:
+        return self._locate(ticket_id) is not None
+
+    def delete(self, ticket_id: str) -> None:
+        self.store.put(f"{IDS_PREFIX}{ticket_id}", b"")
+        with self._lock:
+            self._locations.pop(ticket_id, None)
+
+    def _locate(self, ticket_id: str) -> Optional[str]:
+        with self._lock:
+            key = self._locations.get(ticket_id)
+        if key is not None:
+            return key
+        # Misses are not cached: the ticket may be archived by another pod at any time
+        data = self.store.get(f"{IDS_PREFIX}{ticket_id}")
+        if not data:
+            return None
+        key = data.decode()
+        with self._lock:
+            self._locations[ticket_id] = key
+        return key
+
+    def _read_batch(self, key: str) -> Dict[str, Item]:
+        with self._lock:
+            if key in self._batches:
+                self._batches.move_to_end(key)
+                return self._batches[key]
+        data = self.store.get(key)
+        self.reads += 1
+        items = {}
+        if data is not None:
+            for line in gzip.decompress(data).decode().splitlines():
+                item = json.loads(line)
+                items[item['id']] = item
+        with self._lock:
+            self._batches[key] = items
+            while len(self._batches) > CACHED_BATCHES:
+                self._batches.popitem(last=False)
+        return items
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "indexedTickets": len(self._locations),
+                "cachedBatches": len(self._batches),
+                "batchReads": self.reads
+            }
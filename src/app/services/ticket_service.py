@@ -1,24 +1,60 @@
-import boto3
-from botocore.exceptions import ClientError
-from typing import List, Optional
-from models.ticket import Ticket, Message
-import os
-import json
-from datetime import datetime
+from core.storage import ConditionFailed, StorageError, TicketStore, get_storage
+from typing import Callable, List, Optional
+from models.ticket import Ticket, Message, TicketSummary, TicketPage
+from core.codec import to_item, from_item
+from datetime import datetime, timedelta
 import asyncio
 import logging
-from services.ai_service import AIService
+import os
+import time
+from services.ai_service import AIService, ERROR_REPLY
+from services.conversation_cache import conversation_cache
+from services.fragment_cache import fragment_cache, TICKETS
+from services.ticket_archive import TicketArchive
+from services.context_policy import context_policy
+from core.limits import Coalescer, ProviderBusy
+from core.jobs import job_queue
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Length of the last-message preview stored alongside each ticket
+PREVIEW_LENGTH = 200
+
+# Background job that produces the first assistant reply of a new ticket
+REPLY_JOB = 'ticket_reply'
+# Seconds a ticket may wait for its first reply before the job is assumed lost and submitted again
+REPLY_TIMEOUT = float(os.getenv("TICKET_REPLY_TIMEOUT", "600"))
+
+# Background job that folds old turns into the ticket's context summary
+SUMMARY_JOB = 'ticket_summary'
+
+# Background job that moves long-closed tickets to the archive
+ARCHIVE_JOB = 'ticket_archive'
+# Days a ticket stays closed in the table before it is archived
+ARCHIVE_AFTER_DAYS = float(os.getenv("TICKET_ARCHIVE_AFTER_DAYS", "30"))
+# Tickets per archive batch
+ARCHIVE_BATCH_SIZE = int(os.getenv("TICKET_ARCHIVE_BATCH_SIZE", "500"))
+# Seconds the stub of an archived ticket is kept before TTL removes it
+ARCHIVE_STUB_TTL = int(os.getenv("TICKET_ARCHIVE_STUB_TTL", "86400"))
+
+# Double-submitted messages share one reply instead of being answered twice
+_message_requests = Coalescer()
+
+
+
 class TicketService:
-    def __init__(self):
+    def __init__(
+        self,
+        ai_service: Optional[AIService] = None,
+        store: Optional[TicketStore] = None,
+        archive: Optional[TicketArchive] = None
+    ):
         try:
-            self.dynamodb = boto3.resource('dynamodb')
-            self.table = self.dynamodb.Table('cloudmart-tickets')
-            self.ai_service = AIService()
+            self.store = store or get_storage().tickets
+            self.archive = archive or TicketArchive()
+            self.ai_service = ai_service or AIService()
             logger.info("TicketService initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing TicketService: {str(e)}")
@@ -28,124 +64,305 @@ class TicketService:
         """List all tickets"""
         try:
             logger.info("Attempting to list tickets")
-            response = self.table.scan()
-            items = response.get('Items', [])
+            items = self.store.scan()
             logger.info(f"Found {len(items)} tickets")
             
             tickets = []
             for item in items:
+                if item.get('archived'):
+                    continue
                 try:
-                    ticket = Ticket(**item)
+                    ticket = from_item(Ticket, item)
                     tickets.append(ticket)
                 except Exception as e:
                     logger.error(f"Error parsing ticket: {str(e)}, Data: {item}")
                     continue
             
             return tickets
-        except ClientError as e:
-            logger.error(f"DynamoDB error scanning tickets: {e.response['Error']['Message']}")
+        except StorageError as e:
+            logger.error(f"Storage error scanning tickets: {str(e)}")
             return []
         except Exception as e:
             logger.error(f"Unexpected error listing tickets: {str(e)}")
             return []
 
+    async def query_tickets(
+        self,
+        status: str = "open",
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> TicketPage:
+        """Get one page of tickets with the given status, most recently updated first"""
+        try:
+            items, next_cursor = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.store.by_status(status, limit, cursor)
+            )
+            return TicketPage(
+                tickets=[from_item(TicketSummary, item) for item in items],
+                next_cursor=next_cursor
+            )
+        except StorageError as e:
+            logger.error(f"Storage error querying tickets: {str(e)}")
+            return TicketPage(tickets=[])
+
+    async def list_ticket_summaries(self, limit: int = 50) -> List[TicketSummary]:
+        """Open and recently closed tickets for the sidebar, newest first"""
+        open_page, closed_page = await asyncio.gather(
+            self.query_tickets("open", limit),
+            self.query_tickets("closed", limit)
+        )
+        tickets = open_page.tickets + closed_page.tickets
+        tickets.sort(key=lambda ticket: ticket.updated_at, reverse=True)
+        return tickets
+
+    def _to_item(self, ticket: Ticket) -> dict:
+        """Encode a ticket, adding the denormalized preview used by summary reads"""
+        item = to_item(ticket)
+        # A projection cannot address the last element of a list, so keep a copy
+        if ticket.messages:
+            item['last_message'] = ticket.messages[-1].content[:PREVIEW_LENGTH]
+        return item
+
     async def get_ticket(self, ticket_id: str) -> Optional[Ticket]:
-        """Get a specific ticket"""
+        """Get a specific ticket, from the conversation cache when it is current.
+
+        Tickets that are no longer in the table, or only as the stub left
+        behind by archiving, are read from the archive. A ticket that has
+        waited longer than REPLY_TIMEOUT for its first reply lost its job
+        (e.g. to a pod restart), so the job is submitted again.
+        """
+        ticket = await self._load_ticket(ticket_id)
+        stale = datetime.utcnow() - timedelta(seconds=REPLY_TIMEOUT)
+        if ticket and ticket.pending and ticket.status != "closed" and ticket.updated_at < stale:
+            await self._resubmit_reply(ticket)
+        return ticket
+
+    async def _load_ticket(self, ticket_id: str) -> Optional[Ticket]:
         try:
-            response = self.table.get_item(Key={'id': ticket_id})
-            item = response.get('Item')
-            return Ticket(**item) if item else None
-        except ClientError as e:
-            logger.error(f"Error getting ticket: {e.response['Error']['Message']}")
+            cached, fresh = conversation_cache.get(ticket_id)
+            if cached and fresh:
+                return cached
+            if cached:
+                # Only fetch the version; the full document is read again only if it moved on
+                version = self.store.get_version(ticket_id)
+                if version:
+                    confirmed = conversation_cache.confirm(ticket_id, datetime.fromisoformat(version))
+                    if confirmed:
+                        return confirmed
+                else:
+                    conversation_cache.invalidate(ticket_id)
+
+            item = self.store.get(ticket_id)
+            if not item or item.get('archived'):
+                archived = await asyncio.get_event_loop().run_in_executor(None, self.archive.get, ticket_id)
+                return from_item(Ticket, archived) if archived else None
+            ticket = from_item(Ticket, item)
+            conversation_cache.put(ticket)
+            return ticket
+        except StorageError as e:
+            logger.error(f"Error getting ticket: {str(e)}")
             return None
 
     async def create_ticket(self, message: str) -> Ticket:
-        """Create a new ticket and start conversation"""
+        """Create a new ticket; the assistant's first reply is produced in the background"""
         try:
-            # Create a new conversation with AI service
-            thread_id = await self.ai_service.create_conversation()
-            
-            # Create new ticket
-            new_ticket = Ticket(thread_id=thread_id)
-            
-            # Add initial message
-            user_message = Message(role="user", content=message)
-            new_ticket.messages.append(user_message)
-            
-            # Get AI response
-            ai_response = await self.ai_service.send_message(thread_id, message)
-            ai_message = Message(role="assistant", content=ai_response)
-            new_ticket.messages.append(ai_message)
-            
-            # Save to DynamoDB
-            self.table.put_item(Item=json.loads(new_ticket.model_dump_json()))
+            new_ticket = Ticket(messages=[Message(role="user", content=message)], pending=True)
+
+            # Save the ticket
+            self.store.put(self._to_item(new_ticket))
+            conversation_cache.put(new_ticket)
+            fragment_cache.bump(TICKETS)
+
+            await job_queue.submit(REPLY_JOB, {'ticket_id': new_ticket.id, 'message': message})
             return new_ticket
         except Exception as e:
             logger.error(f"Error creating ticket: {str(e)}")
             raise
 
+    async def _resubmit_reply(self, ticket: Ticket) -> None:
+        """Submit the reply job of a stale pending ticket again.
+
+        updated_at is moved on with a conditional write first, so of several
+        readers seeing the same stale ticket only one submits the job.
+        """
+        previous = ticket.model_dump(mode="json", include={'updated_at'})['updated_at']
+        ticket.updated_at = datetime.utcnow()
+        try:
+            self.store.put(self._to_item(ticket), expected_version=previous)
+        except ConditionFailed:
+            conversation_cache.invalidate(ticket.id)
+            return
+        except StorageError as e:
+            logger.error(f"Error resubmitting reply for ticket {ticket.id}: {str(e)}")
+            return
+        conversation_cache.put(ticket)
+        logger.warning(f"Ticket {ticket.id} waited over {REPLY_TIMEOUT}s for its first reply, resubmitting")
+        await job_queue.submit(REPLY_JOB, {'ticket_id': ticket.id, 'message': ticket.messages[0].content})
+
+    async def complete_reply(self, payload: dict) -> None:
+        """Job handler: start the conversation and store the assistant's first reply.
+
+        Transient OpenAI errors are raised so that the job queue retries them.
+        """
+        ticket = await self._load_ticket(payload['ticket_id'])
+        if not ticket or not ticket.pending:
+            return  # Deleted, or already answered by an earlier attempt
+
+        thread_id = ticket.thread_id
+        if not thread_id:
+            thread_id = await self.ai_service.create_conversation()
+            # Keep the thread so a retried job does not start another one
+            ticket.thread_id = thread_id
+            await self._save_reply(ticket.id, thread_id, None)
+
+        ai_response = await self.ai_service.send_message(
+            thread_id, payload['message'], first_turn=True, raise_transient=True
+        )
+        await self._save_reply(ticket.id, thread_id, ai_response)
+
+    async def fail_reply(self, payload: dict) -> None:
+        """Job failure callback: answer with an apology so the ticket does not stay pending"""
+        ticket = await self._load_ticket(payload['ticket_id'])
+        if ticket and ticket.pending:
+            await self._save_reply(ticket.id, ticket.thread_id, ERROR_REPLY)
+
+    async def _save_reply(self, ticket_id: str, thread_id: Optional[str], reply: Optional[str], attempts: int = 3) -> None:
+        """Record the thread and, if given, the assistant reply on a pending ticket.
+
+        The write is conditional on updated_at so that a concurrent update
+        (e.g. the ticket being closed) is re-read instead of overwritten.
+        """
+        for _ in range(attempts):
+            ticket = await self._load_ticket(ticket_id)
+            if not ticket:
+                return
+            previous = ticket.model_dump(mode="json", include={'updated_at'})['updated_at']
+            ticket.thread_id = thread_id
+            if reply is not None:
+                ticket.messages.append(Message(role="assistant", content=reply))
+                ticket.pending = False
+            ticket.updated_at = datetime.utcnow()
+            try:
+                self.store.put(self._to_item(ticket), expected_version=previous)
+                conversation_cache.put(ticket)
+                fragment_cache.bump(TICKETS)
+                return
+            except ConditionFailed:
+                conversation_cache.invalidate(ticket_id)
+        raise RuntimeError(f"Ticket {ticket_id} kept changing while saving the reply")
+
+    async def update_summary(self, payload: dict, attempts: int = 3) -> None:
+        """Job handler: fold messages that runs no longer read into the ticket's summary.
+
+        updated_at is left alone, so the write does not move the ticket in
+        the sidebar; it is still conditional on it, and retried if a reply
+        was saved in the meantime.
+        """
+        for _ in range(attempts):
+            ticket = await self._load_ticket(payload['ticket_id'])
+            if not ticket or not context_policy.needs_summary(len(ticket.messages), ticket.summarizedMessages):
+                return
+            covered = len(ticket.messages) - context_policy.window
+            new_messages = [
+                {'role': message.role, 'content': message.content}
+                for message in ticket.messages[ticket.summarizedMessages:covered]
+            ]
+            summary = await self.ai_service.summarize(ticket.contextSummary, new_messages)
+            previous = ticket.model_dump(mode="json", include={'updated_at'})['updated_at']
+            ticket.contextSummary = summary
+            ticket.summarizedMessages = covered
+            try:
+                self.store.put(self._to_item(ticket), expected_version=previous)
+                conversation_cache.put(ticket)
+                return
+            except ConditionFailed:
+                conversation_cache.invalidate(ticket.id)
+        logger.warning(f"Ticket {payload['ticket_id']} kept changing while saving its summary")
+
     async def send_message(self, ticket_id: str, message: str) -> Optional[Ticket]:
         """Send a message in an existing ticket"""
+        return await _message_requests.run(
+            (ticket_id, message),
+            lambda: self._send_message(ticket_id, message)
+        )
+
+    async def _send_message(self, ticket_id: str, message: str) -> Optional[Ticket]:
         try:
             ticket = await self.get_ticket(ticket_id)
-            if not ticket or ticket.status == "closed":
+            # Wait for the first reply before accepting follow-ups
+            if not ticket or ticket.status == "closed" or ticket.pending:
                 return None
             
-            # Add user message
-            user_message = Message(role="user", content=message)
-            ticket.messages.append(user_message)
-            
             # Get AI response
-            ai_response = await self.ai_service.send_message(ticket.thread_id, message)
-            ai_message = Message(role="assistant", content=ai_response)
-            ticket.messages.append(ai_message)
-            
-            # Update timestamp
-            ticket.updated_at = datetime.utcnow()
-            
-            # Save to DynamoDB
-            self.table.put_item(Item=json.loads(ticket.model_dump_json()))
+            ai_response = await self.ai_service.send_message(ticket.thread_id, message, summary=ticket.contextSummary)
+
+            def add_turn(current: Ticket) -> bool:
+                if current.status == "closed":
+                    return False
+                current.messages.append(Message(role="user", content=message))
+                current.messages.append(Message(role="assistant", content=ai_response))
+                return True
+
+            ticket = await self._update(ticket_id, add_turn)
+            if not ticket:
+                return None
+
+            # Summarize turns that left the run's window off the request path
+            if context_policy.needs_summary(len(ticket.messages), ticket.summarizedMessages):
+                await job_queue.submit(SUMMARY_JOB, {'ticket_id': ticket_id})
             return ticket
+        except ProviderBusy:
+            raise
         except Exception as e:
             logger.error(f"Error sending message: {str(e)}")
             return None
 
-    async def close_ticket(self, ticket_id: str) -> Optional[Ticket]:
-        """Close a ticket"""
-        try:
+    async def _update(self, ticket_id: str, change: Callable[[Ticket], bool], attempts: int = 3) -> Optional[Ticket]:
+        """Apply ``change`` to the ticket and save it, conditional on updated_at.
+
+        If the ticket was written in the meantime it is re-read and the
+        change applied again, so concurrent updates are not lost. ``change``
+        returns False to leave the ticket alone.
+        """
+        for _ in range(attempts):
             ticket = await self.get_ticket(ticket_id)
-            if not ticket:
+            if not ticket or not change(ticket):
                 return None
-            
-            ticket.status = "closed"
+            previous = ticket.model_dump(mode="json", include={'updated_at'})['updated_at']
             ticket.updated_at = datetime.utcnow()
-            
-            # Save the ticket
-            ticket_data = json.loads(ticket.model_dump_json())
-            self.table.put_item(Item=ticket_data)
-            return ticket
-        except ClientError as e:
-            logger.error(f"Error closing ticket: {e.response['Error']['Message']}")
+            try:
+                self.store.put(self._to_item(ticket), expected_version=previous)
+                conversation_cache.put(ticket)
+                fragment_cache.bump(TICKETS)
+                return ticket
+            except ConditionFailed:
+                conversation_cache.invalidate(ticket_id)
+        raise ConditionFailed(f"Ticket {ticket_id} kept changing while saving it")
+
+    async def close_ticket(self, ticket_id: str) -> Optional[Ticket]:
+        """Close a ticket"""
+        def close(ticket: Ticket) -> bool:
+            ticket.status = "closed"
+            return True
+
+        try:
+            return await self._update(ticket_id, close)
+        except StorageError as e:
+            logger.error(f"Error closing ticket: {str(e)}")
             return None
 
     async def update_ticket_sentiment(self, ticket_id: str, sentiment_data: dict) -> Optional[Ticket]:
         """Update ticket with sentiment analysis results"""
-        try:
-            ticket = await self.get_ticket(ticket_id)
-            if not ticket:
-                return None
-            
-            # Update sentiment data
+        def set_sentiment(ticket: Ticket) -> bool:
             ticket.sentimentScores = sentiment_data['sentimentScores']
             ticket.overallSentiment = sentiment_data['overallSentiment']
-            ticket.updated_at = datetime.utcnow()
-            
-            # Save the updated ticket
-            ticket_data = json.loads(ticket.model_dump_json())
-            self.table.put_item(Item=ticket_data)
-            return ticket
-        except ClientError as e:
-            logger.error(f"Error updating ticket sentiment: {e.response['Error']['Message']}")
+            return True
+
+        try:
+            return await self._update(ticket_id, set_sentiment)
+        except StorageError as e:
+            logger.error(f"Error updating ticket sentiment: {str(e)}")
             return None
 
     async def delete_ticket(self, ticket_id: str) -> bool:
@@ -159,9 +376,47 @@ class TicketService:
             # Delete the ticket
             await asyncio.get_event_loop().run_in_executor(
                 None,
-                lambda: self.table.delete_item(Key={'id': ticket_id})
+                lambda: self.store.delete(ticket_id)
             )
+            if await asyncio.get_event_loop().run_in_executor(None, self.archive.contains, ticket_id):
+                await asyncio.get_event_loop().run_in_executor(None, self.archive.delete, ticket_id)
+            conversation_cache.invalidate(ticket_id)
+            fragment_cache.bump(TICKETS)
             return True
-        except ClientError as e:
-            logger.error(f"Error deleting ticket: {e.response['Error']['Message']}")
-            return False 
\ No newline at end of file
+        except StorageError as e:
+            logger.error(f"Error deleting ticket: {str(e)}")
+            return False
+
+    async def archive_closed(self, payload: dict) -> None:
+        """Job handler: move tickets closed longer than ARCHIVE_AFTER_DAYS to the archive.
+
+        Each batch is written to the archive and read back before its tickets are replaced
+        by stubs in the table, so a failure part way leaves every ticket
+        readable. A ticket updated in the meantime keeps its place in the
+        table and is archived again by a later run.
+        """
+        if not self.archive.store.durable:
+            logger.error("Not archiving tickets: set TICKET_ARCHIVE_BUCKET, or TICKET_ARCHIVE_DIR to a persistent volume")
+            return
+        loop = asyncio.get_event_loop()
+        cutoff = (datetime.utcnow() - timedelta(days=payload.get('after_days', ARCHIVE_AFTER_DAYS))).isoformat()
+        archived = 0
+        while True:
+            items = await loop.run_in_executor(None, lambda: self.store.closed_before(cutoff, ARCHIVE_BATCH_SIZE))
+            items = [item for item in items if not item.get('archived') and item.get('updated_at')]
+            if not items:
+                break
+            await loop.run_in_executor(None, self.archive.write, items)
+            expires_at = int(time.time()) + ARCHIVE_STUB_TTL
+            for item in items:
+                expired = await loop.run_in_executor(
+                    None,
+                    lambda: self.store.expire(item['id'], item['updated_at'], expires_at)
+                )
+                if expired:
+                    archived += 1
+                    conversation_cache.invalidate(item['id'])
+            fragment_cache.bump(TICKETS)
+            if len(items) < ARCHIVE_BATCH_SIZE:
+                break
+        logger.info(f"Archived {archived} tickets closed before {cutoff}")
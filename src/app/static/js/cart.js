@@ -2,6 +2,8 @@
 class CartManager {
     constructor() {
         this.cart = JSON.parse(localStorage.getItem('cart')) || [];
+        // Latest server quote for the cart; its tax and total are what the page shows
+        this.quote = null;
         this.updateCartCount();
         this.initializeEventListeners();
     }
@@ -35,8 +37,11 @@ class CartManager {
                     this.removeFromCart(productId);
                 });
 
-                // Initialize cart display
+                // Initialize cart display, then correct it with catalog prices
                 this.updateCart();
+                this.refreshQuote()
+                    .then(() => this.updateCart())
+                    .catch(error => console.error('Error pricing cart:', error));
             }
         });
     }
@@ -66,7 +71,13 @@ class CartManager {
     removeFromCart(productId) {
         this.cart = this.cart.filter(item => item.id !== productId);
         localStorage.setItem('cart', JSON.stringify(this.cart));
+        this.quote = null;
         this.updateCart();
+        if (this.cart.length > 0) {
+            this.refreshQuote()
+                .then(() => this.updateCart())
+                .catch(error => console.error('Error pricing cart:', error));
+        }
     }
 
     updateCartCount() {
@@ -95,7 +106,7 @@ class CartManager {
             if (checkoutButton) {
                 checkoutButton.disabled = true;
             }
-            this.updateTotals(0);
+            this.updateTotals({ subtotal: 0, tax: 0, total: 0 });
             return;
         }
 
@@ -109,6 +120,7 @@ class CartManager {
                 <div>
                     <h3 class="font-medium">${item.name}</h3>
                     <p class="text-sm text-gray-500">$${item.price.toFixed(2)} × ${item.quantity}</p>
+                    ${item.available === false ? `<p class="text-sm text-red-500">Only ${item.stock} in stock</p>` : ''}
                 </div>
                 <div class="flex items-center space-x-4">
                     <span class="font-medium">$${(item.price * item.quantity).toFixed(2)}</span>
@@ -121,25 +133,67 @@ class CartManager {
         `).join('');
 
         // Update totals
-        const subtotal = this.cart.reduce((total, item) => total + (item.price * item.quantity), 0);
-        this.updateTotals(subtotal);
+        this.updateTotals(this.quote);
     }
 
-    updateTotals(subtotal) {
-        const tax = subtotal * 0.1;
-        const total = subtotal + tax;
+    updateTotals(quote) {
+        // Tax is the server's to compute, so totals stay pending until a quote arrives
+        const format = value => quote ? `$${parseFloat(value).toFixed(2)}` : '…';
 
         const subtotalElement = document.getElementById('subtotal');
         const taxElement = document.getElementById('tax');
         const totalElement = document.getElementById('total');
 
-        if (subtotalElement) subtotalElement.textContent = `$${subtotal.toFixed(2)}`;
-        if (taxElement) taxElement.textContent = `$${tax.toFixed(2)}`;
-        if (totalElement) totalElement.textContent = `$${total.toFixed(2)}`;
+        if (subtotalElement) subtotalElement.textContent = format(quote && quote.subtotal);
+        if (taxElement) taxElement.textContent = format(quote && quote.tax);
+        if (totalElement) totalElement.textContent = format(quote && quote.total);
+    }
+
+    async refreshQuote() {
+        // Prices and stock come from the server; the stored cart only keeps ids and quantities authoritative
+        const response = await fetch('/api/cart/quote', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                items: this.cart.map(item => ({
+                    productId: item.id,
+                    quantity: item.quantity
+                }))
+            })
+        });
+
+        if (!response.ok) {
+            throw new Error('Failed to price cart');
+        }
+
+        const quote = await response.json();
+        quote.lines.forEach(line => {
+            const item = this.cart.find(item => item.id === line.productId);
+            if (item) {
+                item.name = line.name;
+                item.price = parseFloat(line.unitPrice);
+                item.stock = line.stock;
+                item.available = line.available;
+            }
+        });
+        // Products removed from the catalog can no longer be ordered
+        this.cart = this.cart.filter(item => !quote.missing.includes(item.id));
+        localStorage.setItem('cart', JSON.stringify(this.cart));
+        this.quote = quote;
+        return quote;
     }
 
     async checkout(email) {
         try {
+            const quote = await this.refreshQuote();
+            if (!quote.valid) {
+                this.updateCart();
+                alert('Some items in your cart are no longer available in the requested quantity.');
+                return;
+            }
+
             const response = await fetch('/api/orders', {
                 method: 'POST',
                 headers: {
@@ -152,7 +206,7 @@ class CartManager {
                         quantity: item.quantity,
                         price: item.price
                     })),
-                    total: this.cart.reduce((total, item) => total + (item.price * item.quantity), 0)
+                    total: parseFloat(quote.subtotal)
                 })
             });
 
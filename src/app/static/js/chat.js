@@ -3,30 +3,68 @@ class ChatWidget {
     constructor() {
         this.sessionId = null;
         this.isChatOpen = false;
+        this.socket = null;
+        // Bubble the answer being streamed into, while one is in flight
+        this.answerBubble = null;
+        this.answering = false;
     }
 
-    async initChat() {
-        try {
-            const response = await fetch('/api/ai/bedrock/start', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
+    initChat() {
+        // One socket per chat session; answers stream over it chunk by chunk
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const query = this.sessionId ? `?sessionId=${encodeURIComponent(this.sessionId)}` : '';
+        const socket = new WebSocket(`${scheme}://${window.location.host}/api/ai/bedrock/ws${query}`);
+        this.socket = socket;
+
+        socket.onmessage = (event) => this.handleFrame(JSON.parse(event.data));
+        socket.onclose = () => {
+            if (this.socket === socket) {
+                this.socket = null;
+            }
+            if (this.answerBubble) {
+                this.finishAnswer();
+            }
+        };
+        socket.onerror = () => {
+            console.error('Chat connection failed');
+            if (!this.sessionId) {
+                this.appendMessage("Sorry, I'm having trouble connecting. Please try again later.", false);
+            }
+        };
+    }
+
+    handleFrame(frame) {
+        switch (frame.type) {
+            case 'session': {
+                const isNew = !this.sessionId;
+                this.sessionId = frame.sessionId;
+                console.log('Chat session initialized:', this.sessionId);
+                if (isNew) {
+                    this.appendMessage("Hello! I'm your AI shopping assistant. How can I help you find products today?", false);
                 }
-            });
-            
-            if (!response.ok) {
-                throw new Error('Failed to start chat session');
+                break;
             }
-            
-            const data = await response.json();
-            this.sessionId = data.sessionId;
-            console.log('Chat session initialized:', this.sessionId);
-            
-            // Add initial message
-            this.appendMessage("Hello! I'm your AI shopping assistant. How can I help you find products today?", false);
-        } catch (error) {
-            console.error('Error initializing chat:', error);
-            this.appendMessage("Sorry, I'm having trouble connecting. Please try again later.", false);
+            case 'chunk':
+                if (!this.answerBubble) {
+                    this.answerBubble = this.appendMessage('', false);
+                }
+                this.answerBubble.textContent += frame.text;
+                this.scrollToBottom();
+                break;
+            case 'done':
+                this.finishAnswer();
+                break;
+            case 'cancelled':
+                if (this.answerBubble) {
+                    this.answerBubble.textContent += ' …';
+                }
+                this.finishAnswer();
+                break;
+            case 'error':
+                console.error('Chat error:', frame.detail);
+                this.finishAnswer();
+                this.appendMessage(frame.detail || "Sorry, I couldn't process your message. Please try again.", false);
+                break;
         }
     }
 
@@ -34,8 +72,8 @@ class ChatWidget {
         const chatWidget = document.getElementById('chat-widget');
         this.isChatOpen = !this.isChatOpen;
         chatWidget.style.display = this.isChatOpen ? 'flex' : 'none';
-        
-        if (this.isChatOpen && !this.sessionId) {
+
+        if (this.isChatOpen && !this.socket) {
             this.initChat();
         }
     }
@@ -44,57 +82,68 @@ class ChatWidget {
         const chatMessages = document.getElementById('chat-messages');
         const messageDiv = document.createElement('div');
         messageDiv.className = `flex ${isUser ? 'justify-end' : 'justify-start'} mb-4`;
-        
+
         const bubble = document.createElement('div');
         bubble.className = `rounded-lg px-4 py-2 max-w-[70%] ${
             isUser ? 'bg-blue-500 text-white' : 'bg-gray-100 text-gray-800'
         }`;
         bubble.textContent = message;
-        
+
         messageDiv.appendChild(bubble);
         chatMessages.appendChild(messageDiv);
+        this.scrollToBottom();
+        return bubble;
+    }
+
+    scrollToBottom() {
+        const chatMessages = document.getElementById('chat-messages');
         chatMessages.scrollTop = chatMessages.scrollHeight;
     }
 
-    async sendMessage(event) {
+    setAnswering(answering) {
+        this.answering = answering;
+        document.getElementById('chat-send').textContent = answering ? 'Stop' : 'Send';
+    }
+
+    finishAnswer() {
+        this.answerBubble = null;
+        this.setAnswering(false);
+    }
+
+    sendMessage(event) {
         event.preventDefault();
+
+        // While an answer streams the button stops it instead
+        if (this.answering) {
+            if (this.socket) {
+                this.socket.send(JSON.stringify({ type: 'cancel' }));
+            }
+            return;
+        }
+
         const messageInput = document.getElementById('message-input');
         const message = messageInput.value.trim();
-        
+
         if (!message || !this.sessionId) return;
-        
+
+        if (!this.socket || this.socket.readyState !== WebSocket.OPEN) {
+            // Reconnect to the same session and ask again once it is open
+            this.initChat();
+            this.appendMessage("Reconnecting, please send your message again in a moment.", false);
+            return;
+        }
+
         // Clear input
         messageInput.value = '';
-        
+
         // Show user message
         this.appendMessage(message, true);
-        
-        try {
-            const response = await fetch('/api/ai/bedrock/message', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    sessionId: this.sessionId,
-                    message: message
-                })
-            });
-            
-            if (!response.ok) {
-                throw new Error('Failed to send message');
-            }
-            
-            const data = await response.json();
-            this.appendMessage(data.response, false);
-        } catch (error) {
-            console.error('Error sending message:', error);
-            this.appendMessage("Sorry, I couldn't process your message. Please try again.", false);
-        }
+        this.setAnswering(true);
+        this.socket.send(JSON.stringify({ type: 'message', message: message }));
     }
 }
 
 // Initialize chat widget when DOM is loaded
 document.addEventListener('DOMContentLoaded', () => {
     window.chatWidget = new ChatWidget();
-}); 
\ No newline at end of file
+});
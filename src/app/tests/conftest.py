@@ -0,0 +1,92 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app the way main.py does, with src/app on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sql_storage import create_sql_storage  # noqa: E402
+from core.storage import Storage  # noqa: E402
+
+
+def _dynamodb_storage():
+    moto = pytest.importorskip("moto")
+    import boto3
+    from core.dynamodb_storage import (
+        ORDERS_TABLE,
+        PRODUCTS_TABLE,
+        SHARD_TABLE,
+        STATUS_INDEX,
+        TICKETS_TABLE,
+        DynamoDBOrderStore,
+        DynamoDBProductStore,
+        DynamoDBStockStore,
+        DynamoDBTicketStore,
+    )
+
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        os.environ.setdefault(name, "testing")
+    mock = moto.mock_aws()
+    mock.start()
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    for name in (PRODUCTS_TABLE, ORDERS_TABLE):
+        dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST"
+        )
+    dynamodb.create_table(
+        TableName=SHARD_TABLE,
+        KeySchema=[
+            {"AttributeName": "productId", "KeyType": "HASH"},
+            {"AttributeName": "shard", "KeyType": "RANGE"}
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "productId", "AttributeType": "S"},
+            {"AttributeName": "shard", "AttributeType": "N"}
+        ],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    dynamodb.create_table(
+        TableName=TICKETS_TABLE,
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "status", "AttributeType": "S"},
+            {"AttributeName": "updated_at", "AttributeType": "S"}
+        ],
+        GlobalSecondaryIndexes=[{
+            "IndexName": STATUS_INDEX,
+            "KeySchema": [
+                {"AttributeName": "status", "KeyType": "HASH"},
+                {"AttributeName": "updated_at", "KeyType": "RANGE"}
+            ],
+            "Projection": {"ProjectionType": "ALL"}
+        }],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    storage = Storage(
+        products=DynamoDBProductStore(lambda: dynamodb),
+        orders=DynamoDBOrderStore(lambda: dynamodb),
+        tickets=DynamoDBTicketStore(lambda: dynamodb),
+        stock=DynamoDBStockStore(lambda: dynamodb)
+    )
+    return storage, mock.stop
+
+
+@pytest.fixture
+def sql_storage(tmp_path) -> Storage:
+    return create_sql_storage(f"sqlite:///{tmp_path / 'cloudmart.db'}")
+
+
+@pytest.fixture(params=["sql", "dynamodb"])
+def storage(request, tmp_path) -> Storage:
+    """Each storage backend in turn; DynamoDB runs against moto when it is installed"""
+    if request.param == "sql":
+        yield create_sql_storage(f"sqlite:///{tmp_path / 'cloudmart.db'}")
+        return
+    storage, stop = _dynamodb_storage()
+    yield storage
+    stop()
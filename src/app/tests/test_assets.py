@@ -0,0 +1,29 @@
+from core.assets import ranked_encodings
+
+
+def encodings(header: str) -> list:
+    return [encoding for encoding, _ in ranked_encodings(header)]
+
+
+def test_prefers_brotli_then_gzip():
+    assert encodings("gzip, deflate, br") == ["br", "gzip"]
+    assert encodings("deflate") == []
+    assert encodings("") == []
+
+
+def test_q_zero_rules_an_encoding_out():
+    assert encodings("gzip, br;q=0") == ["gzip"]
+    assert encodings("gzip;q=0, br") == ["br"]
+    assert encodings("br;q=0, gzip;q=0.0") == []
+    assert encodings("identity") == []
+
+
+def test_q_values_order_the_encodings():
+    assert encodings("br;q=0.5, gzip;q=0.8") == ["gzip", "br"]
+    assert encodings("BR; Q=1, GZIP;q=1") == ["br", "gzip"]
+
+
+def test_wildcard_covers_unlisted_encodings():
+    assert encodings("*") == ["br", "gzip"]
+    assert encodings("gzip, *;q=0") == ["gzip"]
+    assert encodings("br;q=0, *") == ["gzip"]
@@ -0,0 +1,53 @@
+from datetime import datetime
+from decimal import Decimal
+
+from core.codec import from_item, projection, to_item
+from models.order import Order, OrderItem
+from models.ticket import Ticket
+
+
+def test_order_round_trip_keeps_decimal_precision():
+    order = Order(
+        userEmail="a@example.com",
+        items=[OrderItem(productId="p1", quantity=3, price=Decimal("19.99"))],
+        total=Decimal("59.97"),
+        createdAt=datetime(2026, 10, 1, 12, 30)
+    )
+    item = to_item(order)
+
+    assert item["total"] == Decimal("59.97")
+    assert isinstance(item["total"], Decimal)
+    assert item["items"][0]["price"] == Decimal("19.99")
+    assert isinstance(item["items"][0]["price"], Decimal)
+    assert item["createdAt"] == "2026-10-01T12:30:00"
+    assert from_item(Order, item) == order
+
+
+def test_decimals_inside_optional_dicts_are_restored():
+    ticket = Ticket(sentimentScores={"positive": Decimal("0.75"), "negative": Decimal("0.25")})
+    item = to_item(ticket)
+
+    assert item["sentimentScores"] == {"positive": Decimal("0.75"), "negative": Decimal("0.25")}
+    assert all(isinstance(value, Decimal) for value in item["sentimentScores"].values())
+    assert to_item(Ticket())["sentimentScores"] is None
+
+
+def test_decode_accepts_strings_written_by_older_code():
+    order = from_item(Order, {
+        "id": "3fa9c0de",
+        "userEmail": "a@example.com",
+        "items": [{"productId": "p1", "quantity": 1, "price": "5.10"}],
+        "total": "5.10",
+        "status": "Pending",
+        "createdAt": "2026-10-01T12:30:00"
+    })
+
+    assert order.total == Decimal("5.10")
+    assert order.items[0].price == Decimal("5.10")
+
+
+def test_projection_names_every_field():
+    assert projection(["id", "status"]) == {
+        "ProjectionExpression": "#p0, #p1",
+        "ExpressionAttributeNames": {"#p0": "id", "#p1": "status"}
+    }
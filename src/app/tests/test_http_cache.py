@@ -0,0 +1,35 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from core.http_cache import cached_json_response
+
+app = FastAPI()
+
+
+@app.get("/items")
+async def items(request: Request):
+    return cached_json_response(request, [{"id": "p1", "price": "9.99"}], "public, max-age=60")
+
+
+client = TestClient(app)
+
+
+def test_matching_etag_gets_304_without_body():
+    first = client.get("/items")
+    etag = first.headers["etag"]
+
+    assert first.status_code == 200
+    assert first.json() == [{"id": "p1", "price": "9.99"}]
+
+    revalidated = client.get("/items", headers={"If-None-Match": f"W/{etag}"})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.headers["cache-control"] == "public, max-age=60"
+
+
+def test_stale_etag_gets_full_body():
+    response = client.get("/items", headers={"If-None-Match": '"stale", "older"'})
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": "p1", "price": "9.99"}]
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from core.jobs import JobQueue
+
+
+def run_queue(handlers, payloads, **options):
+    """Submit payloads to a fresh queue, stop it and return the queue"""
+    async def scenario():
+        queue = JobQueue(**options)
+        for name, (handler, on_failure) in handlers.items():
+            queue.register(name, handler, on_failure)
+        queue.start()
+        for name, payload in payloads:
+            await queue.submit(name, payload)
+        await queue.stop(timeout=5)
+        return queue
+
+    return asyncio.run(scenario())
+
+
+def test_failed_job_is_retried_until_it_succeeds():
+    attempts = []
+
+    async def flaky(payload):
+        attempts.append(payload["n"])
+        if attempts.count(payload["n"]) < 3:
+            raise RuntimeError("try again")
+
+    queue = run_queue({"flaky": (flaky, None)}, [("flaky", {"n": 1})], max_attempts=3, backoff=0.01)
+
+    assert attempts == [1, 1, 1]
+    assert (queue.completed, queue.failed) == (1, 0)
+
+
+def test_drain_waits_for_delayed_retries():
+    attempts = []
+
+    async def flaky(payload):
+        attempts.append(payload["n"])
+        if attempts.count(payload["n"]) < 2:
+            raise RuntimeError("try again")
+
+    queue = run_queue(
+        {"flaky": (flaky, None)},
+        [("flaky", {"n": n}) for n in range(3)],
+        workers=2,
+        backoff=0.2
+    )
+
+    assert sorted(attempts) == [0, 0, 1, 1, 2, 2]
+    assert queue.completed == 3
+    assert queue.backend.pending() == 0
+
+
+def test_failure_callback_gets_payload_after_last_attempt():
+    failed = []
+
+    async def broken(payload):
+        raise RuntimeError("always")
+
+    async def on_failure(payload):
+        failed.append(payload)
+
+    queue = run_queue(
+        {"broken": (broken, on_failure)},
+        [("broken", {"ticket": "t1"})],
+        max_attempts=2,
+        backoff=0.01
+    )
+
+    assert failed == [{"ticket": "t1"}]
+    assert (queue.completed, queue.failed) == (0, 1)
+
+
+def test_submit_rejects_unknown_job():
+    async def scenario():
+        queue = JobQueue()
+        queue.start()
+        try:
+            with pytest.raises(ValueError):
+                await queue.submit("missing", {})
+        finally:
+            await queue.stop(timeout=1)
+
+    asyncio.run(scenario())
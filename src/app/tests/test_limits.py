@@ -0,0 +1,189 @@
+import asyncio
+import time
+
+import pytest
+
+from core import limits
+from core.limits import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpen,
+    Coalescer,
+    ProviderBusy,
+    ProviderLimiter,
+    get_breaker,
+    get_limiter,
+    guarded,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for the breaker"""
+    now = [1000.0]
+    monkeypatch.setattr(limits.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_breaker_opens_at_failure_rate(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4, open_for=30)
+    for succeeded in (True, False, True):
+        breaker.before_call()
+        breaker.record(succeeded)
+    assert breaker.state == CLOSED
+
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+    with pytest.raises(CircuitOpen) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 30
+
+
+def test_breaker_counts_slow_calls_as_failures(clock):
+    breaker = CircuitBreaker("test", failure_rate=1.0, min_calls=2, slow_call=5)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record(True, duration=6)
+    assert breaker.state == OPEN
+
+
+def test_breaker_half_open_probe_closes_or_reopens(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=1, open_for=30, probes=1)
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN
+
+    clock[0] += 31
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+
+    clock[0] += 31
+    breaker.before_call()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_abandoned_calls_do_not_count(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=1)
+    breaker.before_call()
+    breaker.record(None)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["recentCalls"] == 0
+
+
+def test_limiter_rejects_beyond_queue():
+    async def scenario():
+        limiter = ProviderLimiter("test", concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert (limiter.active, limiter.waiting) == (1, 1)
+
+        with pytest.raises(ProviderBusy):
+            async with limiter.slot():
+                pass
+        assert limiter.rejected == 1
+
+        release.set()
+        await asyncio.gather(holder, queued)
+        assert (limiter.active, limiter.waiting) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_coalescer_shares_one_call():
+    async def scenario():
+        coalescer = Coalescer()
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(coalescer.run("key", call) for _ in range(5)))
+        assert results == ["answer"] * 5
+        assert len(calls) == 1
+        assert coalescer.coalesced == 4
+
+        # Once finished, the next caller makes a fresh call
+        await coalescer.run("key", call)
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_coalesced_call_survives_a_cancelled_caller():
+    async def scenario():
+        coalescer = Coalescer()
+
+        async def call():
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        first = asyncio.create_task(coalescer.run("key", call))
+        second = asyncio.create_task(coalescer.run("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "answer"
+
+    asyncio.run(scenario())
+
+
+def test_open_circuit_fails_fast_without_queueing():
+    async def scenario():
+        limiter = get_limiter("testopen")
+        get_breaker("testopen")._open(time.monotonic())
+        calls = []
+
+        async def call():
+            calls.append(1)
+
+        # Even with every slot taken the caller is turned away at once rather than queued
+        for _ in range(limiter.concurrency):
+            await limiter._semaphore.acquire()
+        with pytest.raises(CircuitOpen):
+            await asyncio.wait_for(guarded("testopen", call), 0.1)
+        assert limiter.waiting == 0
+        assert calls == []
+
+    asyncio.run(scenario())
+
+
+def test_call_rejected_by_limiter_frees_the_half_open_probe(monkeypatch):
+    monkeypatch.setenv("TESTPROBE_CONCURRENCY", "1")
+    monkeypatch.setenv("TESTPROBE_MAX_QUEUE", "0")
+
+    async def scenario():
+        limiter = get_limiter("testprobe")
+        breaker = get_breaker("testprobe")
+        breaker._open(time.monotonic() - breaker.open_for - 1)
+
+        async def call():
+            return "ok"
+
+        async with limiter.slot():
+            with pytest.raises(ProviderBusy):
+                await guarded("testprobe", call)
+        # The rejected call did not use up the probe, so the next one may try
+        assert await guarded("testprobe", call) == "ok"
+        assert breaker.stats()["state"] == "closed"
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from core.codec import to_item
+from models.product import Product
+from services import stock_service
+from services.stock_service import StockService, split
+
+
+def add_product(storage, stock: int) -> str:
+    product = Product(name="Widget", description="A widget", price=Decimal("9.99"), stock=stock, category="tools")
+    storage.products.put(to_item(product))
+    return product.id
+
+
+def test_split_spreads_remainder_over_first_shards():
+    assert split(10, 4) == [3, 3, 2, 2]
+    assert split(2, 4) == [1, 1, 0, 0]
+
+
+def test_reserve_is_all_or_nothing(storage):
+    service = StockService(storage.stock)
+    plenty = add_product(storage, 5)
+    scarce = add_product(storage, 1)
+
+    short = asyncio.run(service.reserve([(plenty, 2), (scarce, 2)]))
+
+    assert short == [scarce]
+    assert asyncio.run(service.get_stock(plenty)) == 5
+    assert asyncio.run(service.get_stock(scarce)) == 1
+
+
+def test_release_returns_units(storage):
+    service = StockService(storage.stock)
+    product_id = add_product(storage, 3)
+
+    assert asyncio.run(service.reserve([(product_id, 3)])) == []
+    asyncio.run(service.release([(product_id, 2)]))
+
+    assert asyncio.run(service.get_stock(product_id)) == 2
+
+
+@pytest.mark.parametrize("shards", [0, 4])
+def test_concurrent_sales_never_oversell(sql_storage, shards):
+    service = StockService(sql_storage.stock)
+    product_id = add_product(sql_storage, 10)
+    if shards:
+        asyncio.run(service.set_shards(product_id, shards))
+
+    async def sell_all():
+        return await asyncio.gather(*(service.reserve([(product_id, 1)]) for _ in range(25)))
+
+    results = asyncio.run(sell_all())
+
+    assert sum(1 for short in results if not short) == 10
+    assert asyncio.run(service.get_stock(product_id)) == 0
+
+
+def test_sharded_sale_gathers_from_several_shards(storage, monkeypatch):
+    monkeypatch.setattr(stock_service, "PROBES", 1)
+    service = StockService(storage.stock)
+    product_id = add_product(storage, 10)
+    asyncio.run(service.set_shards(product_id, 4))
+    assert storage.stock.read_shards(product_id) == {0: 3, 1: 3, 2: 2, 3: 2}
+
+    # No single shard holds 7 units
+    assert asyncio.run(service.reserve([(product_id, 7)])) == []
+
+    assert service.gathered == 1
+    assert asyncio.run(service.get_stock(product_id)) == 3
+
+
+def test_gather_puts_back_what_it_took_when_shards_ran_dry(storage):
+    service = StockService(storage.stock)
+    product_id = add_product(storage, 10)
+    asyncio.run(service.set_shards(product_id, 2))
+    stale = storage.stock.read_shards(product_id)
+    # Another pod sells shard 1 empty after this pod read the counts
+    assert storage.stock.adjust(product_id, 1, -5)
+    storage.stock.read_shards = lambda _: stale
+
+    assert not service._gather(product_id, 8)
+
+    del storage.stock.read_shards
+    assert storage.stock.read_shards(product_id) == {0: 5, 1: 0}
+
+
+def test_set_stock_spreads_over_current_shards(storage):
+    service = StockService(storage.stock)
+    product_id = add_product(storage, 4)
+    asyncio.run(service.set_shards(product_id, 3))
+
+    assert asyncio.run(service.set_stock(product_id, 7)) == 7
+    assert storage.stock.read_shards(product_id) == {0: 3, 1: 2, 2: 2}
+    assert asyncio.run(service.set_shards(product_id, 0)) == 7
+    assert storage.stock.read_config(product_id) == (0, 7)
+
+
+def test_unknown_product_is_short(storage):
+    service = StockService(storage.stock)
+
+    assert asyncio.run(service.reserve([("missing", 1)])) == ["missing"]
+    assert asyncio.run(service.get_stock("missing")) is None
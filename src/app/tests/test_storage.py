@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from core.codec import from_item, to_item
+from core.storage import ConditionFailed
+from models.order import Order, OrderItem
+from models.product import Product
+from models.ticket import Ticket
+
+
+def make_order(email: str = "a@example.com", **fields) -> dict:
+    return to_item(Order(
+        userEmail=email,
+        items=[OrderItem(productId="p1", quantity=2, price=Decimal("4.50"))],
+        total=Decimal("9.00"),
+        **fields
+    ))
+
+
+def make_ticket(status: str, updated_at: datetime) -> dict:
+    return to_item(Ticket(status=status, updated_at=updated_at))
+
+
+def test_products_round_trip(storage):
+    product = Product(name="Lamp", description="Desk lamp", price=Decimal("24.99"), stock=3, category="home")
+    storage.products.put(to_item(product))
+
+    # SQL keeps Decimals as exact strings, so compare what the services decode
+    assert from_item(Product, storage.products.get(product.id)) == product
+    fetched = storage.products.batch_get([product.id, "missing"], ["id", "price"])
+    assert [(item["id"], Decimal(item["price"])) for item in fetched] == [(product.id, Decimal("24.99"))]
+    assert [item["id"] for item in storage.products.scan()] == [product.id]
+
+    storage.products.delete(product.id)
+    assert storage.products.get(product.id) is None
+
+
+def test_orders_by_user(storage):
+    mine = make_order("me@example.com")
+    theirs = make_order("them@example.com")
+    for order in (mine, theirs):
+        storage.orders.put(order)
+
+    assert [from_item(Order, item) for item in storage.orders.by_user("me@example.com")] == [from_item(Order, mine)]
+    assert [sorted(item) for item in storage.orders.by_user("me@example.com", ["id", "total"])] == [["id", "total"]]
+
+
+def test_ticket_put_checks_version(storage):
+    ticket = make_ticket("open", datetime(2026, 10, 1))
+    storage.tickets.put(ticket)
+    version = storage.tickets.get_version(ticket["id"])
+
+    storage.tickets.put({**ticket, "updated_at": "2026-10-02T00:00:00"}, expected_version=version)
+    with pytest.raises(ConditionFailed):
+        storage.tickets.put({**ticket, "updated_at": "2026-10-03T00:00:00"}, expected_version=version)
+    assert storage.tickets.get_version(ticket["id"]) == "2026-10-02T00:00:00"
+
+
+def test_tickets_by_status_pages_newest_first(storage):
+    start = datetime(2026, 10, 1)
+    tickets = [make_ticket("open", start + timedelta(hours=hour)) for hour in range(5)]
+    for ticket in tickets:
+        storage.tickets.put(ticket)
+    storage.tickets.put(make_ticket("closed", start))
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = storage.tickets.by_status("open", 2, cursor)
+        seen.extend(item["id"] for item in page)
+        if not cursor:
+            break
+
+    assert seen == [ticket["id"] for ticket in reversed(tickets)]
+
+
+def test_update_status_is_conditional(storage):
+    order = make_order()
+    storage.orders.put(order)
+
+    updated = storage.orders.update_status(order["id"], "Canceled", unless="Canceled")
+    assert updated["status"] == "Canceled"
+    with pytest.raises(ConditionFailed):
+        storage.orders.update_status(order["id"], "Canceled", unless="Canceled")
+    assert storage.orders.update_status("missing", "Canceled", unless="Canceled") is None
+
+
+def test_closed_before_and_expire(storage):
+    old = make_ticket("closed", datetime(2026, 1, 1))
+    older = make_ticket("closed", datetime(2025, 12, 1))
+    recent = make_ticket("closed", datetime(2026, 10, 1))
+    still_open = make_ticket("open", datetime(2025, 11, 1))
+    for ticket in (old, older, recent, still_open):
+        storage.tickets.put(ticket)
+
+    due = storage.tickets.closed_before("2026-06-01", limit=10)
+    assert [item["id"] for item in due] == [older["id"], old["id"]]
+
+    assert not storage.tickets.expire(old["id"], "2020-01-01T00:00:00", expires_at=0)
+    assert storage.tickets.expire(old["id"], old["updated_at"], expires_at=0)
+    assert [item["id"] for item in storage.tickets.closed_before("2026-06-01", limit=10)] == [older["id"]]
@@ -0,0 +1,75 @@
+import pytest
+
+from services import ticket_archive
+from services.ticket_archive import LocalArchiveStore, TicketArchive
+
+
+def make_item(ticket_id: str, updated_at: str) -> dict:
+    return {"id": ticket_id, "status": "closed", "updated_at": updated_at, "messages": []}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalArchiveStore(str(tmp_path), durable=True)
+
+
+def test_write_partitions_batches_by_closing_day(store):
+    archive = TicketArchive(store)
+    keys = archive.write([
+        make_item("t1", "2026-01-01T10:00:00"),
+        make_item("t2", "2026-01-01T11:00:00"),
+        make_item("t3", "2026-01-02T09:00:00")
+    ])
+
+    assert [key.split("/")[1] for key in keys] == ["closed=2026-01-01", "closed=2026-01-02"]
+    assert len(store.list(ticket_archive.IDS_PREFIX)) == 3
+
+
+def test_another_instance_finds_archived_tickets(store):
+    TicketArchive(store).write([make_item("t1", "2026-01-01T10:00:00"), make_item("t2", "2026-01-01T11:00:00")])
+
+    reader = TicketArchive(store)
+    assert reader.get("t1")["updated_at"] == "2026-01-01T10:00:00"
+    assert reader.get("t2")["id"] == "t2"
+    assert reader.get("missing") is None
+    # Both tickets sit in one batch, read once
+    assert reader.reads == 1
+
+
+def test_deleted_ticket_stays_deleted_for_other_instances(store):
+    archive = TicketArchive(store)
+    archive.write([make_item("t1", "2026-01-01T10:00:00")])
+    archive.delete("t1")
+
+    assert not archive.contains("t1")
+    assert TicketArchive(store).get("t1") is None
+
+
+def test_lookup_reads_only_the_tickets_id_object(store, monkeypatch):
+    TicketArchive(store).write([make_item(f"t{n}", "2026-01-01T10:00:00") for n in range(3)])
+    reads = []
+    read = store.get
+    monkeypatch.setattr(store, "get", lambda key: reads.append(key) or read(key))
+    monkeypatch.setattr(store, "list", lambda prefix: pytest.fail("lookups must not list the bucket"))
+
+    reader = TicketArchive(store)
+    assert reader.get("missing") is None
+    assert reader.get("t1")["id"] == "t1"
+    assert reads[:2] == [f"{ticket_archive.IDS_PREFIX}missing", f"{ticket_archive.IDS_PREFIX}t1"]
+    assert len(reads) == 3
+
+
+def test_write_fails_when_batch_does_not_read_back(store, monkeypatch):
+    monkeypatch.setattr(store, "get", lambda key: None)
+
+    with pytest.raises(RuntimeError):
+        TicketArchive(store).write([make_item("t1", "2026-01-01T10:00:00")])
+
+
+def test_local_store_is_durable_only_when_configured(tmp_path, monkeypatch):
+    monkeypatch.setattr(ticket_archive, "ARCHIVE_BUCKET", None)
+    monkeypatch.setattr(ticket_archive, "ARCHIVE_DIR", None)
+    assert not ticket_archive.default_store().durable
+
+    monkeypatch.setattr(ticket_archive, "ARCHIVE_DIR", str(tmp_path))
+    assert ticket_archive.default_store().durable
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from core.codec import to_item
+from models.ticket import Message, Ticket
+from services import ticket_service
+from services.ticket_archive import LocalArchiveStore, TicketArchive
+from services.ticket_service import REPLY_JOB, REPLY_TIMEOUT, TicketService
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.submitted = []
+
+    async def submit(self, name, payload):
+        self.submitted.append((name, payload))
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = RecordingQueue()
+    monkeypatch.setattr(ticket_service, "job_queue", queue)
+    return queue
+
+
+@pytest.fixture
+def service(sql_storage, tmp_path):
+    archive = TicketArchive(LocalArchiveStore(str(tmp_path / "archive")))
+    return TicketService(ai_service=object(), store=sql_storage.tickets, archive=archive)
+
+
+def pending_ticket(service, waited: float) -> Ticket:
+    ticket = Ticket(
+        messages=[Message(role="user", content="Where is my order?")],
+        pending=True,
+        updated_at=datetime.utcnow() - timedelta(seconds=waited)
+    )
+    service.store.put(to_item(ticket))
+    return ticket
+
+
+def test_stale_pending_ticket_resubmits_its_reply_once(service, queue):
+    ticket = pending_ticket(service, REPLY_TIMEOUT + 60)
+
+    for _ in range(2):
+        assert asyncio.run(service.get_ticket(ticket.id)).pending
+
+    assert queue.submitted == [(REPLY_JOB, {"ticket_id": ticket.id, "message": "Where is my order?"})]
+
+
+def test_recent_pending_ticket_is_left_to_its_job(service, queue):
+    ticket = pending_ticket(service, 5)
+
+    assert asyncio.run(service.get_ticket(ticket.id)).pending
+    assert queue.submitted == []
+
+
+def test_reply_keeps_an_update_made_while_it_was_answered(service, queue):
+    ticket = Ticket(messages=[Message(role="user", content="Hi"), Message(role="assistant", content="Hello")])
+    service.store.put(to_item(ticket))
+
+    class AnalyzingAI:
+        async def send_message(self, thread_id, message, summary=None):
+            # Sentiment analysis saves the ticket while the assistant is still answering
+            await service.update_ticket_sentiment(ticket.id, {
+                "sentimentScores": {"positive": Decimal("0.9")},
+                "overallSentiment": "POSITIVE"
+            })
+            return "It ships tomorrow"
+
+    service.ai_service = AnalyzingAI()
+    updated = asyncio.run(service.send_message(ticket.id, "Where is my order?"))
+
+    assert [message.content for message in updated.messages][-2:] == ["Where is my order?", "It ships tomorrow"]
+    assert updated.overallSentiment == "POSITIVE"
+    stored = asyncio.run(service.get_ticket(ticket.id))
+    assert stored.overallSentiment == "POSITIVE" and len(stored.messages) == 4
@@ -116,6 +116,29 @@ resource "aws_dynamodb_table" "cloudmart_products" {
   }
 }
 
+# Sharded stock counters for hot products (one item per product and shard)
+resource "aws_dynamodb_table" "cloudmart_stock_shards" {
+  name           = "cloudmart-stock-shards"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "productId"
+  range_key      = "shard"
+
+  attribute {
+    name = "productId"
+    type = "S"
+  }
+
+  attribute {
+    name = "shard"
+    type = "N"
+  }
+
+  tags = {
+    Name        = "cloudmart-stock-shards"
+    Environment = "Dev"
+  }
+}
+
 resource "aws_dynamodb_table" "cloudmart_orders" {
   name           = "cloudmart-orders"
   billing_mode   = "PAY_PER_REQUEST"
@@ -146,12 +169,100 @@ resource "aws_dynamodb_table" "cloudmart_tickets" {
     type = "S"
   }
 
+  attribute {
+    name = "status"
+    type = "S"
+  }
+
+  attribute {
+    name = "updated_at"
+    type = "S"
+  }
+
+  # Sparse index of tickets by status, newest first. Sentiment records have
+  # no status attribute, so they never appear in it.
+  global_secondary_index {
+    name               = "status-updated_at-index"
+    hash_key           = "status"
+    range_key          = "updated_at"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["thread_id", "overallSentiment", "last_message"]
+  }
+
+  # Archived tickets leave a stub behind that expires here once the
+  # archive holds the full ticket
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   tags = {
     Name        = "cloudmart-tickets"
     Environment = "Dev"
   }
 }
 
+# Cold storage for archived tickets (see src/app/services/ticket_archive.py)
+resource "aws_s3_bucket" "ticket_archive" {
+  bucket = "cloudmart-ticket-archive"
+
+  tags = {
+    Name        = "cloudmart-ticket-archive"
+    Environment = "Dev"
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "ticket_archive" {
+  bucket = aws_s3_bucket.ticket_archive.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+# Archived batches are rarely read, so move them to infrequent access
+resource "aws_s3_bucket_lifecycle_configuration" "ticket_archive" {
+  bucket = aws_s3_bucket.ticket_archive.id
+
+  rule {
+    id     = "archive-batches"
+    status = "Enabled"
+
+    filter {
+      prefix = "tickets/closed="
+    }
+
+    transition {
+      days          = 30
+      storage_class = "STANDARD_IA"
+    }
+  }
+}
+
+# Running sales aggregates maintained from the orders stream
+resource "aws_dynamodb_table" "cloudmart_sales_aggregates" {
+  name           = "cloudmart-sales-aggregates"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "id"
+
+  attribute {
+    name = "id"
+    type = "S"
+  }
+
+  # Expires the markers of stream records already applied
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "cloudmart-sales-aggregates"
+    Environment = "Dev"
+  }
+}
+
 # IAM Role for Lambda
 resource "aws_iam_role" "lambda_role" {
   name = "cloudmart_lambda_role"
@@ -184,6 +295,7 @@ resource "aws_iam_role_policy" "lambda_policy" {
           "dynamodb:Scan",
           "dynamodb:GetItem",
           "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "logs:CreateLogGroup",
           "logs:CreateLogStream",
@@ -193,6 +305,7 @@ resource "aws_iam_role_policy" "lambda_policy" {
           aws_dynamodb_table.cloudmart_products.arn,
           aws_dynamodb_table.cloudmart_orders.arn,
           aws_dynamodb_table.cloudmart_tickets.arn,
+          aws_dynamodb_table.cloudmart_sales_aggregates.arn,
           "arn:aws:logs:*:*:*"
         ]
       }
@@ -231,7 +344,14 @@ resource "aws_lambda_function" "list_products" {
 
   environment {
     variables = {
-      PRODUCTS_TABLE = aws_dynamodb_table.cloudmart_products.name
+      PRODUCTS_TABLE   = aws_dynamodb_table.cloudmart_products.name
+      AGGREGATES_TABLE = aws_dynamodb_table.cloudmart_sales_aggregates.name
+      MAX_RESULTS      = "5"
+      RESPONSE_FIELDS  = "name,description,price,frequentlyBoughtWith"
+      MAX_DESCRIPTION_LENGTH = "160"
+      MAX_RESPONSE_BYTES     = "20000"
+      LOG_EVENTS             = "false"
+      BESTSELLERS_TTL        = "60"
     }
   }
 
@@ -243,6 +363,53 @@ resource "aws_lambda_function" "list_products" {
   }
 }
 
+# Batch job rebuilding the recommendation model (same package as list_products)
+resource "aws_lambda_function" "recommendation_model_builder" {
+  function_name    = "cloudmart-recommendation-model-builder"
+  role            = aws_iam_role.lambda_role.arn
+  handler         = "recommender.build_handler"
+  runtime         = "python3.12"
+  timeout         = 300
+  memory_size     = 512
+  publish         = true  # Enable versioning
+  
+  filename         = data.archive_file.dummy.output_path
+  source_code_hash = data.archive_file.dummy.output_base64sha256
+
+  environment {
+    variables = {
+      ORDERS_TABLE     = aws_dynamodb_table.cloudmart_orders.name
+      AGGREGATES_TABLE = aws_dynamodb_table.cloudmart_sales_aggregates.name
+    }
+  }
+
+  lifecycle {
+    ignore_changes = [
+      filename,
+      source_code_hash,
+    ]
+  }
+}
+
+# Rebuild the model every few hours
+resource "aws_cloudwatch_event_rule" "recommendation_model_schedule" {
+  name                = "cloudmart-recommendation-model-schedule"
+  schedule_expression = "rate(6 hours)"
+}
+
+resource "aws_cloudwatch_event_target" "recommendation_model_builder" {
+  rule = aws_cloudwatch_event_rule.recommendation_model_schedule.name
+  arn  = aws_lambda_function.recommendation_model_builder.arn
+}
+
+resource "aws_lambda_permission" "allow_recommendation_schedule" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.recommendation_model_builder.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.recommendation_model_schedule.arn
+}
+
 # Lambda permission for Bedrock
 resource "aws_lambda_permission" "allow_bedrock" {
   statement_id  = "AllowBedrockInvoke"
@@ -353,4 +520,106 @@ resource "aws_lambda_event_source_mapping" "orders_stream" {
   starting_position = "LATEST"
   batch_size        = 100
   maximum_retry_attempts = 3
-}
\ No newline at end of file
+}
+
+# IAM Role for Sales Aggregates Lambda
+resource "aws_iam_role" "sales_aggregates_role" {
+  name = "cloudmart_sales_aggregates_role"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+}
+
+# IAM Policy for Sales Aggregates Lambda
+resource "aws_iam_role_policy" "sales_aggregates_policy" {
+  name = "cloudmart_sales_aggregates_policy"
+  role = aws_iam_role.sales_aggregates_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:DescribeStream",
+          "dynamodb:ListStreams"
+        ]
+        Resource = [
+          "${aws_dynamodb_table.cloudmart_orders.arn}/stream/*"
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem"
+        ]
+        Resource = [
+          aws_dynamodb_table.cloudmart_sales_aggregates.arn
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "logs:CreateLogGroup",
+          "logs:CreateLogStream",
+          "logs:PutLogEvents"
+        ]
+        Resource = [
+          "arn:aws:logs:*:*:*"
+        ]
+      }
+    ]
+  })
+}
+
+# Lambda function maintaining sales aggregates
+resource "aws_lambda_function" "sales_aggregates" {
+  function_name    = "cloudmart-sales-aggregates"
+  role            = aws_iam_role.sales_aggregates_role.arn
+  handler         = "index.handler"
+  runtime         = "python3.12"
+  timeout         = 60
+  publish         = true  # Enable versioning
+  
+  filename         = data.archive_file.dummy.output_path
+  source_code_hash = data.archive_file.dummy.output_base64sha256
+
+  environment {
+    variables = {
+      AGGREGATES_TABLE = aws_dynamodb_table.cloudmart_sales_aggregates.name
+    }
+  }
+
+  lifecycle {
+    ignore_changes = [
+      filename,
+      source_code_hash,
+    ]
+  }
+}
+
+# Second consumer of the orders stream
+resource "aws_lambda_event_source_mapping" "orders_stream_aggregates" {
+  event_source_arn  = aws_dynamodb_table.cloudmart_orders.stream_arn
+  function_name     = aws_lambda_function.sales_aggregates.arn
+  starting_position = "LATEST"
+  batch_size        = 100
+  maximum_retry_attempts = 3
+  # Retry from the first failed record rather than the whole batch
+  function_response_types = ["ReportBatchItemFailures"]
+}
@@ -54,6 +54,8 @@ resource "google_bigquery_table" "orders" {
       mode = "REQUIRED",
       description = "Order ID"
     },
+    # Stays JSON; migrate_items_to_record.sql moves orders to a table with
+    # REPEATED RECORD items when opting in to the Avro/Parquet loads
     {
       name = "items",
       type = "JSON",
@@ -0,0 +1,40 @@
+-- Opt-in migration of order items from a JSON column to a REPEATED RECORD,
+-- which the bigquery-sync lambda's AVRO and PARQUET load formats require.
+-- BigQuery cannot change a column's type in place, so the rows move to a
+-- new table and cloudmart-orders is left untouched:
+--   1. Run the CREATE TABLE below.
+--   2. Point the lambda at it: BIGQUERY_TABLE_ID = "cloudmart-orders-v2" and
+--      BIGQUERY_LOAD_FORMAT = "AVRO".
+--   3. Run the INSERT to copy the existing orders over. It skips ids the new
+--      table already has, so it can be re-run.
+
+CREATE TABLE IF NOT EXISTS `cloudmart.cloudmart-orders-v2` (
+  id STRING NOT NULL OPTIONS (description = "Order ID"),
+  items ARRAY<STRUCT<
+    productId STRING NOT NULL,
+    quantity INT64 NOT NULL,
+    price FLOAT64 NOT NULL
+  >> OPTIONS (description = "Order items"),
+  userEmail STRING NOT NULL OPTIONS (description = "Customer email"),
+  total FLOAT64 NOT NULL OPTIONS (description = "Order total"),
+  status STRING NOT NULL OPTIONS (description = "Order status"),
+  createdAt TIMESTAMP NOT NULL OPTIONS (description = "Order creation timestamp")
+)
+PARTITION BY DATE(createdAt);
+
+INSERT INTO `cloudmart.cloudmart-orders-v2` (id, items, userEmail, total, status, createdAt)
+SELECT
+  legacy.id,
+  ARRAY(
+    SELECT AS STRUCT
+      STRING(item.productId) AS productId,
+      INT64(item.quantity) AS quantity,
+      FLOAT64(item.price) AS price
+    FROM UNNEST(JSON_QUERY_ARRAY(legacy.items)) AS item
+  ) AS items,
+  legacy.userEmail,
+  legacy.total,
+  legacy.status,
+  legacy.createdAt
+FROM `cloudmart.cloudmart-orders` AS legacy
+WHERE legacy.id NOT IN (SELECT id FROM `cloudmart.cloudmart-orders-v2`);
@@ -182,6 +182,7 @@ resource "aws_iam_role_policy" "dynamodb_access" {
         Effect = "Allow"
         Action = [
           "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:PutItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
@@ -196,6 +197,31 @@ resource "aws_iam_role_policy" "dynamodb_access" {
   })
 }
 
+# Policy for the ticket archive bucket
+resource "aws_iam_role_policy" "ticket_archive_access" {
+  name = "ticket-archive-access"
+  role = aws_iam_role.fastapi_app.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject",
+          "s3:GetObject"
+        ]
+        Resource = "arn:aws:s3:::cloudmart-ticket-archive/*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["s3:ListBucket"]
+        Resource = "arn:aws:s3:::cloudmart-ticket-archive"
+      }
+    ]
+  })
+}
+
 # Policy for Bedrock access
 resource "aws_iam_role_policy" "bedrock_access" {
   name = "bedrock-access"
@@ -209,6 +235,7 @@ resource "aws_iam_role_policy" "bedrock_access" {
         Action = [
           "bedrock:InvokeAgent",
           "bedrock:InvokeModel",
+          "bedrock:InvokeModelWithResponseStream",
           "bedrock-agent-runtime:InvokeAgent"
         ]
         Resource = "*"